@@ -0,0 +1,236 @@
+import argparse
+import csv
+import json
+import sqlite3
+import time
+from itertools import islice
+
+from assets.data import sql_requests
+
+COLUMNS = ('author', 'title', 'year', 'status')
+EXPORT_COLUMNS = ('id',) + COLUMNS
+STATUSES = {'1': 1, '0': 0, 'В наличии': 1, 'Выдана': 0}
+
+
+def row_to_book(row: dict, line: int) -> tuple:
+    """
+    Преобразование одной записи файла в кортеж для запроса INSERT.
+
+    Args:
+        row (dict): запись из файла csv/jsonl с ключами author, title,
+        year, status (id при наличии игнорируется).
+
+        line (int): номер строки в файле для сообщения об ошибке.
+
+    Returns:
+        book (tuple): кортеж (author, title, year, status).
+    """
+    try:
+        author = str(row['author']).strip()
+        title = str(row['title']).strip()
+        year = int(row['year'])
+        status = STATUSES[str(row.get('status', 1)).strip()]
+    except (KeyError, TypeError, ValueError) as error:
+        raise ValueError(f'Строка {line}: некорректная запись {row!r}') \
+            from error
+    if not author or not title:
+        raise ValueError(f'Строка {line}: не заполнен автор или название')
+    return author, title, year, status
+
+
+def read_books(path: str):
+    """
+    Ленивое чтение книг из файла csv (с заголовком) или jsonl (одна
+    запись json на строку), формат определяется по расширению файла.
+
+    Args:
+        path (str): путь к файлу.
+
+    Yields:
+        book (tuple): кортеж (author, title, year, status).
+    """
+    with open(path, encoding='utf-8', newline='') as file:
+        if path.lower().endswith(('.jsonl', '.json')):
+            for line, text in enumerate(file, start=1):
+                if text.strip():
+                    yield row_to_book(json.loads(text), line)
+        else:
+            for line, row in enumerate(csv.DictReader(file), start=2):
+                yield row_to_book(row, line)
+
+
+def import_books(path: str, batch_size: int = 5000,
+                 database: sql_requests.Connection = None) -> dict:
+    """
+    Потоковая загрузка книг из файла в базу данных. Сначала проверяется
+    весь файл, поэтому некорректная запись не оставляет в базе данных
+    часть файла. Затем записи вставляются через executemany пачками,
+    каждая пачка - отдельная транзакция. Если вставка прервётся после
+    фиксации части пачек, в сообщении об ошибке указывается количество
+    уже добавленных записей.
+
+    Args:
+        path (str): путь к файлу csv/jsonl.
+
+        batch_size (int, optional): количество записей в одной транзакции.
+
+        database (Connection, optional): подключение к базе данных. По
+        умолчанию используется общее для модуля sql_requests подключение.
+
+    Returns:
+        report (dict): количество записей, время и скорость загрузки.
+    """
+    database = database or sql_requests.connection
+    start = time.perf_counter()
+    for _ in read_books(path):
+        pass
+
+    books = read_books(path)
+    rows = 0
+    try:
+        while True:
+            batch = list(islice(books, batch_size))
+            if not batch:
+                break
+            rows += sql_requests.insert_many(batch, database)
+    except (OSError, ValueError, sqlite3.Error) as error:
+        if not rows:
+            raise
+        raise type(error)(f'{error} (уже добавлено записей: {rows})') \
+            from error
+
+    return report(rows, time.perf_counter() - start)
+
+
+def iter_books(fetch_size: int = 5000,
+               database: sql_requests.Connection = None):
+    """
+    Потоковое чтение всех книг по возрастанию id через отдельное
+    подключение итератором курсора, поэтому таблица целиком в памяти не
+    хранится, а общее подключение (и кэш результатов) не используется.
+    С сервера каталога книги читаются постранично.
+
+    Args:
+        fetch_size (int, optional): количество строк, получаемых из курсора
+        за одно обращение.
+
+        database (Connection, optional): подключение к базе данных. По
+        умолчанию используется общее для модуля sql_requests подключение.
+
+    Yields:
+        book (tuple): кортеж (id, author, title, year, status).
+    """
+    database = database or sql_requests.connection
+    if database.remote:
+        # Каталог на сервере читается постранично (keyset-пагинация по id)
+        request, book_id = sql_requests.Request('NEXT', database), 0
+        while True:
+            books = request.connection_with_request(book_id=book_id,
+                                                    limit=fetch_size)
+            if not books:
+                break
+            yield from map(tuple, books)
+            book_id = books[-1].id
+        return None
+
+    connection = sqlite3.connect(database.path)
+    try:
+        cursor = connection.cursor()
+        cursor.arraysize = fetch_size
+        cursor.execute('SELECT id, author, title, year, status FROM Books '
+                       'ORDER BY id')
+        while True:
+            books = cursor.fetchmany()
+            if not books:
+                break
+            yield from books
+    finally:
+        connection.close()
+
+
+def export_books(path: str, fetch_size: int = 5000,
+                 database: sql_requests.Connection = None) -> dict:
+    """
+    Потоковая выгрузка всех книг в файл csv/jsonl через iter_books().
+
+    Args:
+        path (str): путь к файлу csv/jsonl.
+
+        fetch_size (int, optional): количество строк, получаемых из курсора
+        за одно обращение.
+
+        database (Connection, optional): подключение к базе данных. По
+        умолчанию используется общее для модуля sql_requests подключение.
+
+    Returns:
+        report (dict): количество записей, время и скорость выгрузки.
+    """
+    books = iter_books(fetch_size, database)
+    rows = 0
+    start = time.perf_counter()
+
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        if path.lower().endswith(('.jsonl', '.json')):
+            for book in books:
+                file.write(json.dumps(dict(zip(EXPORT_COLUMNS, book)),
+                                      ensure_ascii=False) + '\n')
+                rows += 1
+        else:
+            writer = csv.writer(file)
+            writer.writerow(EXPORT_COLUMNS)
+            for book in books:
+                writer.writerow(book)
+                rows += 1
+
+    return report(rows, time.perf_counter() - start)
+
+
+def report(rows: int, seconds: float) -> dict:
+    """
+    Формирование отчёта о выполненной операции.
+
+    Args:
+        rows (int): количество обработанных записей.
+
+        seconds (float): время выполнения операции в секундах.
+
+    Returns:
+        report (dict): rows, seconds и rows_per_sec.
+    """
+    return {'rows': rows, 'seconds': round(seconds, 3),
+            'rows_per_sec': round(rows / seconds) if seconds else rows}
+
+
+def main(argv: list = None) -> None:
+    """
+    Запуск импорта/экспорта из командной строки без графического
+    интерфейса.
+
+    Args:
+        argv (list, optional): аргументы командной строки.
+    """
+    parser = argparse.ArgumentParser(
+        description='Импорт/экспорт каталога книг (csv/jsonl)')
+    parser.add_argument('action', choices=('import', 'export'))
+    parser.add_argument('path', help='файл .csv или .jsonl')
+    parser.add_argument('--db', default=sql_requests.DB_PATH,
+                        help='путь к базе данных')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    sql_requests.connection.open(args.db)
+    try:
+        if args.action == 'import':
+            sql_requests.migrate()
+            result = import_books(args.path, args.batch_size)
+        else:
+            result = export_books(args.path, args.batch_size)
+    finally:
+        sql_requests.close()
+
+    print(f"{args.action}: {result['rows']} записей за {result['seconds']} с "
+          f"({result['rows_per_sec']} записей/с)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,292 @@
+import http.client
+import json
+import select
+import sqlite3
+import threading
+import urllib.parse
+
+from assets.data import sql_requests
+
+TIMEOUT = 30
+WRITES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def dropped(connection: http.client.HTTPConnection) -> bool:
+    """
+    Проверка, закрыл ли сервер простаивавшее соединение: в ожидании
+    запроса в сокете не должно быть данных, поэтому готовность к чтению
+    означает закрытие соединения (или лишние данные от сервера).
+
+    Args:
+        connection (HTTPConnection): соединение с сервером.
+
+    Returns:
+        dropped (bool): соединение непригодно для следующего запроса.
+    """
+    if connection.sock is None:
+        return False
+    try:
+        return bool(select.select([connection.sock], [], [], 0)[0])
+    except (OSError, ValueError):
+        return True
+
+
+class RemoteConnection:
+    """
+    Основное применение - подключение к серверу каталога (python -m server)
+    вместо файла базы данных. Заменяет общее подключение модуля
+    sql_requests (sql_requests.connect()), после чего запросы Request,
+    массовые операции, импорт и экспорт выполняются через HTTP/JSON.
+
+    Args:
+        url (str): адрес сервера, например http://127.0.0.1:8765.
+
+        timeout (float, optional): время ожидания ответа сервера в
+        секундах.
+
+    Methods:
+        request(): выполнение операции Request на сервере.
+
+        query(): выполнение запроса Query на сервере.
+
+        write_many(): массовое удаление или изменение статуса книг.
+
+        insert_many(): массовое добавление книг.
+
+        changes_since(): изменения каталога из журнала сервера.
+
+        trim_journal(): сокращение журнала изменений на сервере.
+
+        maintenance(): обслуживание базы данных на сервере.
+
+        schema(): версия схемы базы данных сервера.
+
+        version(): текущая версия данных для проверки изменений.
+
+        open(): переключение на другой сервер.
+
+        close(): закрытие соединения с сервером.
+    """
+
+    remote = True
+
+    def __init__(self, url: str, timeout: float = TIMEOUT):
+        self.timeout = timeout
+        self.lock = threading.RLock()
+        self.writes = 0
+        # Результаты кэшируются на сервере, локальный кэш не используется
+        self.cache = sql_requests.Cache(size=0)
+        self.grouped = False
+        self._connection = None
+        self.open(url)
+
+    def call(self, method: str, path: str, payload: dict = None) -> dict:
+        """
+        Отправка запроса серверу через постоянное соединение. Если ранее
+        открытое соединение разорвано до отправки запроса, запрос
+        повторяется через новое; разрыв после отправки не повторяется.
+
+        Args:
+            method (str): метод HTTP.
+
+            path (str): путь запроса.
+
+            payload (dict, optional): тело запроса.
+
+        Returns:
+            payload (dict): ответ сервера.
+        """
+        body = None if payload is None else json.dumps(
+            payload, ensure_ascii=False).encode('utf-8')
+        headers = {'Content-Type': 'application/json; charset=utf-8'}
+
+        with self.lock:
+            while True:
+                # Простаивавшее соединение, закрытое сервером, заменяется
+                # до отправки запроса
+                if self._connection is not None and dropped(self._connection):
+                    self.close()
+                reused = self._connection is not None
+                if not reused:
+                    self._connection = http.client.HTTPConnection(
+                        self.host, self.port, timeout=self.timeout)
+                try:
+                    self._connection.request(method, path, body, headers)
+                except (BrokenPipeError, ConnectionResetError) as error:
+                    # Запрос не отправлен: сервер закрыл простаивавшее
+                    # соединение, запрос повторяется через новое
+                    self.close()
+                    if reused:
+                        continue
+                    raise ConnectionError(
+                        f'сервер {self.path} недоступен: {error}')
+                except (http.client.HTTPException, OSError) as error:
+                    self.close()
+                    raise ConnectionError(
+                        f'сервер {self.path} недоступен: {error}')
+
+                # Запрос отправлен: после разрыва он не повторяется, иначе
+                # операция записи могла бы выполниться дважды
+                try:
+                    response = self._connection.getresponse()
+                    data = response.read()
+                    break
+                except (http.client.HTTPException, OSError) as error:
+                    self.close()
+                    raise ConnectionError(
+                        f'сервер {self.path} не ответил: {error}')
+
+        result = json.loads(data or b'{}')
+        if response.status == 500:
+            raise sqlite3.OperationalError(result.get('error'))
+        elif response.status != 200:
+            raise ValueError(result.get('error') or response.reason)
+        return result
+
+    def request(self, name: str, book_author: str = None,
+                book_title: str = None, book_year: int = None,
+                book_status: int = None, book_id: int = None,
+                limit: int = None) -> [None, int, list]:
+        """
+        Выполнение операции Request на сервере (аргументы и результат - как
+        у Request.connection_with_request).
+        """
+        params = {'book_author': book_author, 'book_title': book_title,
+                  'book_year': book_year, 'book_status': book_status,
+                  'book_id': book_id, 'limit': limit}
+        result = self.call('POST', '/request', {
+            'name': name,
+            'params': {key: value for key, value in params.items()
+                       if value is not None}})['result']
+        if name in WRITES:
+            self.writes += 1
+        if type(result) == list:
+            return [sql_requests.Book(*row) for row in result]
+        return result
+
+    def query(self, spec: dict) -> list:
+        """
+        Выполнение запроса Query на сервере (результат получается одним
+        ответом, а не пачками курсора).
+
+        Args:
+            spec (dict): описание запроса (Query.spec()).
+
+        Returns:
+            rows (list): записи Book или кортежи выбранных столбцов.
+        """
+        rows = self.call('POST', '/query', spec)['result']
+        if tuple(spec['columns']) == sql_requests.COLUMNS:
+            return [sql_requests.Book(*row) for row in rows]
+        return [tuple(row) for row in rows]
+
+    def write_many(self, name: str, book_ids: list,
+                   book_status: int = None) -> list:
+        """
+        Массовое удаление (DELETE) или изменение статуса (STATUS) книг на
+        сервере (см. sql_requests.write_many).
+        """
+        result = self.call('POST', '/many', {
+            'name': name, 'ids': list(book_ids),
+            'status': book_status})['result']
+        self.writes += 1
+        return [sql_requests.Book(*row) for row in result]
+
+    def insert_many(self, rows: list) -> int:
+        """
+        Массовое добавление книг на сервере (см. sql_requests.insert_many).
+        """
+        result = self.call('POST', '/insert',
+                           {'rows': [list(row) for row in rows]})['result']
+        self.writes += 1
+        return result
+
+    def changes_since(self, seq: int, limit: int) -> dict:
+        """
+        Получение изменений каталога после записи журнала с номером seq
+        (см. sql_requests.changes_since).
+        """
+        return self.call('POST', '/journal', {'since': seq,
+                                              'limit': limit})['result']
+
+    def trim_journal(self, keep: int, days: [None, int]) -> int:
+        """
+        Сокращение журнала изменений на сервере (см.
+        sql_requests.trim_journal).
+        """
+        return self.call('POST', '/trim', {'keep': keep,
+                                           'days': days})['result']
+
+    def maintenance(self, operation: str, **options) -> dict:
+        """
+        Обслуживание базы данных на сервере - снимок, обновление статистики
+        или проверка целостности (см. модуль maintenance).
+
+        Args:
+            operation (str): snapshot, optimize или check.
+
+            **options: параметры операции (analyze, quick).
+
+        Returns:
+            report (dict): отчёт об операции.
+        """
+        return self.call('POST', '/maintenance', {'operation': operation,
+                                                  **options})['result']
+
+    def schema(self) -> int:
+        """
+        Получение версии схемы базы данных сервера (миграции выполняет
+        сервер при запуске).
+
+        Returns:
+            version (int): версия схемы.
+        """
+        return self.call('GET', '/version')['schema']
+
+    def version(self) -> tuple:
+        """
+        Получение версии данных: счётчик собственных операций записи и
+        версия данных сервера. Изменения через сервер от других копий
+        приложения меняют версию сервера.
+
+        Returns:
+            version (tuple): пара (writes, версия данных сервера).
+        """
+        return self.writes, tuple(self.call('GET', '/version')['version'])
+
+    def check_version(self) -> None:
+        """
+        Кэш результатов на стороне клиента не используется.
+        """
+        return None
+
+    def interrupt(self) -> None:
+        """
+        Запрос на сервере не прерывается, устаревший результат
+        отбрасывается фоновым потоком приложения.
+        """
+        return None
+
+    def open(self, url: str) -> None:
+        """
+        Переключение на другой сервер каталога.
+
+        Args:
+            url (str): адрес сервера.
+        """
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme != 'http' or not parts.hostname:
+            raise ValueError(f'некорректный адрес сервера {url!r}')
+        with self.lock:
+            self.close()
+            self.path = url
+            self.host, self.port = parts.hostname, parts.port or 80
+
+    def close(self) -> None:
+        """
+        Закрытие соединения с сервером.
+        """
+        with self.lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,155 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+
+LOG_PATH = './assets/data/logs.jsonl'
+MAX_BYTES = 1024 * 1024
+BACKUPS = 5
+
+# Дополнительные поля записи, которые передаются через extra
+FIELDS = ('operation', 'params', 'duration_ms', 'rows', 'book_id')
+
+root = logging.getLogger('library')
+root.addHandler(logging.NullHandler())
+
+listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Основное применение - форматирование записи журнала в одну строку json
+    (время, уровень, источник, сообщение, дополнительные поля и текст
+    исключения, если оно есть).
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        """
+        Форматирование записи журнала.
+
+        Args:
+            record (LogRecord): запись журнала.
+
+        Returns:
+            line (str): запись в формате json.
+        """
+        entry = {'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+                 'level': record.levelname,
+                 'logger': record.name,
+                 'message': record.getMessage()}
+        for field in FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """
+    Основное применение - передача записей журнала в очередь потока записи.
+    В отличие от стандартного обработчика текст исключения не добавляется
+    к сообщению, а передаётся отдельно (поле exception в json).
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Подготовка записи к передаче в другой поток: аргументы сообщения и
+        исключение преобразуются в строки.
+
+        Args:
+            record (LogRecord): запись журнала.
+
+        Returns:
+            record (LogRecord): копия записи для очереди.
+        """
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(
+                record.exc_info)
+        record.exc_info = None
+        return record
+
+
+def setup(path: str = LOG_PATH, level: int = logging.INFO,
+          max_bytes: int = MAX_BYTES, backups: int = BACKUPS,
+          when: str = None) -> logging.Logger:
+    """
+    Настройка журнала приложения: записи передаются через очередь в
+    отдельный поток, который пишет их в файл с ротацией по размеру (или по
+    времени, если указан when), поэтому запись в журнал не блокирует
+    вызывающий поток. Повторный вызов ничего не меняет.
+
+    Args:
+        path (str, optional): путь к файлу журнала.
+
+        level (int, optional): минимальный уровень записей.
+
+        max_bytes (int, optional): размер файла, после которого он
+        ротируется.
+
+        backups (int, optional): количество хранимых старых файлов.
+
+        when (str, optional): интервал ротации по времени ('midnight',
+        'H', 'D' и т.д. - как в TimedRotatingFileHandler).
+
+    Returns:
+        root (Logger): корневой журнал приложения.
+    """
+    global listener
+    if listener is not None:
+        return root
+
+    if when is None:
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8',
+            delay=True)
+    else:
+        handler = logging.handlers.TimedRotatingFileHandler(
+            path, when=when, backupCount=backups, encoding='utf-8',
+            delay=True)
+    handler.setFormatter(JsonFormatter())
+
+    records = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(records, handler)
+    listener.start()
+    root.addHandler(QueueHandler(records))
+    root.setLevel(level)
+    root.propagate = False
+    atexit.register(shutdown)
+    return root
+
+
+def shutdown() -> None:
+    """
+    Остановка потока журнала с записью всех оставшихся в очереди записей.
+    """
+    global listener
+    if listener is None:
+        return None
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+    for handler in root.handlers[:]:
+        if isinstance(handler, QueueHandler):
+            root.removeHandler(handler)
+    listener = None
+
+
+def get(name: str) -> logging.Logger:
+    """
+    Получение журнала для части приложения.
+
+    Args:
+        name (str): имя части приложения (например, sql_requests).
+
+    Returns:
+        logger (Logger): дочерний журнал корневого журнала приложения.
+    """
+    return root.getChild(name)
@@ -0,0 +1,369 @@
+import glob
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+from assets.data import sql_requests, logger, metrics
+
+log = logger.get('maintenance')
+
+# Количество страниц, которые копируются за один шаг резервного копирования,
+# и пауза (с) между шагами: в паузах приложение и другие подключения
+# продолжают читать и писать базу данных
+BACKUP_PAGES = 1024
+BACKUP_SLEEP = 0.005
+
+# Количество перезапусков резервного копирования из-за изменений базы
+# данных другими подключениями, после которого копирование прекращается
+BACKUP_RESTARTS = 10
+
+# Папка снимков (относительно папки базы данных), количество хранимых
+# снимков и интервал (с) между плановыми снимками
+SNAPSHOT_DIR = 'snapshots'
+SNAPSHOT_KEEP = 7
+SNAPSHOT_INTERVAL = 24 * 60 * 60
+
+# Время ожидания (с) блокировки базы данных отдельным подключением
+TIMEOUT = 30
+
+# Операции, которые сервер каталога выполняет по запросу клиента (резервная
+# копия и VACUUM выполняются только с локальной базой данных)
+REMOTE = ('snapshot', 'optimize', 'check')
+
+
+def open_source(database: sql_requests.Connection) -> sqlite3.Connection:
+    """
+    Открытие отдельного подключения к файлу базы данных, поэтому общее
+    подключение (и запросы приложения) не блокируется на время операции.
+
+    Args:
+        database (Connection): подключение к базе данных.
+
+    Returns:
+        connection (sqlite3.Connection): отдельное подключение в режиме
+        autocommit.
+    """
+    if database.remote:
+        raise ValueError('операция выполняется только с локальной базой '
+                         'данных')
+    return sqlite3.connect(database.path, timeout=TIMEOUT,
+                           isolation_level=None)
+
+
+def report(operation: str, start: float, **details) -> dict:
+    """
+    Формирование отчёта об операции обслуживания и запись его в журнал.
+
+    Args:
+        operation (str): имя операции.
+
+        start (float): время начала операции (time.perf_counter()).
+
+        **details: результаты операции.
+
+    Returns:
+        report (dict): имя операции, время выполнения в секундах и
+        результаты.
+    """
+    seconds = time.perf_counter() - start
+    log.info('Обслуживание %s', operation, extra={
+        'operation': operation.upper(), 'params': details,
+        'duration_ms': round(seconds * 1000, 3)})
+    return {'operation': operation, 'seconds': round(seconds, 3), **details}
+
+
+@metrics.timed('BACKUP')
+def backup(path: str, pages: int = BACKUP_PAGES, sleep: float = BACKUP_SLEEP,
+           progress=None, database: sql_requests.Connection = None) -> dict:
+    """
+    Резервное копирование базы данных через online backup API sqlite3 из
+    общего подключения: страницы копируются шагами по pages, каждый шаг -
+    под блокировкой подключения, а между шагами блокировка освобождается
+    на паузу sleep, поэтому копирование не блокирует работу приложения.
+    Изменения через общее подключение sqlite3 сразу переносит в копию, а
+    изменение базы данных другим подключением (другая копия приложения,
+    сервер) начинает копирование заново - после BACKUP_RESTARTS
+    перезапусков копирование прекращается с ошибкой.
+
+    Args:
+        path (str): путь к файлу резервной копии (существующий файл
+        перезаписывается).
+
+        pages (int, optional): количество страниц за один шаг.
+
+        sleep (float, optional): пауза между шагами в секундах (после
+        последнего шага не выполняется).
+
+        progress (callable, optional): функция, которая получает количество
+        скопированных и общее количество страниц после каждого шага.
+
+        database (Connection, optional): подключение к базе данных. По
+        умолчанию используется общее для модуля sql_requests подключение.
+
+    Returns:
+        report (dict): путь, количество страниц, шагов и перезапусков,
+        размер файла и время копирования.
+    """
+    database = database or sql_requests.connection
+    if database.remote:
+        raise ValueError('операция выполняется только с локальной базой '
+                         'данных')
+    start = time.perf_counter()
+    state = {'steps': 0, 'pages': 0, 'copied': 0, 'restarts': 0}
+
+    def step(status: int, remaining: int, total: int) -> None:
+        state['steps'] += 1
+        state['pages'] = total
+        # Скопированных страниц не больше, чем после прошлого шага, -
+        # sqlite3 начал копирование заново
+        if total - remaining <= state['copied']:
+            state['restarts'] += 1
+            if state['restarts'] > BACKUP_RESTARTS:
+                raise sqlite3.OperationalError(
+                    f"резервное копирование перезапущено {state['restarts']} "
+                    f"раз: база данных изменяется другими подключениями")
+        state['copied'] = total - remaining
+        if progress is not None:
+            progress(total - remaining, total)
+        if remaining:
+            database.lock.release()
+            try:
+                if sleep > 0:
+                    time.sleep(sleep)
+            finally:
+                database.lock.acquire()
+
+    target = sqlite3.connect(path)
+    try:
+        with database.lock:
+            database.get().backup(target, pages=pages, progress=step,
+                                  sleep=sleep)
+    finally:
+        target.close()
+
+    return report('backup', start, path=path, pages=state['pages'],
+                  steps=state['steps'], restarts=state['restarts'],
+                  bytes=os.path.getsize(path))
+
+
+def snapshots(directory: str, stem: str) -> list:
+    """
+    Получение списка снимков базы данных от старых к новым.
+
+    Args:
+        directory (str): папка снимков.
+
+        stem (str): имя файла базы данных без расширения.
+
+    Returns:
+        paths (list): пути к файлам снимков.
+    """
+    return sorted(glob.glob(os.path.join(directory, f'{stem}-*.db')))
+
+
+def snapshot_place(database: sql_requests.Connection,
+                   directory: str = None) -> tuple:
+    """
+    Получение папки снимков и имени файла базы данных без расширения.
+
+    Args:
+        database (Connection): подключение к базе данных.
+
+        directory (str, optional): папка снимков, по умолчанию - папка
+        SNAPSHOT_DIR рядом с файлом базы данных.
+
+    Returns:
+        place (tuple): папка и имя файла без расширения.
+    """
+    folder, name = os.path.split(os.path.abspath(database.path))
+    return (directory or os.path.join(folder, SNAPSHOT_DIR),
+            os.path.splitext(name)[0])
+
+
+@metrics.timed('SNAPSHOT')
+def snapshot(directory: str = None, keep: int = SNAPSHOT_KEEP,
+             database: sql_requests.Connection = None) -> dict:
+    """
+    Снимок базы данных через VACUUM INTO: согласованная копия без
+    фрагментации и пустых страниц создаётся в отдельном подключении в
+    одной транзакции чтения. Старые снимки сверх keep удаляются.
+
+    Args:
+        directory (str, optional): папка снимков, по умолчанию - папка
+        SNAPSHOT_DIR рядом с файлом базы данных.
+
+        keep (int, optional): количество хранимых снимков.
+
+        database (Connection, optional): подключение к базе данных. По
+        умолчанию используется общее для модуля sql_requests подключение.
+
+    Returns:
+        report (dict): путь и размер снимка, количество удалённых старых
+        снимков и время создания.
+    """
+    database = database or sql_requests.connection
+    if database.remote:
+        return database.maintenance('snapshot')
+    start = time.perf_counter()
+    directory, stem = snapshot_place(database, directory)
+    os.makedirs(directory, exist_ok=True)
+    # Имя с миллисекундами; занятое имя сдвигается на миллисекунду, поэтому
+    # снимки в одну секунду не конфликтуют и сортируются по времени
+    moment = datetime.now()
+    while True:
+        path = os.path.join(directory, f'{stem}-{moment:%Y%m%d-%H%M%S}-'
+                                       f'{moment.microsecond // 1000:03d}.db')
+        if not os.path.exists(path):
+            break
+        moment += timedelta(milliseconds=1)
+
+    source = open_source(database)
+    try:
+        source.execute('VACUUM INTO ?', (path,))
+    finally:
+        source.close()
+
+    removed = snapshots(directory, stem)[:-keep] if keep > 0 else []
+    for old in removed:
+        os.remove(old)
+    return report('snapshot', start, path=path, bytes=os.path.getsize(path),
+                  removed=len(removed))
+
+
+def snapshot_due(directory: str = None, interval: float = SNAPSHOT_INTERVAL,
+                 database: sql_requests.Connection = None) -> bool:
+    """
+    Проверка, пора ли делать плановый снимок: снимков нет или последний
+    старше interval секунд.
+
+    Args:
+        directory (str, optional): папка снимков.
+
+        interval (float, optional): интервал между снимками в секундах.
+
+        database (Connection, optional): подключение к базе данных.
+
+    Returns:
+        due (bool): нужен ли снимок.
+    """
+    database = database or sql_requests.connection
+    paths = snapshots(*snapshot_place(database, directory))
+    return not paths or time.time() - os.path.getmtime(paths[-1]) >= interval
+
+
+def scheduled_snapshot(directory: str = None, keep: int = SNAPSHOT_KEEP,
+                       interval: float = SNAPSHOT_INTERVAL,
+                       database: sql_requests.Connection = None) -> [None,
+                                                                     dict]:
+    """
+    Плановый снимок базы данных, если с последнего снимка прошло не меньше
+    interval секунд (вызывается периодически приложением и сервером).
+
+    Returns:
+        report (dict, optional): отчёт snapshot() или None, если снимок
+        не нужен.
+    """
+    database = database or sql_requests.connection
+    if database.remote or not snapshot_due(directory, interval, database):
+        return None
+    return snapshot(directory, keep, database)
+
+
+@metrics.timed('OPTIMIZE')
+def optimize(analyze: bool = False,
+             database: sql_requests.Connection = None) -> dict:
+    """
+    Обновление статистики планировщика запросов: PRAGMA optimize
+    (анализируются только таблицы, статистика которых устарела) или
+    полный ANALYZE. Подключения приложения используют новую статистику
+    со следующего выполнения запроса.
+
+    Args:
+        analyze (bool, optional): выполнить полный ANALYZE.
+
+        database (Connection, optional): подключение к базе данных. По
+        умолчанию используется общее для модуля sql_requests подключение.
+
+    Returns:
+        report (dict): вид операции и время выполнения.
+    """
+    database = database or sql_requests.connection
+    if database.remote:
+        return database.maintenance('optimize', analyze=analyze)
+    start = time.perf_counter()
+
+    source = open_source(database)
+    try:
+        if analyze:
+            source.execute('ANALYZE')
+        source.execute('PRAGMA optimize')
+    finally:
+        source.close()
+    return report('optimize', start, analyze=analyze)
+
+
+@metrics.timed('CHECK')
+def check(quick: bool = False,
+          database: sql_requests.Connection = None) -> dict:
+    """
+    Проверка целостности базы данных (PRAGMA integrity_check или более
+    быстрая quick_check без проверки соответствия индексов таблицам) и
+    оценка фрагментации по количеству пустых страниц.
+
+    Args:
+        quick (bool, optional): выполнить quick_check.
+
+        database (Connection, optional): подключение к базе данных. По
+        умолчанию используется общее для модуля sql_requests подключение.
+
+    Returns:
+        report (dict): признак целостности, найденные ошибки, количество
+        страниц и пустых страниц и время проверки.
+    """
+    database = database or sql_requests.connection
+    if database.remote:
+        return database.maintenance('check', quick=quick)
+    start = time.perf_counter()
+
+    source = open_source(database)
+    try:
+        pragma = 'quick_check' if quick else 'integrity_check'
+        errors = [row[0] for row in source.execute(f'PRAGMA {pragma}')]
+        pages = source.execute('PRAGMA page_count').fetchone()[0]
+        free = source.execute('PRAGMA freelist_count').fetchone()[0]
+    finally:
+        source.close()
+
+    if errors == ['ok']:
+        errors = []
+    return report('check', start, ok=not errors, errors=errors, pages=pages,
+                  free_pages=free)
+
+
+@metrics.timed('VACUUM')
+def vacuum(database: sql_requests.Connection = None) -> dict:
+    """
+    Сжатие базы данных на месте (VACUUM) после большого количества
+    удалений с последующей очисткой журнала WAL. На время сжатия запись
+    в базу данных другими подключениями ожидает его завершения.
+
+    Args:
+        database (Connection, optional): подключение к базе данных. По
+        умолчанию используется общее для модуля sql_requests подключение.
+
+    Returns:
+        report (dict): размер файла до и после сжатия и время выполнения.
+    """
+    database = database or sql_requests.connection
+    start = time.perf_counter()
+
+    source = open_source(database)
+    try:
+        before = os.path.getsize(database.path)
+        source.execute('VACUUM')
+        source.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    finally:
+        source.close()
+    return report('vacuum', start, bytes_before=before,
+                  bytes=os.path.getsize(database.path))
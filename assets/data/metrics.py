@@ -0,0 +1,394 @@
+import functools
+import io
+import json
+import threading
+import time
+from datetime import datetime
+
+# Верхние границы интервалов гистограммы задержек в миллисекундах (последний
+# интервал - всё, что дольше 2.5 с)
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250,
+           500, 1000, 2500)
+LABELS = tuple(f'<={bound}' for bound in BUCKETS) + (f'>{BUCKETS[-1]}',)
+
+# Количество строк профиля (по суммарному времени), которые сохраняются
+PROFILE_LINES = 40
+
+# Замеры выключены по умолчанию: обёрнутые функции в этом случае только
+# проверяют этот флаг
+enabled = False
+
+lock = threading.Lock()
+operations = {}
+profiles = {}
+
+# Операция, для которой ожидается профилирование (None - любая), порог
+# длительности и признак выполняемого в данный момент профилирования
+armed = False
+profile_operation = None
+profile_threshold = 0
+profiling = False
+
+
+class Stats:
+    """
+    Основное применение - накопление замеров одной операции: количество
+    вызовов, время выполнения, гистограмма задержек, количество строк и
+    объём данных.
+
+    Methods:
+        add(): добавление одного замера.
+
+        as_dict(): счётчики и оценки перцентилей по гистограмме.
+    """
+
+    __slots__ = ('count', 'total', 'minimum', 'maximum', 'rows', 'bytes',
+                 'histogram')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.histogram = [0] * (len(BUCKETS) + 1)
+
+    def add(self, milliseconds: float, rows: int = None,
+            size: int = None) -> None:
+        """
+        Добавление замера операции.
+
+        Args:
+            milliseconds (float): время выполнения в миллисекундах.
+
+            rows (int, optional): количество строк, полученных или
+            обработанных операцией.
+
+            size (int, optional): примерный объём данных в байтах.
+        """
+        self.count += 1
+        self.total += milliseconds
+        if self.minimum is None or milliseconds < self.minimum:
+            self.minimum = milliseconds
+        if milliseconds > self.maximum:
+            self.maximum = milliseconds
+        self.rows += rows or 0
+        self.bytes += size or 0
+        for index, bound in enumerate(BUCKETS):
+            if milliseconds <= bound:
+                break
+        else:
+            index = len(BUCKETS)
+        self.histogram[index] += 1
+
+    def percentile(self, share: float) -> [None, float]:
+        """
+        Оценка перцентиля задержки по гистограмме (верхняя граница
+        интервала, в который попадает перцентиль, но не больше максимума).
+
+        Args:
+            share (float): доля от 0 до 1 (например, 0.99).
+
+        Returns:
+            milliseconds (float, optional): оценка перцентиля в
+            миллисекундах.
+        """
+        if not self.count:
+            return None
+        position = share * self.count
+        passed = 0
+        for index, count in enumerate(self.histogram):
+            passed += count
+            if passed >= position:
+                if index < len(BUCKETS):
+                    return min(BUCKETS[index], round(self.maximum, 3))
+                return round(self.maximum, 3)
+        return round(self.maximum, 3)
+
+    def as_dict(self) -> dict:
+        """
+        Получение счётчиков операции.
+
+        Returns:
+            stats (dict): количество вызовов, время (общее, среднее,
+            минимальное, максимальное, p50, p90 и p99) в миллисекундах,
+            строки, байты и гистограмма по границам BUCKETS.
+        """
+        return {'count': self.count,
+                'total_ms': round(self.total, 3),
+                'mean_ms': round(self.total / self.count, 3)
+                if self.count else None,
+                'min_ms': round(self.minimum or 0, 3),
+                'max_ms': round(self.maximum, 3),
+                'p50_ms': self.percentile(0.5),
+                'p90_ms': self.percentile(0.9),
+                'p99_ms': self.percentile(0.99),
+                'rows': self.rows,
+                'bytes': self.bytes,
+                'histogram': {label: count for label, count in
+                              zip(LABELS, self.histogram) if count}}
+
+
+def enable() -> None:
+    """
+    Включение замеров.
+    """
+    global enabled
+    enabled = True
+
+
+def disable() -> None:
+    """
+    Выключение замеров (накопленные значения сохраняются).
+    """
+    global enabled
+    enabled = False
+
+
+def reset() -> None:
+    """
+    Удаление накопленных замеров и профилей.
+    """
+    with lock:
+        operations.clear()
+        profiles.clear()
+
+
+def record(operation: str, milliseconds: float, rows: int = None,
+           size: int = None) -> None:
+    """
+    Добавление замера операции (вызывается только при включённых замерах).
+
+    Args:
+        operation (str): имя операции (например, SELECT или App.replace_books).
+
+        milliseconds (float): время выполнения в миллисекундах.
+
+        rows (int, optional): количество строк.
+
+        size (int, optional): примерный объём данных в байтах.
+    """
+    with lock:
+        stats = operations.get(operation)
+        if stats is None:
+            stats = operations[operation] = Stats()
+        stats.add(milliseconds, rows, size)
+
+
+def size(rows: list) -> int:
+    """
+    Примерный объём данных записей: длина строк в кодировке utf-8 и по
+    8 байт на каждое число. Вложенные значения не учитываются.
+
+    Args:
+        rows (list): список записей Book или кортежей.
+
+    Returns:
+        size (int): объём данных в байтах.
+    """
+    total = 0
+    for row in rows:
+        try:
+            values = iter(row)
+        except TypeError:
+            continue
+        for value in values:
+            if type(value) == str:
+                total += len(value.encode('utf-8'))
+            elif type(value) in (int, float):
+                total += 8
+    return total
+
+
+def rows_of(args: tuple, result) -> [None, list]:
+    """
+    Строки операции: результат, а если результат не список - первый
+    аргумент-список (например, записи, которые добавляются в дерево).
+
+    Args:
+        args (tuple): позиционные аргументы операции.
+
+        result: результат операции.
+
+    Returns:
+        rows (list, optional): список строк или None.
+    """
+    for value in (result,) + args:
+        if type(value) == list:
+            return value
+    return None
+
+
+def profile(operation: str = None, threshold: float = 0) -> None:
+    """
+    Профилирование одного медленного вызова: каждый следующий вызов
+    операции выполняется под cProfile, пока один из них не окажется
+    дольше порога - его профиль сохраняется в profiles, после чего
+    профилирование отключается. Замеры при этом включаются.
+
+    Args:
+        operation (str, optional): имя операции, по умолчанию - любая
+        замеряемая операция.
+
+        threshold (float, optional): порог длительности в миллисекундах.
+    """
+    global armed, profile_operation, profile_threshold
+    with lock:
+        armed = True
+        profile_operation = operation
+        profile_threshold = threshold
+    enable()
+
+
+def start_profile(operation: str) -> [None, 'cProfile.Profile']:
+    """
+    Запуск профилировщика для вызова операции, если для неё ожидается
+    профилирование и другой вызов не профилируется в данный момент.
+
+    Args:
+        operation (str): имя операции.
+
+    Returns:
+        profiler (Profile, optional): запущенный профилировщик.
+    """
+    global profiling
+    with lock:
+        if not armed or profiling or profile_operation not in (None,
+                                                               operation):
+            return None
+        profiling = True
+    # Профилировщик импортируется только при первом профилировании, чтобы
+    # не замедлять запуск приложения
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def stop_profile(profiler: 'cProfile.Profile', operation: str,
+                 milliseconds: float) -> None:
+    """
+    Остановка профилировщика: профиль сохраняется, если вызов оказался
+    дольше порога.
+
+    Args:
+        profiler (Profile): запущенный профилировщик.
+
+        operation (str): имя операции.
+
+        milliseconds (float): время выполнения в миллисекундах.
+    """
+    global armed, profiling
+    profiler.disable()
+    with lock:
+        profiling = False
+        if milliseconds < profile_threshold:
+            return None
+        armed = False
+
+    import pstats
+    text = io.StringIO()
+    pstats.Stats(profiler, stream=text).sort_stats(
+        'cumulative').print_stats(PROFILE_LINES)
+    with lock:
+        profiles[operation] = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'duration_ms': round(milliseconds, 3),
+            'stats': text.getvalue()}
+
+
+def call(operation: str, function, *args, **kwargs):
+    """
+    Выполнение операции с замером времени, количества строк и объёма
+    данных (и профилированием, если оно ожидается).
+
+    Args:
+        operation (str): имя операции.
+
+        function (callable): выполняемая функция.
+
+    Returns:
+        result: результат функции.
+    """
+    profiler = start_profile(operation) if armed else None
+    start = time.perf_counter()
+    try:
+        result = function(*args, **kwargs)
+    finally:
+        milliseconds = (time.perf_counter() - start) * 1000
+        if profiler is not None:
+            stop_profile(profiler, operation, milliseconds)
+    rows = rows_of(args, result)
+    if rows is None:
+        record(operation, milliseconds)
+    else:
+        record(operation, milliseconds, len(rows), size(rows))
+    return result
+
+
+def timed(operation=None):
+    """
+    Декоратор замера функции или метода. При выключенных замерах функция
+    вызывается напрямую после проверки флага enabled.
+
+    Args:
+        operation (str, callable, optional): имя операции или функция,
+        которая получает первый аргумент (например, self) и возвращает
+        имя. По умолчанию - полное имя функции (например, App.replace_books).
+
+    Returns:
+        decorator (callable): декоратор.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+            if operation is None:
+                name = function.__qualname__
+            elif callable(operation):
+                name = operation(args[0])
+            else:
+                name = operation
+            return call(name, function, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def snapshot() -> dict:
+    """
+    Получение накопленных замеров.
+
+    Returns:
+        snapshot (dict): время, признак включения, счётчики по операциям
+        (по убыванию общего времени) и сохранённые профили.
+    """
+    with lock:
+        stats = sorted(operations.items(), key=lambda item: -item[1].total)
+        return {'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'enabled': enabled,
+                'buckets_ms': BUCKETS,
+                'operations': {name: value.as_dict() for name, value in stats},
+                'profiles': dict(profiles)}
+
+
+def dump(path: str, **extra) -> dict:
+    """
+    Сохранение накопленных замеров в файл json.
+
+    Args:
+        path (str): путь к файлу.
+
+        **extra: дополнительные разделы (например, счётчики кэша).
+
+    Returns:
+        snapshot (dict): сохранённые замеры.
+    """
+    result = snapshot()
+    result.update(extra)
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(result, file, ensure_ascii=False, indent=2)
+    return result
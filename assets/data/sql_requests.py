@@ -1,4 +1,647 @@
+import contextlib
+import copy
+import json
+import logging
+import re
 import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from assets.data import logger, metrics
+
+log = logger.get('sql_requests')
+
+DB_PATH = './assets/data/library.db'
+
+# Тексты запросов неизменны, поэтому sqlite3 компилирует каждый из них один
+# раз и затем берёт подготовленное выражение из кэша подключения
+####################################################
+QUERIES = {
+    'INSERT': 'INSERT INTO Books (author, title, year, status) '
+              'VALUES (?, ?, ?, ?)',
+    'UPDATE': 'UPDATE Books SET author = ?, title = ?, year = ?, status = ? '
+              'WHERE id = ?',
+    'DELETE': 'DELETE FROM Books WHERE id = ?',
+    'WHERE': 'SELECT * FROM Books WHERE author = ? OR title = ? OR year = ?',
+    'CREATE': '''CREATE TABLE IF NOT EXISTS Books (
+                id INTEGER PRIMARY KEY,
+                author TEXT NOT NULL,
+                title TEXT NOT NULL,
+                year INTEGER NOT NULL,
+                status INTEGER NOT NULL)''',
+    'SELECT': 'SELECT * FROM Books',
+    'BOOK': 'SELECT * FROM Books WHERE id = ?',
+    'SEARCH': 'SELECT Books.* FROM BooksSearch '
+              'JOIN Books ON Books.id = BooksSearch.rowid '
+              'WHERE BooksSearch MATCH ? AND (? IS NULL OR Books.year = ?) '
+              'ORDER BY BooksSearch.rank LIMIT ?',
+    'SEARCH_SHORT': 'SELECT Books.* FROM BooksSearch '
+                    'JOIN Books ON Books.id = BooksSearch.rowid '
+                    'WHERE BooksSearch MATCH ? '
+                    'AND (? IS NULL OR Books.year = ?) '
+                    'ORDER BY BooksSearch.rowid LIMIT ?',
+    'YEAR': 'SELECT * FROM Books WHERE year = ? ORDER BY id LIMIT ?',
+    'NEXT': 'SELECT * FROM Books WHERE id > ? ORDER BY id LIMIT ?',
+    'PREVIOUS': 'SELECT * FROM Books WHERE id < ? ORDER BY id DESC LIMIT ?',
+    'STATUS': 'UPDATE Books SET status = ? WHERE id = ?',
+    # Шаблон: количество параметров зависит от количества id в пачке
+    'BOOKS': 'SELECT * FROM Books WHERE id IN ({}) ORDER BY id',
+    'JOURNAL': 'SELECT seq, time, operation, book_id, changes '
+               'FROM BooksJournal WHERE seq > ? ORDER BY seq LIMIT ?',
+    'JOURNAL_FIRST': 'SELECT min(seq) FROM BooksJournal',
+    'JOURNAL_LAST': "SELECT seq FROM sqlite_sequence "
+                    "WHERE name = 'BooksJournal'",
+    'JOURNAL_AGE': 'SELECT seq FROM BooksJournal WHERE time >= ? '
+                   'ORDER BY seq LIMIT 1',
+    'JOURNAL_TRIM': 'DELETE FROM BooksJournal WHERE seq <= ?',
+}
+
+# Полнотекстовый индекс по автору и названию (сортировка результатов по
+# rank, то есть bm25). Индекс без хранения содержимого (content=''), в него
+# записывается текст с заменой ё на е, а регистр символов (в том числе
+# кириллицы) учитывает токенизатор unicode61. Префиксные индексы для 1-3
+# первых букв слов ускоряют поиск по мере ввода с первой буквы. Триггеры
+# поддерживают индекс в актуальном состоянии при любых изменениях таблицы
+# Books
+####################################################
+NORMALIZE = "replace(replace({0}, 'ё', 'е'), 'Ё', 'Е')"
+
+SEARCH_SCHEMA = '''
+CREATE VIRTUAL TABLE BooksSearch USING fts5(
+    author, title, content='', prefix='1 2 3',
+    tokenize='unicode61 remove_diacritics 2');
+
+CREATE TRIGGER Books_search_insert AFTER INSERT ON Books BEGIN
+    INSERT INTO BooksSearch (rowid, author, title)
+    VALUES (new.id, {new_author}, {new_title});
+END;
+
+CREATE TRIGGER Books_search_delete AFTER DELETE ON Books BEGIN
+    INSERT INTO BooksSearch (BooksSearch, rowid, author, title)
+    VALUES ('delete', old.id, {old_author}, {old_title});
+END;
+
+CREATE TRIGGER Books_search_update AFTER UPDATE OF author, title ON Books
+BEGIN
+    INSERT INTO BooksSearch (BooksSearch, rowid, author, title)
+    VALUES ('delete', old.id, {old_author}, {old_title});
+    INSERT INTO BooksSearch (rowid, author, title)
+    VALUES (new.id, {new_author}, {new_title});
+END;
+
+INSERT INTO BooksSearch (rowid, author, title)
+SELECT id, {author}, {title} FROM Books;
+'''.format(**{name: NORMALIZE.format(name.replace('_', '.'))
+              for name in ('new_author', 'new_title', 'old_author',
+                           'old_title', 'author', 'title')})
+
+# Наибольшее количество найденных книг и длина слова, начиная с которой
+# результаты сортируются по релевантности: если все слова запроса короче,
+# совпадает большая часть каталога и сортировка всех совпадений по bm25
+# слишком долгая - первые SEARCH_LIMIT книг выдаются в порядке id
+SEARCH_LIMIT = 1000
+SEARCH_RANKED = 3
+
+# Журнал изменений каталога: триггеры записывают каждое изменение таблицы
+# Books с возрастающим номером seq (AUTOINCREMENT - номера не повторяются
+# и после удаления записей журнала), временем в миллисекундах, операцией,
+# id книги и значениями столбцов: для UPDATE - новые значения только
+# изменённых столбцов (json_patch убирает неизменённые столбцы со значением
+# NULL), для INSERT - добавленная запись, для DELETE - удалённая. Id
+# удалённой книги может быть выдан новой книге (у Books.id нет
+# AUTOINCREMENT), поэтому запись в журнале не зависит от текущей таблицы
+####################################################
+NOW = "CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER)"
+
+JOURNAL_TRIGGERS = '''
+CREATE TRIGGER Books_journal_insert AFTER INSERT ON Books BEGIN
+    INSERT INTO BooksJournal (time, operation, book_id, changes)
+    VALUES ({now}, 'INSERT', new.id, json_object({inserted}));
+END;
+
+CREATE TRIGGER Books_journal_delete AFTER DELETE ON Books BEGIN
+    INSERT INTO BooksJournal (time, operation, book_id, changes)
+    VALUES ({now}, 'DELETE', old.id, json_object({deleted}));
+END;
+
+CREATE TRIGGER Books_journal_update AFTER UPDATE ON Books
+WHEN {changed} BEGIN
+    INSERT INTO BooksJournal (time, operation, book_id, changes)
+    VALUES ({now}, 'UPDATE', new.id, json_patch('{{}}', json_object({values})));
+END;
+'''.format(
+    now=NOW,
+    inserted=', '.join(f"'{name}', new.{name}"
+                       for name in ('author', 'title', 'year', 'status')),
+    deleted=', '.join(f"'{name}', old.{name}"
+                      for name in ('author', 'title', 'year', 'status')),
+    changed=' OR '.join(f'old.{name} IS NOT new.{name}'
+                        for name in ('author', 'title', 'year', 'status')),
+    values=', '.join(f"'{name}', CASE WHEN old.{name} IS NOT new.{name} "
+                     f"THEN new.{name} END"
+                     for name in ('author', 'title', 'year', 'status')))
+
+JOURNAL_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS BooksJournal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    time INTEGER NOT NULL,
+    operation TEXT NOT NULL,
+    book_id INTEGER NOT NULL,
+    changes TEXT);
+''' + JOURNAL_TRIGGERS
+
+# Хранимое количество записей журнала, срок их хранения в днях и
+# наибольшее количество записей в одном ответе changes_since
+JOURNAL_KEEP = 100000
+JOURNAL_DAYS = 365
+JOURNAL_PAGE = 1000
+
+# Слово в понимании токенизатора unicode61: буквы и цифры, остальные
+# символы - разделители
+WORD = re.compile(r'[^\W_]+')
+
+# Миграции схемы базы данных. Номер последней применённой миграции хранится
+# в PRAGMA user_version, новые миграции добавляются только в конец списка
+####################################################
+MIGRATIONS = (
+    # 1: основная таблица каталога
+    QUERIES['CREATE'],
+
+    # 2: полнотекстовый поиск (пересоздаётся, если был создан до миграций)
+    '''
+    DROP TRIGGER IF EXISTS Books_search_insert;
+    DROP TRIGGER IF EXISTS Books_search_delete;
+    DROP TRIGGER IF EXISTS Books_search_update;
+    DROP TABLE IF EXISTS BooksSearch;
+    ''' + SEARCH_SCHEMA,
+
+    # 3: индексы для точного поиска по автору/названию (покрывающие для
+    # SELECT *), поиска по году и отбора по статусу; порядок по id
+    # обеспечивает первичный ключ
+    '''
+    CREATE INDEX IF NOT EXISTS Books_author
+        ON Books (author, title, year, status);
+    CREATE INDEX IF NOT EXISTS Books_title
+        ON Books (title, author, year, status);
+    CREATE INDEX IF NOT EXISTS Books_year ON Books (year);
+    CREATE INDEX IF NOT EXISTS Books_status ON Books (status);
+    ANALYZE;
+    ''',
+
+    # 4: журнал изменений каталога
+    JOURNAL_SCHEMA,
+
+    # 5: значения добавленных и удалённых книг в журнале изменений
+    '''
+    DROP TRIGGER IF EXISTS Books_journal_insert;
+    DROP TRIGGER IF EXISTS Books_journal_delete;
+    DROP TRIGGER IF EXISTS Books_journal_update;
+    ''' + JOURNAL_TRIGGERS,
+
+    # 6: префиксные индексы полнотекстового поиска (параметры таблицы fts5
+    # не изменяются, поэтому индекс создаётся заново)
+    '''
+    DROP TRIGGER IF EXISTS Books_search_insert;
+    DROP TRIGGER IF EXISTS Books_search_delete;
+    DROP TRIGGER IF EXISTS Books_search_update;
+    DROP TABLE IF EXISTS BooksSearch;
+    ''' + SEARCH_SCHEMA,
+)
+
+# Запросы чтения, результаты которых сохраняются в кэше, и наибольшее
+# количество результатов в кэше
+####################################################
+READS = ('WHERE', 'SEARCH', 'SELECT', 'BOOK', 'NEXT', 'PREVIOUS')
+CACHE_SIZE = 128
+
+# Количество id в одном запросе BOOKS и количество книг в массовом
+# изменении, после которого кэш очищается полностью, а не точечно
+IDS_CHUNK = 500
+INVALIDATE_LIMIT = 32
+
+# Столбцы таблицы Books, условия отбора конструктора запросов Query (имя
+# столбца подставляется только после проверки по COLUMNS) и количество
+# строк, которые курсор получает за один раз при переборе результата
+COLUMNS = ('id', 'author', 'title', 'year', 'status')
+CONDITIONS = {
+    '=': '{} = ?',
+    '>=': '{} >= ?',
+    '<=': '{} <= ?',
+    'in': '{} IN (SELECT value FROM json_each(?))',
+    'match': '{} IN (SELECT rowid FROM BooksSearch WHERE BooksSearch MATCH ?)',
+}
+FETCH_SIZE = 500
+
+PRAGMAS = (
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA cache_size = -16000',
+    'PRAGMA busy_timeout = 5000',
+)
+
+
+STATUS_LABELS = {1: 'В наличии', 0: 'Выдана'}
+
+
+class Book:
+    """
+    Основное применение - компактная запись о книге, которую возвращают
+    запросы чтения (экземпляры без __dict__, только слоты столбцов).
+    Текстовый статус и значения для строки дерева вычисляются при
+    обращении и не хранятся.
+
+    Args:
+        id (int): уникальный идентификационный номер.
+
+        author (str): автор книги.
+
+        title (str): название книги.
+
+        year (int): год издания книги.
+
+        status (int): статус книги (1 - в наличии, 0 - выдана).
+    """
+
+    __slots__ = ('id', 'author', 'title', 'year', 'status')
+
+    def __init__(self, id: int, author: str, title: str, year: int,
+                 status: int):
+        self.id = id
+        self.author = author
+        self.title = title
+        self.year = year
+        self.status = status
+
+    @property
+    def status_label(self) -> str:
+        """
+        Текстовое обозначение статуса книги.
+        """
+        return STATUS_LABELS.get(self.status, 'Выдана')
+
+    @property
+    def values(self) -> tuple:
+        """
+        Значения столбцов строки дерева записей с текстовым статусом.
+        """
+        return self.id, self.author, self.title, self.year, self.status_label
+
+    def __iter__(self):
+        return iter((self.id, self.author, self.title, self.year,
+                     self.status))
+
+    def __getitem__(self, index: [int, slice]):
+        return tuple(self)[index]
+
+    def __len__(self) -> int:
+        return len(self.__slots__)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (Book, tuple)):
+            return NotImplemented
+        return tuple(self) == tuple(other)
+
+    def __repr__(self) -> str:
+        return f'Book{tuple(self)!r}'
+
+
+def book_factory(cursor: sqlite3.Cursor, row: tuple) -> Book:
+    """
+    Фабрика строк sqlite3: преобразование строки таблицы Books в Book.
+
+    Args:
+        cursor (sqlite3.Cursor): курсор, выполнивший запрос.
+
+        row (tuple): строка результата запроса.
+
+    Returns:
+        book (Book): запись о книге.
+    """
+    return Book(*row)
+
+
+def affected(key: tuple, books: list, ids: set, old: Book,
+             new: Book) -> bool:
+    """
+    Проверка, может ли изменение одной книги изменить сохранённый в кэше
+    результат запроса.
+
+    Args:
+        key (tuple): ключ результата - имя запроса и его аргументы.
+
+        books (list): сохранённый результат запроса.
+
+        ids (set): id книг в сохранённом результате.
+
+        old (Book, optional): запись о книге до изменения (None - книга
+        добавлена).
+
+        new (Book, optional): запись о книге после изменения (None - книга
+        удалена).
+
+    Returns:
+        affected (bool): True, если результат нужно удалить из кэша.
+    """
+    name, book_author, book_title, book_year, book_id, limit = key
+    if old is not None and old.id in ids:
+        return True
+    # Добавление, удаление и изменение текста любой книги меняют
+    # статистику bm25, поэтому порядок и состав первых limit результатов
+    # поиска могут измениться, даже если книги в них не было
+    if name == 'SEARCH':
+        return old is None or new is None or (
+            old.author, old.title, old.year) != (
+            new.author, new.title, new.year)
+    if new is None:
+        return False
+    if new.id in ids:
+        return True
+
+    # Книги не было в результате - проверяется, попадёт ли она в него
+    if name == 'SELECT':
+        return True
+    elif name == 'BOOK':
+        return new.id == book_id
+    elif name == 'WHERE':
+        return (new.author == book_author or new.title == book_title or
+                str(new.year) == str(book_year))
+    elif name == 'NEXT':
+        return new.id > book_id and (
+                len(books) < limit or new.id < books[-1].id)
+    elif name == 'PREVIOUS':
+        return new.id < book_id and (
+                len(books) < limit or new.id > books[0].id)
+    return True
+
+
+class Cache:
+    """
+    Основное применение - хранение результатов запросов чтения с
+    вытеснением давно не использованных (LRU) и точечной очисткой при
+    изменении книг.
+
+    Args:
+        size (int, optional): наибольшее количество результатов в кэше.
+
+    Methods:
+        get(): получение результата из кэша (учитываются попадания и
+        промахи).
+
+        put(): сохранение результата в кэше.
+
+        invalidate(): удаление результатов, затронутых изменением книги.
+
+        clear(): полная очистка кэша.
+
+        stats(): счётчики работы кэша.
+    """
+
+    def __init__(self, size: int = CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: tuple) -> [None, list]:
+        """
+        Получение результата запроса из кэша.
+
+        Args:
+            key (tuple): имя запроса и его аргументы.
+
+        Returns:
+            books (list, optional): сохранённый результат или None.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: tuple, books: list) -> None:
+        """
+        Сохранение результата запроса в кэше.
+
+        Args:
+            key (tuple): имя запроса и его аргументы.
+
+            books (list): результат запроса.
+        """
+        self.entries[key] = (books, {book.id for book in books})
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, old: Book, new: Book) -> None:
+        """
+        Удаление из кэша результатов, которые могли измениться после
+        добавления, изменения или удаления книги.
+
+        Args:
+            old (Book, optional): запись о книге до изменения.
+
+            new (Book, optional): запись о книге после изменения.
+        """
+        for key in [key for key, (books, ids) in self.entries.items()
+                    if affected(key, books, ids, old, new)]:
+            del self.entries[key]
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        """
+        Полная очистка кэша (массовые изменения, изменения другими
+        подключениями).
+        """
+        self.invalidations += len(self.entries)
+        self.entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Получение счётчиков работы кэша.
+
+        Returns:
+            stats (dict): попадания, промахи, доля попаданий, удалённые
+            результаты и текущий размер кэша.
+        """
+        total = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0,
+                'invalidations': self.invalidations,
+                'size': len(self.entries)}
+
+
+class Connection:
+    """
+    Основное применение - хранение одного долгоживущего подключения к базе
+    данных, которое используют все экземпляры класса Request.
+
+    Args:
+        path (str): путь к файлу базы данных.
+
+    Methods:
+        get(): возвращает открытое подключение, при первом обращении
+        открывает его и настраивает pragma (WAL-журнал и т.д.).
+
+        open(): переключение на другой файл базы данных.
+
+        close(): закрытие подключения при завершении работы приложения.
+
+        interrupt(): прерывание выполняемого запроса.
+
+        version(): текущая версия данных для проверки изменений.
+
+        check_version(): очистка кэша при изменениях другими подключениями.
+
+        transaction(): транзакция одной операции записи.
+
+        group(): группа операций записи с одной фиксацией (group commit).
+    """
+
+    # Подключение к серверу каталога (client.RemoteConnection) выполняет
+    # запросы через HTTP, а не через sqlite3
+    remote = False
+
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        self.lock = threading.RLock()
+        self.writes = 0
+        self.cache = Cache()
+        self.grouped = False
+        self._data_version = None
+        self._connection = None
+
+    def get(self) -> sqlite3.Connection:
+        """
+        Получение открытого подключения к базе данных.
+
+        Returns:
+            connection (sqlite3.Connection): подключение к базе данных.
+        """
+        with self.lock:
+            if self._connection is None:
+                connection = sqlite3.connect(self.path,
+                                             check_same_thread=False,
+                                             cached_statements=128)
+                for pragma in PRAGMAS:
+                    connection.execute(pragma)
+                self._connection = connection
+            return self._connection
+
+    def open(self, path: str) -> None:
+        """
+        Закрытие текущего подключения и переключение на другой файл базы
+        данных (новое подключение откроется при первом запросе).
+
+        Args:
+            path (str): путь к файлу базы данных.
+        """
+        with self.lock:
+            self.close()
+            self.cache.clear()
+            self.path = path
+
+    def interrupt(self) -> None:
+        """
+        Прерывание выполняемого запроса (вызывается из другого потока,
+        поэтому блокировка подключения не используется).
+        """
+        if self._connection is not None:
+            self._connection.interrupt()
+
+    def version(self) -> tuple:
+        """
+        Получение версии данных: счётчик операций записи через данное
+        подключение и PRAGMA data_version, который меняется при фиксации
+        транзакций другими подключениями (другие копии приложения).
+
+        Returns:
+            version (tuple): пара (writes, data_version).
+        """
+        with self.lock:
+            data_version = self.get().execute('PRAGMA data_version')
+            return self.writes, data_version.fetchone()[0]
+
+    def check_version(self) -> None:
+        """
+        Проверка PRAGMA data_version: если другое подключение (другая копия
+        приложения) зафиксировало изменения, кэш результатов очищается.
+        """
+        with self.lock:
+            data_version = self.get().execute(
+                'PRAGMA data_version').fetchone()[0]
+            if data_version != self._data_version:
+                self.cache.clear()
+                self._data_version = data_version
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Транзакция операции записи: фиксация при успешном выполнении и
+        откат при ошибке. Внутри группы (group()) операция выполняется в
+        точке сохранения - при ошибке откатывается только она, а фиксация
+        выполняется один раз для всей группы.
+
+        Yields:
+            connection (sqlite3.Connection): подключение к базе данных.
+        """
+        connection = self.get()
+        if not self.grouped:
+            with connection:
+                yield connection
+            return None
+
+        connection.execute('SAVEPOINT operation')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK TO operation')
+            raise
+        finally:
+            connection.execute('RELEASE operation')
+
+    @contextlib.contextmanager
+    def group(self):
+        """
+        Группа операций записи в одной транзакции с одной фиксацией
+        (group commit): операции внутри группы используют transaction() и
+        не фиксируют изменения по отдельности.
+
+        Yields:
+            connection (sqlite3.Connection): подключение к базе данных.
+        """
+        with self.lock:
+            connection = self.get()
+            connection.execute('BEGIN IMMEDIATE')
+            self.grouped = True
+            try:
+                yield connection
+            except BaseException:
+                connection.rollback()
+                raise
+            else:
+                connection.commit()
+            finally:
+                self.grouped = False
+
+    def close(self) -> None:
+        """
+        Закрытие подключения к базе данных. Перед закрытием выполняется
+        PRAGMA optimize для обновления статистики планировщика запросов.
+        """
+        with self.lock:
+            if self._connection is not None:
+                try:
+                    self._connection.execute('PRAGMA optimize')
+                finally:
+                    self._connection.close()
+                    self._connection = None
 
 
 class Request:
@@ -9,25 +652,33 @@ class Request:
         name (str): имя для экземпляра класса, которое является отображением
         одного из типов запросов в sql.
 
+        database (Connection, optional): подключение к базе данных. По
+        умолчанию используется общее для модуля подключение.
+
     Methods:
         connection_with_request():
             основной метод класса - который представляет из себя
-            подключение к базе данных, а затем исходя из атрибута его
-            экземпляра осуществляет тот или иной запрос (при необходимости
-            возвращая значения из базы данных), после окончания работы
-            производит закрытие базы данных.
+            обращение к общему подключению к базе данных, а затем исходя из
+            атрибута его экземпляра осуществляет тот или иной запрос (при
+            необходимости возвращая значения из базы данных). Запрос, его
+            параметры и время выполнения записываются в журнал, а при
+            включённых замерах (metrics) - в счётчики операции.
+
+        execute(): выполнение запроса без записи в журнал.
     """
 
-    def __init__(self, name):
+    def __init__(self, name, database: Connection = None):
         self.name = name
+        self.database = database
 
+    @metrics.timed(lambda request: request.name)
     def connection_with_request(self, book_author: str = None, book_title: str
     = None, book_year: int = None, book_status: int = None,
-                                book_id: int = None) -> [None, list]:
+                                book_id: int = None,
+                                limit: int = None) -> [None, int, list]:
         """
-        Создание модального окна верхнего уровня при взаимодействии
-        пользователя с инструментами основного меню.
-            
+        Выполнение запроса к базе данных согласно типу экземпляра класса.
+
         Args:
             book_author (str, optional): столбец для автора книги.
 
@@ -38,58 +689,1048 @@ class Request:
             book_status (int, optional): столбец для указания статуса книги.
 
             book_id (int, optional): столбец для уникального
-            идентификационного номера.
+            идентификационного номера. Для запросов NEXT/PREVIOUS -
+            граница страницы (keyset-пагинация по id).
+
+            limit (int, optional): размер страницы для запросов
+            NEXT/PREVIOUS.
 
         Returns:
-            books (list, optional): формируется список из кортежей/а в
-            каждом из которых вся информация по книге/ам
+            books (list, optional): формируется список из записей Book в
+            каждой из которых вся информация по книге/ам
+
+            book_id (int, optional): id добавленной, изменённой или
+            удалённой книги для запросов INSERT/UPDATE/DELETE.
         """
-        connection = sqlite3.connect('./assets/data/library.db')
-        cursor = connection.cursor()
+        start = time.perf_counter()
+        try:
+            result = self.execute(book_author, book_title, book_year,
+                                  book_status, book_id, limit)
+        except sqlite3.Error:
+            log.exception('Ошибка запроса %s', self.name, extra={
+                'operation': self.name,
+                'params': parameters(book_author, book_title, book_year,
+                                     book_status, book_id, limit),
+                'duration_ms': round((time.perf_counter() - start) * 1000, 3)})
+            raise
 
-        if self.name == 'INSERT':
-            cursor.execute(
-                'INSERT INTO Books (author, title, year, status) VALUES (?, ?, ?, ?)',
-                (book_author, book_title, book_year, book_status))
+        # Запросы чтения записываются в журнал только на уровне DEBUG,
+        # запись формируется лишь при включённом уровне
+        level = logging.DEBUG if self.name in READS else logging.INFO
+        if log.isEnabledFor(level):
+            log.log(level, 'Запрос %s', self.name, extra={
+                'operation': self.name,
+                'params': parameters(book_author, book_title, book_year,
+                                     book_status, book_id, limit),
+                'duration_ms': round((time.perf_counter() - start) * 1000, 3),
+                'rows': len(result) if type(result) == list else None,
+                'book_id': result if type(result) == int else None})
+        return result
 
-        elif self.name == 'UPDATE':
-            cursor.execute(
-                f'UPDATE Books SET author = ?, title = ?, year = ?, status = ? WHERE id = ?',
-                (book_author, book_title, book_year, book_status, book_id))
+    def execute(self, book_author: str = None, book_title: str = None,
+                book_year: int = None, book_status: int = None,
+                book_id: int = None, limit: int = None) -> [None, int, list]:
+        """
+        Выполнение запроса без замера времени и записи в журнал (аргументы
+        и результат - как у connection_with_request).
+        """
+        database = self.database or connection
+        if database.remote:
+            return database.request(self.name, book_author, book_title,
+                                    book_year, book_status, book_id, limit)
+        query = QUERIES[self.name]
 
-        elif self.name == 'DELETE':
-            cursor.execute(f'DELETE FROM Books WHERE id = {book_id}')
+        with database.lock:
+            cursor = database.get().cursor()
+            cursor.row_factory = book_factory
 
-        elif self.name == 'WHERE':
-            cursor.execute(
-                'SELECT * FROM Books WHERE author = ? OR title = ? OR year = ?',
-                (book_author, book_title, book_year))
-            books = cursor.fetchall()
-            return books
+            # Результаты запросов чтения берутся из кэша, если данные не
+            # изменялись другими подключениями
+            if self.name in READS:
+                database.check_version()
+                key = (self.name, book_author, book_title, book_year, book_id,
+                       limit)
+                books = database.cache.get(key)
+                if books is not None:
+                    return list(books)
+
+                if self.name == 'WHERE':
+                    books = fetch(cursor, self.name, query,
+                                  (book_author, book_title, book_year))
+
+                elif self.name == 'SEARCH':
+                    books = search(cursor, book_author, book_title, book_year,
+                                   limit or SEARCH_LIMIT)
+
+                elif self.name == 'SELECT':
+                    books = fetch(cursor, self.name, query)
+
+                elif self.name == 'BOOK':
+                    books = fetch(cursor, self.name, query, (book_id,))
+
+                elif self.name == 'NEXT':
+                    books = fetch(cursor, self.name, query, (book_id, limit))
+
+                elif self.name == 'PREVIOUS':
+                    # Страница выбирается в обратном порядке от границы и
+                    # разворачивается для отображения по возрастанию id
+                    books = fetch(cursor, self.name, query,
+                                  (book_id, limit))[::-1]
+
+                database.cache.put(key, books)
+                return list(books)
+
+            # Для точечной очистки кэша запоминается запись о книге до
+            # изменения
+            old = None
+            if self.name in ('UPDATE', 'DELETE'):
+                cursor.execute(QUERIES['BOOK'], (book_id,))
+                old = cursor.fetchone()
+
+            # Операции записи выполняются в транзакции, которая
+            # автоматически фиксируется или откатывается при ошибке
+            with database.transaction():
+                if self.name == 'INSERT':
+                    cursor.execute(query, (book_author, book_title,
+                                           book_year, book_status))
+
+                elif self.name == 'UPDATE':
+                    cursor.execute(query, (book_author, book_title,
+                                           book_year, book_status, book_id))
+
+                elif self.name == 'DELETE':
+                    cursor.execute(query, (book_id,))
+
+                elif self.name == 'CREATE':
+                    cursor.execute(query)
+                    database.cache.clear()
+                    return None
+
+            if self.name == 'INSERT':
+                book_id = cursor.lastrowid
+            new = None
+            if self.name == 'INSERT' or (self.name == 'UPDATE' and old):
+                new = Book(book_id, book_author, book_title, book_year,
+                           book_status)
+
+            database.writes += 1
+            database.cache.invalidate(old, new)
+            return book_id
+
+
+def fetch(cursor: sqlite3.Cursor, name: str, query: str,
+          params: tuple = ()) -> list:
+    """
+    Выполнение запроса чтения и получение всех строк. При включённых
+    замерах отдельно замеряется выполнение запроса в sqlite3 (до первой
+    строки) и получение строк через fetchall.
+
+    Args:
+        cursor (sqlite3.Cursor): курсор подключения к базе данных.
+
+        name (str): имя запроса для замеров.
+
+        query (str): текст запроса.
+
+        params (tuple, optional): параметры запроса.
+
+    Returns:
+        books (list): список записей Book.
+    """
+    if not metrics.enabled:
+        return cursor.execute(query, params).fetchall()
+
+    start = time.perf_counter()
+    cursor.execute(query, params)
+    executed = time.perf_counter()
+    books = cursor.fetchall()
+    metrics.record(f'{name}.execute', (executed - start) * 1000)
+    metrics.record(f'{name}.fetchall', (time.perf_counter() - executed) * 1000,
+                   len(books))
+    return books
+
+
+def parameters(book_author: str = None, book_title: str = None,
+               book_year: int = None, book_status: int = None,
+               book_id: int = None, limit: int = None) -> dict:
+    """
+    Формирование параметров запроса для записи в журнал (пустые
+    параметры не включаются).
+
+    Returns:
+        params (dict): указанные параметры запроса.
+    """
+    params = {'author': book_author, 'title': book_title, 'year': book_year,
+              'status': book_status, 'id': book_id, 'limit': limit}
+    return {name: value for name, value in params.items()
+            if value is not None}
+
+
+def match_expression(book_author: str = None,
+                     book_title: str = None) -> [None, str]:
+    """
+    Формирование выражения MATCH для полнотекстового поиска: каждое слово
+    ищется по префиксу в своём столбце, все слова должны совпасть.
+
+    Args:
+        book_author (str, optional): слова для поиска по автору книги.
+
+        book_title (str, optional): слова для поиска по названию книги.
+
+    Returns:
+        expression (str, optional): выражение для MATCH или None, если
+        слова для поиска не указаны.
+    """
+    terms = []
+    for column, text in (('author', book_author), ('title', book_title)):
+        for word in (text or '').replace('ё', 'е').replace('Ё', 'Е').split():
+            word = word.replace('"', '""')
+            terms.append(f'{column} : "{word}"*')
+    return ' AND '.join(terms) or None
+
+
+def search_year(book_year: [int, str] = None) -> [None, int]:
+    """
+    Преобразование года из поля поиска в число.
+
+    Args:
+        book_year (int, str, optional): год издания книги.
+
+    Returns:
+        year (int, optional): год или None, если год не указан или указан
+        не числом.
+    """
+    year = str(book_year).strip() if book_year is not None else ''
+    return int(year) if year.isdigit() else None
+
+
+def normalize(text: str) -> str:
+    """
+    Приведение текста к виду, в котором его индексирует BooksSearch: замена
+    ё на е, нижний регистр и удаление диакритических знаков у латинских
+    букв (как remove_diacritics 2 токенизатора unicode61).
+
+    Args:
+        text (str): исходный текст.
+
+    Returns:
+        text (str): нормализованный текст.
+    """
+    text = text.replace('ё', 'е').replace('Ё', 'Е').lower()
+    if text.isascii():
+        return text
+    return ''.join(
+        unicodedata.normalize('NFD', char)[0]
+        if char < '\u0250' or '\u1e00' <= char <= '\u1eff' else char
+        for char in text)
+
+
+def search_terms(text: str = None) -> [None, list]:
+    """
+    Слова поискового запроса в нормализованном виде. Слова с разделителями
+    внутри (дефис, апостроф и т.д.) ищутся в FTS5 как фраза, поэтому для
+    них возвращается None - такой запрос выполняется только в базе данных.
+
+    Args:
+        text (str, optional): текст поля поиска.
+
+    Returns:
+        terms (list, optional): список слов или None.
+    """
+    terms = normalize(text or '').split()
+    if not all(WORD.fullmatch(term) for term in terms):
+        return None
+    return terms
+
+
+def refines(previous: tuple, current: tuple) -> bool:
+    """
+    Проверка, является ли поисковый запрос уточнением предыдущего: каждое
+    слово предыдущего запроса является началом какого-либо слова нового
+    запроса в том же поле, а год не изменился или добавлен. Результат
+    уточнения - подмножество результата предыдущего запроса.
+
+    Args:
+        previous (tuple): предыдущий запрос (автор, название, год).
+
+        current (tuple): новый запрос (автор, название, год).
+
+    Returns:
+        refines (bool): True, если новый запрос уточняет предыдущий.
+    """
+    previous_year = search_year(previous[2])
+    if previous_year is not None and previous_year != search_year(
+            current[2]):
+        return False
+
+    narrowed = previous_year is not None
+    for old_text, new_text in zip(previous[:2], current[:2]):
+        old_terms, new_terms = search_terms(old_text), search_terms(new_text)
+        if old_terms is None or new_terms is None:
+            return False
+        if not all(any(new.startswith(old) for new in new_terms)
+                   for old in old_terms):
+            return False
+        narrowed = narrowed or bool(old_terms)
+    return narrowed
 
-        elif self.name == 'CREATE':
-            cursor.execute('''CREATE TABLE IF NOT EXISTS Books (
-                id INTEGER PRIMARY KEY,
-                author TEXT NOT NULL,
-                title TEXT NOT NULL,
-                year INTEGER NOT NULL,
-                status INTEGER NOT NULL)''')
 
-        elif self.name == 'SELECT':
-            cursor.execute('SELECT * FROM Books')
-            books = cursor.fetchall()
-            return books
+def matches(terms: list, text: str) -> bool:
+    """
+    Проверка, что каждое слово запроса является началом какого-либо
+    слова текста.
+
+    Args:
+        terms (list): нормализованные слова запроса.
+
+        text (str): текст (автор или название книги).
+
+    Returns:
+        matches (bool): True, если все слова найдены.
+    """
+    words = WORD.findall(normalize(text))
+    return all(any(word.startswith(term) for word in words)
+               for term in terms)
+
+
+def narrow(books: list, book_author: str = None, book_title: str = None,
+           book_year: [int, str] = None) -> list:
+    """
+    Отбор в памяти записей, которые соответствуют уточнённому запросу
+    (см. refines()). Порядок записей предыдущего результата сохраняется.
+
+    Args:
+        books (list): результат предыдущего запроса.
+
+        book_author (str, optional): слова для поиска по автору книги.
+
+        book_title (str, optional): слова для поиска по названию книги.
+
+        book_year (int, str, optional): год издания книги.
+
+    Returns:
+        books (list): список записей Book, прошедших отбор.
+    """
+    author_terms = search_terms(book_author) or []
+    title_terms = search_terms(book_title) or []
+    year = search_year(book_year)
+    return [book for book in books
+            if (year is None or book.year == year) and
+            matches(author_terms, book.author) and
+            matches(title_terms, book.title)]
+
+
+def search(cursor: sqlite3.Cursor, book_author: str = None,
+           book_title: str = None, book_year: [int, str] = None,
+           limit: int = SEARCH_LIMIT) -> list:
+    """
+    Полнотекстовый поиск книг по префиксам слов автора и названия с
+    сортировкой по релевантности (bm25), с необязательным отбором по году.
+    Если все слова короче SEARCH_RANKED букв (поиск по первым буквам при
+    вводе), книги выдаются в порядке id без сортировки всех совпадений.
+
+    Args:
+        cursor (sqlite3.Cursor): курсор подключения к базе данных.
+
+        book_author (str, optional): слова для поиска по автору книги.
+
+        book_title (str, optional): слова для поиска по названию книги.
+
+        book_year (int, str, optional): год издания книги.
+
+        limit (int, optional): наибольшее количество найденных книг.
+
+    Returns:
+        books (list): список записей Book о найденных книгах.
+    """
+    year = search_year(book_year)
+    expression = match_expression(book_author, book_title)
+
+    if expression is not None:
+        words = f'{book_author or ""} {book_title or ""}'.split()
+        ranked = max(map(len, words)) >= SEARCH_RANKED
+        return fetch(cursor, 'SEARCH',
+                     QUERIES['SEARCH' if ranked else 'SEARCH_SHORT'],
+                     (expression, year, year, limit))
+    elif year is not None:
+        return fetch(cursor, 'SEARCH', QUERIES['YEAR'], (year, limit))
+    return []
+
+
+class Query:
+    """
+    Основное применение - составление запроса чтения к таблице Books по
+    частям: отбор по столбцам (в том числе по статусу и диапазону лет) и
+    по словам автора/названия, сортировка по любому столбцу, keyset-
+    пагинация от границы страницы и выбор нужных столбцов. Экземпляр не
+    изменяется - каждый метод возвращает новый запрос, поэтому общие части
+    можно переиспользовать:
+
+        query = Query().filter(status=1).order_by('title')
+        page = query.limit(100).fetch()
+        following = query.limit(100).after(*query.key(page[-1])).fetch()
+
+    Перебор запроса (for book in query) получает строки курсора пачками
+    по FETCH_SIZE, не загружая весь результат в память.
+
+    Args:
+        database (Connection, optional): подключение к базе данных. По
+        умолчанию используется общее для модуля подключение.
+
+    Methods:
+        filter(): отбор по значениям столбцов.
+
+        search(): отбор по префиксам слов автора и названия.
+
+        order_by(): сортировка по столбцу (при равенстве - по id).
+
+        columns(): выбор столбцов результата.
+
+        limit(): наибольшее количество строк.
+
+        after(), before(): страница после или перед границей.
+
+        key(): граница страницы для записи результата.
+
+        sql(): текст и параметры запроса.
+
+        fetch(): получение всех строк результата списком.
+
+        spec(), from_spec(): описание запроса для передачи серверу.
+    """
+
+    def __init__(self, database: Connection = None):
+        self.database = database
+        self.filters = ()
+        self.order = ('id', False)
+        self.fields = COLUMNS
+        self.count = None
+        self.cursor = None
+
+    def replace(self, **changes) -> 'Query':
+        """
+        Получение копии запроса с изменёнными частями.
+
+        Returns:
+            query (Query): новый запрос.
+        """
+        query = copy.copy(self)
+        for name, value in changes.items():
+            setattr(query, name, value)
+        return query
+
+    def filter(self, author: str = None, title: str = None, year: int = None,
+               status: int = None, year_from: int = None, year_to: int = None,
+               ids: list = None) -> 'Query':
+        """
+        Добавление условий отбора (все условия должны выполняться).
+
+        Args:
+            author (str, optional): автор книги (точное совпадение).
+
+            title (str, optional): название книги (точное совпадение).
+
+            year (int, optional): год издания книги.
+
+            status (int, optional): статус книги.
+
+            year_from (int, optional): наименьший год издания.
+
+            year_to (int, optional): наибольший год издания.
+
+            ids (list, optional): id книг.
 
-        connection.commit()
-        connection.close()
+        Returns:
+            query (Query): новый запрос.
+        """
+        filters = list(self.filters)
+        for column, operator, value in (
+                ('author', '=', author), ('title', '=', title),
+                ('year', '=', year), ('status', '=', status),
+                ('year', '>=', year_from), ('year', '<=', year_to)):
+            if value is not None:
+                filters.append((column, operator, value))
+        if ids is not None:
+            filters.append(('id', 'in', list(ids)))
+        return self.replace(filters=tuple(filters))
+
+    def search(self, author: str = None, title: str = None) -> 'Query':
+        """
+        Добавление отбора по префиксам слов автора и названия через
+        полнотекстовый индекс (порядок результата задаёт order_by, а не
+        релевантность).
+
+        Args:
+            author (str, optional): слова для поиска по автору книги.
+
+            title (str, optional): слова для поиска по названию книги.
+
+        Returns:
+            query (Query): новый запрос.
+        """
+        expression = match_expression(author, title)
+        if expression is None:
+            return self
+        return self.replace(
+            filters=self.filters + (('id', 'match', expression),))
+
+    def order_by(self, column: str, descending: bool = False) -> 'Query':
+        """
+        Сортировка результата по столбцу, при равных значениях - по id в
+        том же направлении. Граница страницы сбрасывается.
+
+        Args:
+            column (str): столбец из COLUMNS.
+
+            descending (bool, optional): сортировка по убыванию.
+
+        Returns:
+            query (Query): новый запрос.
+        """
+        if column not in COLUMNS:
+            raise ValueError(f'неизвестный столбец {column!r}')
+        return self.replace(order=(column, bool(descending)), cursor=None)
+
+    def columns(self, *names: str) -> 'Query':
+        """
+        Выбор столбцов результата. Строки со всеми столбцами возвращаются
+        записями Book, с выбранными - кортежами в указанном порядке.
+
+        Args:
+            *names (str): столбцы из COLUMNS (без аргументов - все).
+
+        Returns:
+            query (Query): новый запрос.
+        """
+        for name in names:
+            if name not in COLUMNS:
+                raise ValueError(f'неизвестный столбец {name!r}')
+        return self.replace(fields=tuple(names) or COLUMNS)
+
+    def limit(self, count: [None, int]) -> 'Query':
+        """
+        Ограничение количества строк результата.
+
+        Args:
+            count (int, optional): наибольшее количество строк, None - без
+            ограничения.
+
+        Returns:
+            query (Query): новый запрос.
+        """
+        return self.replace(count=None if count is None else int(count))
 
+    def after(self, value, book_id: int) -> 'Query':
+        """
+        Страница после границы в порядке сортировки (keyset-пагинация: от
+        границы выборка идёт по индексу, без пропуска OFFSET строк).
+
+        Args:
+            value: значение столбца сортировки у последней строки
+            предыдущей страницы.
+
+            book_id (int): id этой строки.
+
+        Returns:
+            query (Query): новый запрос.
+        """
+        return self.replace(cursor=(value, book_id, True))
+
+    def before(self, value, book_id: int) -> 'Query':
+        """
+        Страница перед границей в порядке сортировки. Строки выбираются в
+        обратном порядке от границы и разворачиваются.
+
+        Args:
+            value: значение столбца сортировки у первой строки следующей
+            страницы.
+
+            book_id (int): id этой строки.
+
+        Returns:
+            query (Query): новый запрос.
+        """
+        return self.replace(cursor=(value, book_id, False))
+
+    def key(self, book: Book) -> tuple:
+        """
+        Получение границы страницы для записи Book.
+
+        Args:
+            book (Book): запись результата.
+
+        Returns:
+            key (tuple): значение столбца сортировки и id.
+        """
+        return getattr(book, self.order[0]), book.id
+
+    def sql(self) -> tuple:
+        """
+        Формирование текста и параметров запроса.
+
+        Returns:
+            query (tuple): текст запроса и кортеж параметров.
+        """
+        conditions, params = [], []
+        for column, operator, value in self.filters:
+            if column not in COLUMNS or operator not in CONDITIONS:
+                raise ValueError(f'некорректное условие {column} {operator}')
+            conditions.append(CONDITIONS[operator].format(column))
+            params.append(json.dumps(value) if operator == 'in' else value)
+
+        column, descending = self.order
+        backward = self.cursor is not None and not self.cursor[2]
+        # Предыдущая страница выбирается в обратном направлении
+        reverse = descending != backward
+        if self.cursor is not None:
+            sign = '<' if reverse else '>'
+            value, book_id, _ = self.cursor
+            if column == 'id':
+                conditions.append(f'id {sign} ?')
+                params.append(book_id)
+            else:
+                conditions.append(f'({column}, id) {sign} (?, ?)')
+                params.extend((value, book_id))
+
+        direction = 'DESC' if reverse else 'ASC'
+        order = f'id {direction}' if column == 'id' else \
+            f'{column} {direction}, id {direction}'
+        query = f'SELECT {", ".join(self.fields)} FROM Books'
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += f' ORDER BY {order}'
+        if self.count is not None:
+            query += ' LIMIT ?'
+            params.append(self.count)
+        return query, tuple(params)
+
+    def __iter__(self):
+        """
+        Перебор строк результата: курсор отдаёт строки пачками по
+        FETCH_SIZE, блокировка подключения берётся только на время
+        получения пачки. Страница перед границей (before) получается
+        целиком, так как её строки разворачиваются.
 
-# Создание экземпляров класса с разными видами 
+        Yields:
+            row (Book, tuple): запись Book или кортеж выбранных столбцов.
+        """
+        database = self.database or connection
+        if database.remote:
+            yield from database.query(self.spec())
+            return None
+
+        query, params = self.sql()
+        with database.lock:
+            cursor = database.get().cursor()
+            if self.fields == COLUMNS:
+                cursor.row_factory = book_factory
+            cursor.execute(query, params)
+            if self.cursor is not None and not self.cursor[2]:
+                rows = cursor.fetchall()[::-1]
+                cursor = None
+            else:
+                rows = cursor.fetchmany(FETCH_SIZE)
+
+        while rows:
+            yield from rows
+            if cursor is None:
+                break
+            with database.lock:
+                rows = cursor.fetchmany(FETCH_SIZE)
+
+    @metrics.timed('QUERY')
+    def fetch(self) -> list:
+        """
+        Получение всех строк результата (с записью в журнал на уровне
+        DEBUG).
+
+        Returns:
+            rows (list): записи Book или кортежи выбранных столбцов.
+        """
+        start = time.perf_counter()
+        rows = list(self)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug('Запрос %s', 'QUERY', extra={
+                'operation': 'QUERY', 'params': self.spec(),
+                'duration_ms': round((time.perf_counter() - start) * 1000, 3),
+                'rows': len(rows)})
+        return rows
+
+    def spec(self) -> dict:
+        """
+        Описание запроса в виде, пригодном для json.
+
+        Returns:
+            spec (dict): условия, сортировка, столбцы, ограничение и
+            граница страницы.
+        """
+        return {'filters': [list(item) for item in self.filters],
+                'order': list(self.order),
+                'columns': list(self.fields),
+                'limit': self.count,
+                'cursor': None if self.cursor is None else list(self.cursor)}
+
+    @classmethod
+    def from_spec(cls, spec: dict, database: Connection = None) -> 'Query':
+        """
+        Восстановление запроса по описанию spec() (условия проверяются при
+        формировании текста запроса).
+
+        Args:
+            spec (dict): описание запроса.
+
+            database (Connection, optional): подключение к базе данных.
+
+        Returns:
+            query (Query): запрос.
+        """
+        query = cls(database).order_by(*spec.get('order') or ('id',))
+        query = query.columns(*spec.get('columns') or ()).limit(
+            spec.get('limit'))
+        query.filters = tuple(tuple(item) for item in spec.get('filters', ()))
+        if spec.get('cursor'):
+            value, book_id, forward = spec['cursor']
+            query.cursor = (value, book_id, bool(forward))
+        return query
+
+
+def books_by_id(cursor: sqlite3.Cursor, book_ids: list) -> list:
+    """
+    Получение записей о книгах по списку id (пачками по IDS_CHUNK).
+
+    Args:
+        cursor (sqlite3.Cursor): курсор подключения к базе данных.
+
+        book_ids (list): id книг.
+
+    Returns:
+        books (list): список записей Book о найденных книгах.
+    """
+    book_ids = sorted(set(book_ids))
+    books = []
+    for start in range(0, len(book_ids), IDS_CHUNK):
+        chunk = book_ids[start:start + IDS_CHUNK]
+        cursor.execute(QUERIES['BOOKS'].format(', '.join('?' * len(chunk))),
+                       chunk)
+        books.extend(cursor.fetchall())
+    return books
+
+
+@metrics.timed(lambda name: f'{name}_MANY')
+def write_many(name: str, book_ids: list, book_status: int = None,
+               database: Connection = None) -> list:
+    """
+    Массовое удаление книг (DELETE) или изменение их статуса (STATUS)
+    одним запросом executemany в одной транзакции.
+
+    Args:
+        name (str): тип запроса - DELETE или STATUS.
+
+        book_ids (list): id книг.
+
+        book_status (int, optional): новый статус книг для STATUS.
+
+        database (Connection, optional): подключение к базе данных. По
+        умолчанию используется общее для модуля подключение.
+
+    Returns:
+        books (list): записи Book о затронутых книгах - до удаления или
+        после изменения статуса (id, которых нет в базе, пропускаются).
+    """
+    database = database or connection
+    if database.remote:
+        return database.write_many(name, book_ids, book_status)
+    start = time.perf_counter()
+
+    with database.lock:
+        cursor = database.get().cursor()
+        cursor.row_factory = book_factory
+        old = books_by_id(cursor, book_ids)
+        if name == 'DELETE':
+            rows, new = [(book.id,) for book in old], [None] * len(old)
+        else:
+            rows = [(book_status, book.id) for book in old]
+            new = [Book(book.id, book.author, book.title, book.year,
+                        book_status) for book in old]
+
+        with database.transaction():
+            cursor.executemany(QUERIES[name], rows)
+
+        database.writes += 1
+        if len(old) > INVALIDATE_LIMIT:
+            database.cache.clear()
+        else:
+            for before, after in zip(old, new):
+                database.cache.invalidate(before, after)
+
+    log.info('Запрос %s', f'{name}_MANY', extra={
+        'operation': f'{name}_MANY',
+        'params': {'ids': len(book_ids), 'status': book_status},
+        'duration_ms': round((time.perf_counter() - start) * 1000, 3),
+        'rows': len(old)})
+    return old if name == 'DELETE' else new
+
+
+def delete_many(book_ids: list, database: Connection = None) -> list:
+    """
+    Удаление нескольких книг в одной транзакции.
+
+    Args:
+        book_ids (list): id книг.
+
+        database (Connection, optional): подключение к базе данных.
+
+    Returns:
+        books (list): записи Book об удалённых книгах.
+    """
+    return write_many('DELETE', book_ids, database=database)
+
+
+def set_status(book_ids: list, book_status: int,
+               database: Connection = None) -> list:
+    """
+    Изменение статуса нескольких книг в одной транзакции.
+
+    Args:
+        book_ids (list): id книг.
+
+        book_status (int): новый статус (1 - в наличии, 0 - выдана).
+
+        database (Connection, optional): подключение к базе данных.
+
+    Returns:
+        books (list): записи Book о книгах после изменения.
+    """
+    return write_many('STATUS', book_ids, book_status, database)
+
+
+def insert_many(rows: list, database: Connection = None) -> int:
+    """
+    Добавление нескольких книг одним запросом executemany в одной
+    транзакции (кэш результатов очищается полностью).
+
+    Args:
+        rows (list): кортежи (author, title, year, status).
+
+        database (Connection, optional): подключение к базе данных. По
+        умолчанию используется общее для модуля подключение.
+
+    Returns:
+        rows (int): количество добавленных книг.
+    """
+    database = database or connection
+    if database.remote:
+        return database.insert_many(rows)
+
+    with database.lock:
+        with database.transaction():
+            database.get().executemany(QUERIES['INSERT'], rows)
+        database.writes += 1
+        database.cache.clear()
+    return len(rows)
+
+
+def journal_bounds(cursor: sqlite3.Cursor) -> tuple:
+    """
+    Получение первого хранимого и последнего выданного номеров журнала.
+
+    Args:
+        cursor (sqlite3.Cursor): курсор подключения к базе данных.
+
+    Returns:
+        bounds (tuple): первый и последний номер (если журнал пуст, первый
+        номер - следующий за последним).
+    """
+    row = cursor.execute(QUERIES['JOURNAL_LAST']).fetchone()
+    last = row[0] if row else 0
+    first = cursor.execute(QUERIES['JOURNAL_FIRST']).fetchone()[0]
+    return (last + 1 if first is None else first), last
+
+
+def changes_since(seq: int = 0, limit: int = JOURNAL_PAGE,
+                  database: Connection = None) -> dict:
+    """
+    Получение изменений каталога после записи журнала с номером seq для
+    пошаговой синхронизации: следующий вызов выполняется с номером
+    последней полученной записи (last_seq ответа), пока ответ не пуст.
+
+    Args:
+        seq (int, optional): номер последней уже обработанной записи, 0 -
+        с начала журнала.
+
+        limit (int, optional): наибольшее количество записей в ответе.
+
+        database (Connection, optional): подключение к базе данных. По
+        умолчанию используется общее для модуля подключение.
+
+    Returns:
+        result (dict): записи журнала (seq, время в ISO 8601, операция,
+        id книги и значения столбцов: изменённые для UPDATE, добавленная
+        или удалённая запись для INSERT/DELETE), номер
+        последней полученной записи, последний номер журнала и признак
+        complete - False, если часть записей после seq уже удалена при
+        сокращении журнала и нужна полная выгрузка каталога.
+    """
+    database = database or connection
+    if database.remote:
+        return database.changes_since(seq, limit)
+
+    with database.lock:
+        cursor = database.get().cursor()
+        first, last = journal_bounds(cursor)
+        rows = cursor.execute(QUERIES['JOURNAL'], (seq, limit)).fetchall()
+
+    changes = [{'seq': number,
+                'time': datetime.fromtimestamp(
+                    moment / 1000, timezone.utc).isoformat(
+                    timespec='milliseconds'),
+                'operation': operation,
+                'id': book_id,
+                'changes': None if values is None else json.loads(values)}
+               for number, moment, operation, book_id, values in rows]
+    return {'changes': changes,
+            'last_seq': changes[-1]['seq'] if changes else max(seq, 0),
+            'journal_seq': last,
+            'complete': seq >= first - 1}
+
+
+def trim_journal(keep: int = JOURNAL_KEEP, days: [None, int] = JOURNAL_DAYS,
+                 database: Connection = None) -> int:
+    """
+    Сокращение журнала изменений: удаляются записи сверх последних keep и
+    записи старше days дней. Номера оставшихся записей не меняются.
+
+    Args:
+        keep (int, optional): количество хранимых последних записей.
+
+        days (int, optional): срок хранения записей в днях, None - без
+        ограничения по сроку.
+
+        database (Connection, optional): подключение к базе данных. По
+        умолчанию используется общее для модуля подключение.
+
+    Returns:
+        rows (int): количество удалённых записей.
+    """
+    database = database or connection
+    if database.remote:
+        return database.trim_journal(keep, days)
+    start = time.perf_counter()
+
+    with database.lock:
+        cursor = database.get().cursor()
+        first, last = journal_bounds(cursor)
+        bound = last - keep
+        if days is not None:
+            # Записи добавляются по времени, поэтому граница по сроку -
+            # номер первой записи не старше days дней
+            row = cursor.execute(QUERIES['JOURNAL_AGE'], (
+                (time.time() - days * 86400) * 1000,)).fetchone()
+            bound = max(bound, row[0] - 1 if row else last)
+        if bound < first:
+            return 0
+        with database.transaction():
+            cursor.execute(QUERIES['JOURNAL_TRIM'], (bound,))
+        deleted = cursor.rowcount
+
+    log.info('Журнал изменений сокращён', extra={
+        'operation': 'TRIM_JOURNAL',
+        'params': {'keep': keep, 'days': days},
+        'duration_ms': round((time.perf_counter() - start) * 1000, 3),
+        'rows': deleted})
+    return deleted
+
+
+def migrate(database: Connection = None) -> int:
+    """
+    Применение к базе данных миграций, которые ещё не были выполнены.
+    Каждая миграция выполняется в отдельной транзакции вместе с обновлением
+    PRAGMA user_version, поэтому существующий файл базы данных обновляется
+    на месте, а при ошибке остаётся в предыдущей версии.
+
+    Args:
+        database (Connection, optional): подключение к базе данных. По
+        умолчанию используется общее для модуля подключение.
+
+    Returns:
+        version (int): версия схемы базы данных после миграций.
+    """
+    database = database or connection
+    if database.remote:
+        return database.schema()
+
+    with database.lock:
+        current = database.get().execute('PRAGMA user_version').fetchone()[0]
+        for version, script in enumerate(MIGRATIONS, start=1):
+            if version <= current:
+                continue
+            try:
+                database.get().executescript(
+                    f'BEGIN; {script}; PRAGMA user_version = {version}; COMMIT;')
+            except sqlite3.Error:
+                database.get().rollback()
+                log.exception('Ошибка миграции %s', version,
+                              extra={'operation': 'MIGRATE'})
+                raise
+            log.info('Миграция %s применена', version,
+                     extra={'operation': 'MIGRATE'})
+            database.writes += 1
+            database.cache.clear()
+            current = version
+        return current
+
+
+def cache_stats() -> dict:
+    """
+    Получение счётчиков кэша результатов общего подключения для проверки
+    доли попаданий. Блокировка подключения не используется: счётчики
+    читаются из потока интерфейса и не должны ждать выполняемый в фоновом
+    потоке запрос (значения могут отставать на одну операцию).
+
+    Returns:
+        stats (dict): попадания, промахи, доля попаданий, удалённые
+        результаты и текущий размер кэша.
+    """
+    return connection.cache.stats()
+
+
+def connect(database: Connection) -> Connection:
+    """
+    Замена общего подключения модуля (например, на подключение к серверу
+    каталога client.RemoteConnection). Текущее подключение закрывается.
+
+    Args:
+        database (Connection): новое подключение.
+
+    Returns:
+        database (Connection): новое общее подключение.
+    """
+    global connection
+    connection.close()
+    connection = database
+    return connection
+
+
+def close() -> None:
+    """
+    Закрытие общего подключения к базе данных при завершении работы
+    приложения.
+    """
+    connection.close()
+
+
+# Общее подключение и создание экземпляров класса с разными видами
 # запросов в SQL
 ####################################################
+connection = Connection()
+
 insert = Request('INSERT')
 update = Request('UPDATE')
 delete = Request('DELETE')
 where = Request('WHERE')
+find = Request('SEARCH')
 create = Request('CREATE')
 select = Request('SELECT')
+book = Request('BOOK')
+next_page = Request('NEXT')
+previous_page = Request('PREVIOUS')
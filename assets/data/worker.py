@@ -0,0 +1,202 @@
+import queue
+import threading
+import time
+
+from assets.data import sql_requests, metrics
+
+
+class Task:
+    """
+    Основное применение - описание одной операции, переданной в фоновый
+    поток для выполнения.
+
+    Args:
+        function (callable): функция, выполняемая в фоновом потоке.
+
+        args (tuple): позиционные аргументы функции.
+
+        kwargs (dict): именованные аргументы функции.
+
+        callback (callable, optional): функция, которая получает результат
+        операции в потоке интерфейса.
+
+        errback (callable, optional): функция, которая получает исключение,
+        возникшее в ходе операции, в потоке интерфейса.
+
+        key (str, optional): ключ операции - новая операция с тем же ключом
+        отменяет предыдущую (например, устаревший поиск).
+    """
+
+    def __init__(self, function, args: tuple, kwargs: dict, callback=None,
+                 errback=None, key: str = None):
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.callback = callback
+        self.errback = errback
+        self.key = key
+        self.cancelled = False
+        self.submitted = time.perf_counter()
+
+
+class Worker:
+    """
+    Основное применение - выполнение запросов к базе данных в отдельном
+    потоке, чтобы не блокировать основной цикл приложения. Результаты
+    складываются в очередь, которую поток интерфейса забирает через poll().
+
+    Args:
+        database (Connection, optional): подключение к базе данных. По
+        умолчанию используется общее для модуля sql_requests подключение.
+
+    Methods:
+        submit(): постановка операции в очередь.
+
+        cancel(): отмена операции, выполняемый запрос при этом прерывается.
+
+        poll(): вызов callback/errback для завершённых операций.
+
+        stop(): остановка потока при завершении работы приложения
+        (операции записи выполняются до конца).
+    """
+
+    def __init__(self, database: sql_requests.Connection = None):
+        self.database = database or sql_requests.connection
+        self.tasks = queue.Queue()
+        self.results = queue.Queue()
+        self.lock = threading.RLock()
+        self.latest = {}
+        self.current = None
+        self.pending = 0
+        self.stopping = False
+        self.thread = threading.Thread(target=self.run, name='sql-worker',
+                                       daemon=True)
+        self.thread.start()
+
+    @property
+    def busy(self) -> bool:
+        """
+        Признак наличия операций в очереди или в работе.
+        """
+        return self.pending > 0
+
+    def submit(self, function, *args, callback=None, errback=None,
+               key: str = None, **kwargs) -> Task:
+        """
+        Постановка операции в очередь фонового потока.
+
+        Args:
+            function (callable): функция, выполняемая в фоновом потоке.
+
+            callback (callable, optional): получатель результата операции.
+
+            errback (callable, optional): получатель исключения операции.
+
+            key (str, optional): ключ операции, при совпадении ключа
+            предыдущая операция отменяется.
+
+        Returns:
+            task (Task): поставленная в очередь операция.
+        """
+        task = Task(function, args, kwargs, callback, errback, key)
+        with self.lock:
+            if key is not None:
+                previous = self.latest.get(key)
+                if previous is not None:
+                    self.cancel(previous)
+                self.latest[key] = task
+            self.pending += 1
+        self.tasks.put(task)
+        return task
+
+    def cancel(self, task: Task) -> None:
+        """
+        Отмена операции: операция из очереди не будет выполнена, а у
+        выполняемой в данный момент прерывается текущий запрос sqlite3.
+
+        Args:
+            task (Task): отменяемая операция.
+        """
+        with self.lock:
+            task.cancelled = True
+            if self.current is task:
+                self.database.interrupt()
+
+    def run(self) -> None:
+        """
+        Основной цикл фонового потока: выполнение операций из очереди до
+        получения сигнала остановки (None).
+        """
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                break
+
+            with self.lock:
+                if task.cancelled:
+                    self.pending -= 1
+                    continue
+                self.current = task
+
+            # Время ожидания операции в очереди фонового потока
+            if metrics.enabled:
+                metrics.record('worker.queue',
+                               (time.perf_counter() - task.submitted) * 1000)
+
+            try:
+                result, error = task.function(*task.args, **task.kwargs), None
+            except Exception as exception:
+                result, error = None, exception
+
+            with self.lock:
+                self.current = None
+                self.pending -= 1
+                if self.latest.get(task.key) is task:
+                    del self.latest[task.key]
+                if not task.cancelled:
+                    self.results.put((task, result, error))
+
+    def poll(self) -> None:
+        """
+        Передача результатов завершённых операций в callback/errback.
+        Вызывается из потока интерфейса (через after() в tkinter).
+        """
+        while True:
+            try:
+                task, result, error = self.results.get_nowait()
+            except queue.Empty:
+                return None
+
+            if task.cancelled:
+                continue
+            if error is None:
+                if task.callback is not None:
+                    task.callback(result)
+            elif task.errback is not None:
+                task.errback(error)
+            else:
+                raise error
+
+    def stop(self, timeout: float = None) -> bool:
+        """
+        Остановка фонового потока: операции с ключом (запросы чтения,
+        которые всё равно были бы заменены новыми) отменяются, а остальные
+        операции - запись, импорт, экспорт - выполняются до конца, чтобы
+        изменения не были потеряны. Их результаты забираются через poll().
+
+        Args:
+            timeout (float, optional): время ожидания в секундах, None -
+            до завершения потока.
+
+        Returns:
+            stopped (bool): поток завершён (False - операции ещё
+            выполняются, stop() можно вызвать повторно).
+        """
+        with self.lock:
+            for task in list(self.latest.values()):
+                self.cancel(task)
+            if not self.stopping:
+                self.stopping = True
+                self.tasks.put(None)
+        self.thread.join(timeout)
+        return not self.thread.is_alive()
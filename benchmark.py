@@ -0,0 +1,348 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+from assets.data import sql_requests, maintenance
+
+# Словари для генерации синтетического каталога (кириллица и латиница)
+####################################################
+FIRST_NAMES = ('Лев', 'Фёдор', 'Антон', 'Анна', 'Марина', 'Иван', 'Сергей',
+               'Ёлена', 'Stephen', 'Agatha', 'George', 'Ray', 'Ursula',
+               'Terry', 'Isaac', 'Jane')
+LAST_NAMES = ('Толстой', 'Достоевский', 'Чехов', 'Ахматова', 'Цветаева',
+              'Бунин', 'Есенин', 'Пушкин', 'King', 'Christie', 'Orwell',
+              'Bradbury', 'Le Guin', 'Pratchett', 'Asimov', 'Austen')
+TITLE_WORDS = ('война', 'мир', 'тёмная', 'башня', 'идиот', 'сад', 'вишнёвый',
+               'степь', 'ночь', 'дорога', 'дом', 'остров', 'foundation',
+               'night', 'city', 'garden', 'storm', 'river', 'empire', 'dream',
+               'shadow', 'winter', 'light', 'stone')
+
+SIZES = (1000, 10000, 100000)
+ITERATIONS = 200
+
+# Наибольшее время ожидания (с) первой страницы каталога после запуска
+# приложения
+FIRST_PAGE_TIMEOUT = 30
+
+
+def generate_books(rows: int, seed: int = 0):
+    """
+    Генерация синтетических записей о книгах.
+
+    Args:
+        rows (int): количество записей.
+
+        seed (int, optional): начальное значение генератора случайных чисел.
+
+    Yields:
+        book (tuple): кортеж (author, title, year, status).
+    """
+    rng = random.Random(seed)
+    for number in range(rows):
+        author = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+        title = ' '.join(rng.sample(TITLE_WORDS, rng.randint(1, 4)))
+        yield (author, f'{title.capitalize()} {number}',
+               rng.randint(1800, 2024), rng.randint(0, 1))
+
+
+def summarize(latencies: list) -> dict:
+    """
+    Расчёт пропускной способности и перцентилей задержки операции.
+
+    Args:
+        latencies (list): время выполнения каждой операции в секундах.
+
+    Returns:
+        summary (dict): количество операций, операций в секунду, среднее,
+        p50 и p99 задержки в миллисекундах.
+    """
+    total = sum(latencies)
+    percentiles = statistics.quantiles(latencies, n=100, method='inclusive')
+    return {'count': len(latencies),
+            'ops_per_sec': round(len(latencies) / total, 1) if total else None,
+            'mean_ms': round(total / len(latencies) * 1000, 3),
+            'p50_ms': round(statistics.median(latencies) * 1000, 3),
+            'p99_ms': round(percentiles[98] * 1000, 3)}
+
+
+def measure(function, arguments: list) -> dict:
+    """
+    Выполнение операции для каждого набора аргументов с замером времени.
+
+    Args:
+        function (callable): измеряемая операция.
+
+        arguments (list): список словарей с аргументами операции.
+
+    Returns:
+        summary (dict): результат summarize().
+    """
+    latencies = []
+    for kwargs in arguments:
+        start = time.perf_counter()
+        function(**kwargs)
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies)
+
+
+def benchmark_requests(database: sql_requests.Connection, rows: int,
+                       iterations: int, rng: random.Random) -> dict:
+    """
+    Замер операций класса Request на заполненной базе данных.
+
+    Args:
+        database (Connection): подключение к временной базе данных.
+
+        rows (int): количество книг в базе данных.
+
+        iterations (int): количество повторений каждой операции.
+
+        rng (Random): генератор случайных чисел для аргументов операций.
+
+    Returns:
+        operations (dict): результаты замеров по имени операции.
+    """
+    # Основные замеры выполняются без кэша результатов, повторные запросы
+    # с кэшем замеряются отдельно
+    database.cache = sql_requests.Cache(size=0)
+    request = {name: sql_requests.Request(name, database)
+               for name in ('INSERT', 'UPDATE', 'DELETE', 'WHERE', 'SEARCH',
+                            'SELECT', 'BOOK', 'NEXT')}
+    authors = [f'{first} {last}' for first in FIRST_NAMES
+               for last in LAST_NAMES]
+
+    operations = {
+        'insert': measure(request['INSERT'].connection_with_request, [
+            dict(zip(('book_author', 'book_title', 'book_year', 'book_status'),
+                     book))
+            for book in generate_books(iterations, seed=rows)]),
+        'update': measure(request['UPDATE'].connection_with_request, [
+            dict(book_author=rng.choice(authors), book_title='Обновлено',
+                 book_year=2000, book_status=rng.randint(0, 1),
+                 book_id=rng.randint(1, rows)) for _ in range(iterations)]),
+        'where': measure(request['WHERE'].connection_with_request, [
+            dict(book_author=rng.choice(authors), book_title=None,
+                 book_year=None) for _ in range(iterations)]),
+        'search': measure(request['SEARCH'].connection_with_request, [
+            dict(book_author=rng.choice(LAST_NAMES)[:4],
+                 book_title=rng.choice(TITLE_WORDS)[:3], book_year=None)
+            for _ in range(iterations)]),
+        'book': measure(request['BOOK'].connection_with_request, [
+            dict(book_id=rng.randint(1, rows)) for _ in range(iterations)]),
+        'next_page': measure(request['NEXT'].connection_with_request, [
+            dict(book_id=rng.randint(1, rows), limit=100)
+            for _ in range(iterations)]),
+        'select': measure(request['SELECT'].connection_with_request, [
+            {} for _ in range(max(1, min(iterations, 1000000 // rows)))]),
+        'delete': measure(request['DELETE'].connection_with_request, [
+            dict(book_id=book_id)
+            for book_id in rng.sample(range(1, rows + 1), iterations)]),
+    }
+
+    database.cache = sql_requests.Cache()
+    operations['select_cached'] = measure(
+        request['SELECT'].connection_with_request, [{}] * iterations)
+    operations['search_cached'] = measure(
+        request['SEARCH'].connection_with_request,
+        [dict(book_author=LAST_NAMES[0][:4])] * iterations)
+    operations['cache'] = database.cache.stats()
+    return operations
+
+
+def benchmark_maintenance(database: sql_requests.Connection,
+                          directory: str) -> dict:
+    """
+    Замер операций обслуживания базы данных: резервной копии, снимка,
+    обновления статистики, проверки целостности и сжатия.
+
+    Args:
+        database (Connection): подключение к временной базе данных.
+
+        directory (str): временная папка для копии и снимков.
+
+    Returns:
+        maintenance (dict): время каждой операции в секундах.
+    """
+    reports = (
+        maintenance.backup(os.path.join(directory, 'backup.db'),
+                           database=database),
+        maintenance.snapshot(os.path.join(directory, 'snapshots'),
+                             database=database),
+        maintenance.optimize(True, database=database),
+        maintenance.check(database=database),
+        maintenance.vacuum(database=database))
+    return {report['operation']: report['seconds'] for report in reports}
+
+
+def benchmark_tree(database: sql_requests.Connection) -> dict:
+    """
+    Замер запуска приложения, заполнения и обновления дерева записей.
+    Выполняется только при наличии дисплея (в том числе виртуального,
+    например Xvfb), иначе возвращается причина пропуска.
+
+    Args:
+        database (Connection): подключение к временной базе данных.
+
+    Returns:
+        tree (dict): время запуска приложения (до отображения окна с
+        пустым деревом и до появления первой страницы, загруженной в
+        фоновом потоке), первого и повторного открытия окна поиска,
+        отображения первой страницы, точечного обновления строки и полного
+        заполнения дерева всем каталогом (для сравнения с постраничным
+        отображением).
+    """
+    try:
+        import tkinter as tk
+        import main
+    except ImportError as error:
+        return {'skipped': str(error)}
+
+    sql_requests.connection.open(database.path)
+    try:
+        start = time.perf_counter()
+        app = main.App()
+        app.update()
+        startup = time.perf_counter() - start
+    except tk.TclError as error:
+        sql_requests.close()
+        return {'skipped': str(error)}
+
+    try:
+        while not app.tree.get_children() and \
+                time.perf_counter() - start < FIRST_PAGE_TIMEOUT:
+            app.update()
+            time.sleep(0.001)
+        first_data = time.perf_counter() - start
+
+        # Окно поиска создаётся при первом открытии и затем переиспользуется
+        dialogs = []
+        for _ in range(2):
+            begin = time.perf_counter()
+            app.btn_find()
+            app.update()
+            dialogs.append(time.perf_counter() - begin)
+            app.dialogs['btn_find']['window'].withdraw()
+
+        app.worker.stop()
+        start = time.perf_counter()
+        app.show_first_page(main.first_page())
+        app.update()
+        first_page = time.perf_counter() - start
+
+        book_id = int(app.tree.get_children()[0])
+        start = time.perf_counter()
+        app.apply_changes(main.fetch_changes([book_id]))
+        app.update()
+        refresh_row = time.perf_counter() - start
+
+        start = time.perf_counter()
+        app.fill_tree(sql_requests.select.connection_with_request())
+        app.update()
+        full_tree = time.perf_counter() - start
+    finally:
+        app.destroy()
+        sql_requests.close()
+
+    return {'startup_ms': round(startup * 1000, 3),
+            'first_data_ms': round(first_data * 1000, 3),
+            'dialog_open_ms': round(dialogs[0] * 1000, 3),
+            'dialog_reopen_ms': round(dialogs[1] * 1000, 3),
+            'first_page_ms': round(first_page * 1000, 3),
+            'refresh_row_ms': round(refresh_row * 1000, 3),
+            'full_tree_ms': round(full_tree * 1000, 3)}
+
+
+def run(rows: int, iterations: int, tree: bool, seed: int = 0) -> dict:
+    """
+    Полный замер для каталога заданного размера во временной базе данных.
+
+    Args:
+        rows (int): количество книг в каталоге.
+
+        iterations (int): количество повторений каждой операции.
+
+        tree (bool): выполнять ли замер дерева записей.
+
+        seed (int, optional): начальное значение генератора случайных чисел.
+
+    Returns:
+        result (dict): результаты замеров.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        database = sql_requests.Connection(os.path.join(directory,
+                                                        'library.db'))
+        start = time.perf_counter()
+        sql_requests.migrate(database)
+        with database.lock:
+            with database.get() as connection:
+                connection.executemany(sql_requests.QUERIES['INSERT'],
+                                       generate_books(rows, seed))
+        load = time.perf_counter() - start
+
+        result = {'rows': rows,
+                  'load': {'seconds': round(load, 3),
+                           'rows_per_sec': round(rows / load)},
+                  'operations': benchmark_requests(
+                      database, rows, min(iterations, rows),
+                      random.Random(seed)),
+                  'maintenance': benchmark_maintenance(database, directory)}
+        database.close()
+
+        if tree:
+            result['tree'] = benchmark_tree(database)
+    return result
+
+
+def main(argv: list = None) -> None:
+    """
+    Запуск замеров производительности из командной строки, результаты
+    сохраняются в файл json для сравнения запусков.
+
+    Args:
+        argv (list, optional): аргументы командной строки.
+    """
+    parser = argparse.ArgumentParser(
+        description='Замеры производительности каталога книг')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES,
+                        help='размеры каталога (количество книг)')
+    parser.add_argument('--iterations', type=int, default=ITERATIONS,
+                        help='количество повторений каждой операции')
+    parser.add_argument('--output', default='benchmark.json',
+                        help='файл для результатов в формате json')
+    parser.add_argument('--no-tree', action='store_true',
+                        help='не выполнять замер дерева записей (tkinter)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    results = {'timestamp': datetime.now().isoformat(timespec='seconds'),
+               'python': platform.python_version(),
+               'sqlite': sqlite3.sqlite_version,
+               'platform': platform.platform(),
+               'runs': []}
+    for rows in args.sizes:
+        result = run(rows, args.iterations, not args.no_tree, args.seed)
+        results['runs'].append(result)
+        print(f"{rows} книг: загрузка {result['load']['rows_per_sec']} "
+              f"записей/с")
+        for name, summary in result['operations'].items():
+            if name != 'cache':
+                print(f"  {name:<14} {summary['ops_per_sec']:>10} оп/с  "
+                      f"p50 {summary['p50_ms']} мс  p99 {summary['p99_ms']} мс")
+        print(f"  {'maintenance':<14} {result['maintenance']}")
+        if 'tree' in result:
+            print(f"  {'tree':<14} {result['tree']}")
+
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(results, file, ensure_ascii=False, indent=2)
+    print(f'Результаты сохранены в {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,469 @@
+import argparse
+import csv
+import json
+import os
+import shlex
+import sqlite3
+import sys
+
+from assets.data import sql_requests, bulk, logger, metrics, maintenance
+
+FORMATS = ('tsv', 'csv', 'jsonl')
+
+# Поля записи журнала изменений при выводе команды journal
+JOURNAL_COLUMNS = ('seq', 'time', 'operation', 'id', 'changes')
+
+
+class Output:
+    """
+    Основное применение - потоковый вывод записей о книгах в stdout в
+    выбранном формате (каждая запись выводится сразу после получения).
+
+    Args:
+        output_format (str): формат вывода - tsv, csv или jsonl.
+
+        stream (optional): поток вывода, по умолчанию sys.stdout.
+    """
+
+    def __init__(self, output_format: str = 'tsv', stream=None):
+        self.format = output_format
+        self.stream = stream or sys.stdout
+        self.writer = csv.writer(self.stream, lineterminator='\n')
+        # Имена полей jsonl (меняются при выборе столбцов в команде list)
+        self.columns = bulk.EXPORT_COLUMNS
+
+    def write(self, book) -> None:
+        """
+        Вывод одной записи о книге.
+
+        Args:
+            book (Book, tuple): запись (id, author, title, year, status).
+        """
+        book = tuple(book)
+        if self.format == 'jsonl':
+            self.stream.write(json.dumps(
+                dict(zip(self.columns, book)),
+                ensure_ascii=False) + '\n')
+        elif self.format == 'csv':
+            self.writer.writerow(book)
+        else:
+            self.stream.write('\t'.join(map(str, book)) + '\n')
+
+
+def parse_status(value: str) -> int:
+    """
+    Преобразование статуса из командной строки (1/0 или
+    'В наличии'/'Выдана') в число.
+
+    Args:
+        value (str): статус книги.
+
+    Returns:
+        status (int): 1 - в наличии, 0 - выдана.
+    """
+    try:
+        return bulk.STATUSES[value.strip()]
+    except KeyError:
+        raise argparse.ArgumentTypeError(
+            f'некорректный статус {value!r}, допустимо: 1, 0, '
+            f'"В наличии", "Выдана"') from None
+
+
+def get_book(book_id: int) -> sql_requests.Book:
+    """
+    Получение записи о книге по id.
+
+    Args:
+        book_id (int): уникальный идентификационный номер книги.
+
+    Returns:
+        book (Book): запись о книге.
+    """
+    books = sql_requests.book.connection_with_request(book_id=book_id)
+    if not books:
+        raise LookupError(f'Книга с id {book_id} не найдена')
+    return books[0]
+
+
+def check_missing(book_ids: list, books: list) -> None:
+    """
+    Проверка, что массовая операция затронула все указанные книги.
+
+    Args:
+        book_ids (list): указанные id книг.
+
+        books (list): записи Book о затронутых книгах.
+    """
+    missing = sorted(set(book_ids) - {book.id for book in books})
+    if missing:
+        raise LookupError(
+            f"Книги с id {', '.join(map(str, missing))} не найдены")
+
+
+# Команды интерфейса командной строки
+####################################################
+def command_add(args: argparse.Namespace, output: Output) -> None:
+    """
+    Добавление книги, выводится запись о добавленной книге.
+    """
+    book_id = sql_requests.insert.connection_with_request(
+        args.author, args.title, args.year, args.status)
+    output.write(get_book(book_id))
+
+
+def command_update(args: argparse.Namespace, output: Output) -> None:
+    """
+    Изменение указанных полей книги, выводится запись после изменения.
+    """
+    book = get_book(args.id)
+    sql_requests.update.connection_with_request(
+        book.author if args.author is None else args.author,
+        book.title if args.title is None else args.title,
+        book.year if args.year is None else args.year,
+        book.status if args.status is None else args.status,
+        book.id)
+    output.write(get_book(book.id))
+
+
+def command_delete(args: argparse.Namespace, output: Output) -> None:
+    """
+    Удаление книг одной транзакцией, выводятся записи об удалённых книгах.
+    """
+    books = sql_requests.delete_many(args.ids)
+    for book in books:
+        output.write(book)
+    check_missing(args.ids, books)
+
+
+def command_status(args: argparse.Namespace, output: Output) -> None:
+    """
+    Изменение статуса книг одной транзакцией, выводятся записи после
+    изменения.
+    """
+    books = sql_requests.set_status(args.ids, args.status)
+    for book in books:
+        output.write(book)
+    check_missing(args.ids, books)
+
+
+def command_find(args: argparse.Namespace, output: Output) -> None:
+    """
+    Поиск книг: полнотекстовый по началу слов или точный (--exact).
+    """
+    request = sql_requests.where if args.exact else sql_requests.find
+    for book in request.connection_with_request(args.author, args.title,
+                                                args.year):
+        output.write(book)
+
+
+def command_list(args: argparse.Namespace, output: Output) -> None:
+    """
+    Потоковый вывод каталога: весь каталог по возрастанию id или, если
+    указаны отбор, сортировка, ограничение или столбцы, - результат
+    запроса sql_requests.Query.
+    """
+    if all(value is None for value in (args.status, args.year_from,
+                                        args.year_to, args.sort, args.limit,
+                                        args.columns)):
+        for book in bulk.iter_books(database=sql_requests.connection):
+            output.write(book)
+        return None
+
+    query = sql_requests.Query().filter(
+        status=args.status, year_from=args.year_from, year_to=args.year_to)
+    query = query.order_by(args.sort or 'id', args.desc).limit(args.limit)
+    if args.columns:
+        output.columns = args.columns.split(',')
+        query = query.columns(*output.columns)
+    for book in query:
+        output.write(book)
+
+
+def command_import(args: argparse.Namespace, output: Output) -> None:
+    """
+    Импорт книг из файла csv/jsonl, отчёт выводится в stderr.
+    """
+    result = bulk.import_books(args.path, args.batch_size)
+    print(f"import: {result['rows']} записей за {result['seconds']} с "
+          f"({result['rows_per_sec']} записей/с)", file=sys.stderr)
+
+
+def command_export(args: argparse.Namespace, output: Output) -> None:
+    """
+    Экспорт каталога в файл csv/jsonl, отчёт выводится в stderr.
+    """
+    result = bulk.export_books(args.path, args.batch_size)
+    print(f"export: {result['rows']} записей за {result['seconds']} с "
+          f"({result['rows_per_sec']} записей/с)", file=sys.stderr)
+
+
+def command_journal(args: argparse.Namespace, output: Output) -> None:
+    """
+    Вывод изменений каталога после записи журнала --since по возрастанию
+    seq или сокращение журнала (--trim, отчёт выводится в stderr). Если
+    часть изменений уже удалена из журнала, в stderr выводится
+    предупреждение о необходимости полной выгрузки каталога.
+    """
+    if args.trim:
+        deleted = sql_requests.trim_journal(args.keep, args.days)
+        print(f'journal: удалено {deleted} записей', file=sys.stderr)
+        return None
+
+    output.columns = JOURNAL_COLUMNS
+    result = sql_requests.changes_since(args.since)
+    if not result['complete']:
+        print(f"journal: часть изменений после записи {args.since} уже "
+              f"удалена из журнала, нужна полная выгрузка каталога (export), "
+              f"затем --since {result['journal_seq']}", file=sys.stderr)
+    while result['changes']:
+        for change in result['changes']:
+            values = change['changes']
+            if output.format != 'jsonl':
+                values = '' if values is None else json.dumps(
+                    values, ensure_ascii=False)
+            output.write((change['seq'], change['time'], change['operation'],
+                          change['id'], values))
+        result = sql_requests.changes_since(result['last_seq'])
+
+
+def command_maintenance(args: argparse.Namespace, output: Output) -> None:
+    """
+    Обслуживание базы данных (backup, snapshot, optimize, check, vacuum),
+    отчёт с временем выполнения выводится в stderr. Если проверка
+    целостности нашла ошибки, они выводятся в stdout, а код завершения -
+    1.
+    """
+    if args.command == 'backup':
+        result = maintenance.backup(args.path, args.pages)
+    elif args.command == 'snapshot':
+        result = maintenance.snapshot(args.dir, args.keep)
+    elif args.command == 'optimize':
+        result = maintenance.optimize(args.analyze)
+    elif args.command == 'check':
+        result = maintenance.check(args.quick)
+    else:
+        result = maintenance.vacuum()
+
+    details = ', '.join(f'{name}={value}' for name, value in result.items()
+                        if name not in ('operation', 'seconds', 'errors'))
+    print(f"{result['operation']}: {result['seconds']} с ({details})",
+          file=sys.stderr)
+    if result.get('errors'):
+        for error in result['errors']:
+            print(error, file=output.stream)
+        raise SystemExit(1)
+
+
+def command_batch(args: argparse.Namespace, output: Output) -> None:
+    """
+    Пакетный режим: выполнение команд из stdin, по одной на строку
+    (пустые строки и строки с # пропускаются). Ошибка в команде выводится
+    в stderr с номером строки и не прерывает выполнение остальных.
+    """
+    parser = create_parser(batch=True)
+    errors = 0
+    for line, text in enumerate(sys.stdin, start=1):
+        if not text.strip() or text.lstrip().startswith('#'):
+            continue
+        try:
+            command = parser.parse_args(shlex.split(text))
+            command.handler(command, output)
+        except SystemExit:
+            errors += 1
+        except (LookupError, OSError, ValueError, sqlite3.Error) as error:
+            print(f'Строка {line}: {error}', file=sys.stderr)
+            errors += 1
+    if errors:
+        raise SystemExit(1)
+
+
+def report(args: argparse.Namespace) -> None:
+    """
+    Сохранение замеров в файл (--metrics) и вывод профиля в stderr
+    (--profile) после выполнения команды.
+    """
+    if args.metrics:
+        try:
+            metrics.dump(args.metrics, cache=sql_requests.cache_stats())
+        except OSError as error:
+            print(error, file=sys.stderr)
+    for name, profile in metrics.snapshot()['profiles'].items():
+        print(f"{name}: {profile['duration_ms']} мс\n{profile['stats']}",
+              file=sys.stderr)
+
+
+def create_parser(batch: bool = False) -> argparse.ArgumentParser:
+    """
+    Формирование парсера аргументов командной строки.
+
+    Args:
+        batch (bool, optional): парсер для строк пакетного режима (без
+        общих параметров и команды batch).
+
+    Returns:
+        parser (ArgumentParser): парсер аргументов.
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m cli',
+        description='Работа с каталогом книг без графического интерфейса')
+    if not batch:
+        parser.add_argument('--db', default=sql_requests.DB_PATH,
+                            help='путь к базе данных')
+        parser.add_argument('--server',
+                            help='адрес сервера каталога вместо файла '
+                                 'базы данных, например '
+                                 'http://127.0.0.1:8765')
+        parser.add_argument('--format', choices=FORMATS, default='tsv',
+                            help='формат вывода записей')
+        parser.add_argument('--metrics', metavar='PATH',
+                            help='включить замеры операций и сохранить их '
+                                 'в файл json после выполнения команды')
+        parser.add_argument('--profile', metavar='OPERATION',
+                            help='профилировать первый вызов операции '
+                                 '(например, SEARCH), профиль выводится в '
+                                 'stderr')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('add', help='добавить книгу')
+    command.add_argument('author')
+    command.add_argument('title')
+    command.add_argument('year', type=int)
+    command.add_argument('status', type=parse_status, nargs='?', default=1)
+    command.set_defaults(handler=command_add)
+
+    command = commands.add_parser('update', help='изменить книгу')
+    command.add_argument('id', type=int)
+    command.add_argument('--author')
+    command.add_argument('--title')
+    command.add_argument('--year', type=int)
+    command.add_argument('--status', type=parse_status)
+    command.set_defaults(handler=command_update)
+
+    command = commands.add_parser('delete', help='удалить книги')
+    command.add_argument('ids', type=int, nargs='+')
+    command.set_defaults(handler=command_delete)
+
+    command = commands.add_parser('status', help='изменить статус книг')
+    command.add_argument('status', type=parse_status)
+    command.add_argument('ids', type=int, nargs='+')
+    command.set_defaults(handler=command_status)
+
+    command = commands.add_parser('find', help='найти книги')
+    command.add_argument('--author')
+    command.add_argument('--title')
+    command.add_argument('--year')
+    command.add_argument('--exact', action='store_true',
+                         help='точное совпадение автора, названия или года')
+    command.set_defaults(handler=command_find)
+
+    command = commands.add_parser('list', help='вывести каталог')
+    command.add_argument('--status', type=parse_status)
+    command.add_argument('--year-from', type=int)
+    command.add_argument('--year-to', type=int)
+    command.add_argument('--sort', choices=sql_requests.COLUMNS)
+    command.add_argument('--desc', action='store_true',
+                         help='сортировка по убыванию')
+    command.add_argument('--limit', type=int)
+    command.add_argument('--columns', metavar='NAMES',
+                         help='столбцы через запятую, например id,title')
+    command.set_defaults(handler=command_list)
+
+    command = commands.add_parser('journal', help='изменения каталога')
+    command.add_argument('--since', type=int, default=0,
+                         help='номер последней обработанной записи журнала')
+    command.add_argument('--trim', action='store_true',
+                         help='сократить журнал')
+    command.add_argument('--keep', type=int,
+                         default=sql_requests.JOURNAL_KEEP,
+                         help='количество хранимых записей для --trim')
+    command.add_argument('--days', type=int,
+                         default=sql_requests.JOURNAL_DAYS,
+                         help='срок хранения записей в днях для --trim')
+    command.set_defaults(handler=command_journal)
+
+    command = commands.add_parser(
+        'backup', help='резервная копия базы данных (online backup)')
+    command.add_argument('path')
+    command.add_argument('--pages', type=int, default=maintenance.BACKUP_PAGES,
+                         help='количество страниц за один шаг копирования')
+    command.set_defaults(handler=command_maintenance)
+
+    command = commands.add_parser('snapshot',
+                                  help='снимок базы данных (VACUUM INTO)')
+    command.add_argument('--dir', help='папка снимков')
+    command.add_argument('--keep', type=int, default=maintenance.SNAPSHOT_KEEP,
+                         help='количество хранимых снимков')
+    command.set_defaults(handler=command_maintenance)
+
+    command = commands.add_parser(
+        'optimize', help='обновить статистику запросов (PRAGMA optimize)')
+    command.add_argument('--analyze', action='store_true',
+                         help='полный ANALYZE')
+    command.set_defaults(handler=command_maintenance)
+
+    command = commands.add_parser('check', help='проверка целостности')
+    command.add_argument('--quick', action='store_true',
+                         help='PRAGMA quick_check')
+    command.set_defaults(handler=command_maintenance)
+
+    command = commands.add_parser('vacuum', help='сжатие базы данных')
+    command.set_defaults(handler=command_maintenance)
+
+    for name, handler in (('import', command_import),
+                          ('export', command_export)):
+        command = commands.add_parser(name, help=f'{name} csv/jsonl')
+        command.add_argument('path')
+        command.add_argument('--batch-size', type=int, default=5000)
+        command.set_defaults(handler=handler)
+
+    if not batch:
+        command = commands.add_parser(
+            'batch', help='выполнить команды из stdin, по одной на строку')
+        command.set_defaults(handler=command_batch)
+
+    return parser
+
+
+def main(argv: list = None) -> int:
+    """
+    Запуск интерфейса командной строки.
+
+    Args:
+        argv (list, optional): аргументы командной строки.
+
+    Returns:
+        code (int): код завершения (0 - успешно, 1 - ошибка).
+    """
+    args = create_parser().parse_args(argv)
+    logger.setup()
+    if args.metrics:
+        metrics.enable()
+    if args.profile:
+        metrics.profile(args.profile)
+    try:
+        if args.server:
+            # Клиент сервера (http.client и т.д.) импортируется только при
+            # работе через сервер, чтобы не замедлять запуск команд
+            from assets.data import client
+            sql_requests.connect(client.RemoteConnection(args.server))
+        else:
+            sql_requests.connection.open(args.db)
+        sql_requests.migrate()
+        args.handler(args, Output(args.format))
+    except BrokenPipeError:
+        # Вывод оборван получателем (например, head) - остаток вывода
+        # перенаправляется в devnull
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    except (LookupError, OSError, ValueError, sqlite3.Error) as error:
+        print(error, file=sys.stderr)
+        return 1
+    finally:
+        sys.stdout.flush()
+        report(args)
+        sql_requests.close()
+        logger.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
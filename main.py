@@ -1,9 +1,20 @@
+import argparse
 import tkinter as tk
 from tkinter import ttk
 from tkinter.messagebox import showerror, showwarning, showinfo, askyesno
-import datetime
+from tkinter.filedialog import askopenfilename, asksaveasfilename
+from functools import partial
+import bisect
+import os
 
-from assets.data import sql_requests
+from assets.data import sql_requests, bulk, worker, logger, metrics, \
+    maintenance
+
+log = logger.get('main')
+
+# Описание ошибок для записи в журнал по их строковому обозначению
+ERRORS = {'AttributeError': 'object has no attribute',
+          'ValueError': 'invalid literal for int()'}
 
 
 def window_center(self) -> None:
@@ -26,23 +37,172 @@ def window_center(self) -> None:
     self.deiconify()
 
 
-def logging(type_error: str) -> None:
+@metrics.timed()
+def first_page(order: tuple = None) -> tuple:
+    """
+    Загрузка первой страницы каталога (выполняется в фоновом потоке).
+
+    Args:
+        order (tuple, optional): столбец сортировки и признак сортировки
+        по убыванию, по умолчанию - по возрастанию id.
+
+    Returns:
+        result (tuple): версия данных и список записей Book первой
+        страницы.
+    """
+    return (sql_requests.connection.version(),
+            load_books(order or DEFAULT_ORDER, PAGE_SIZE + PREFETCH))
+
+
+@metrics.timed()
+def load_books(order: tuple, limit: int, boundary: sql_requests.Book = None,
+               forward: bool = True) -> list:
+    """
+    Загрузка страницы каталога в порядке сортировки (keyset-пагинация от
+    граничной записи). Страницы по возрастанию id загружаются запросами
+    NEXT/PREVIOUS, результаты которых кэшируются, остальные - через
+    sql_requests.Query.
+
+    Args:
+        order (tuple): столбец сортировки и признак сортировки по
+        убыванию.
+
+        limit (int): размер страницы.
+
+        boundary (Book, optional): граничная запись загруженного окна, по
+        умолчанию загружается начало каталога.
+
+        forward (bool, optional): True - страница после границы, False -
+        перед ней.
+
+    Returns:
+        books (list): список записей Book страницы.
     """
-    Запись в служебный лог-файл о произошедшей критической ошибки в ходе
-    работы приложения.
+    if tuple(order) == DEFAULT_ORDER:
+        request = sql_requests.next_page if forward else \
+            sql_requests.previous_page
+        return request.connection_with_request(
+            book_id=boundary.id if boundary else 0, limit=limit)
+
+    query = sql_requests.Query().order_by(*order).limit(limit)
+    if boundary is None:
+        return query.fetch()
+    elif forward:
+        return query.after(*query.key(boundary)).fetch()
+    return query.before(*query.key(boundary)).fetch()
+
+
+@metrics.timed()
+def fetch_changes(book_ids: list = None) -> tuple:
+    """
+    Получение версии данных и актуальных записей об изменённых книгах
+    (выполняется в фоновом потоке).
 
     Args:
-        type_error (str): строковое обозначение сегмента ошибки для
-        проверки при осуществлении записи в файл logs.txt.
+        book_ids (list, optional): id добавленных, изменённых или удалённых
+        книг.
+
+    Returns:
+        result (tuple): версия данных и список пар (id, список с записью
+        Book - пустой, если книга удалена) или None.
     """
-    now = datetime.datetime.now()
-    with open('./assets/data/logs.txt', 'a') as file:
-        if type_error == 'AttributeError':
-            file.write(
-                f"\n{now.strftime('%d-%m-%Y %H:%M')} == AttributeError: object has no attribute")
-        elif type_error == 'ValueError':
-            file.write(
-                f"\n{now.strftime('%d-%m-%Y %H:%M')} == ValueError: invalid literal for int()")
+    version = sql_requests.connection.version()
+    if book_ids is None:
+        return version, None
+    return version, [
+        (book_id, sql_requests.book.connection_with_request(book_id=book_id))
+        for book_id in book_ids]
+
+
+@metrics.timed()
+def change_books(function, book_ids: list, *args) -> tuple:
+    """
+    Массовое изменение книг и получение версии данных (выполняется в
+    фоновом потоке).
+
+    Args:
+        function (callable): sql_requests.delete_many или
+        sql_requests.set_status.
+
+        book_ids (list): id книг.
+
+        *args: остальные аргументы функции (например, новый статус).
+
+    Returns:
+        result (tuple): версия данных и список пар (id, список с записью
+        Book - пустой, если книга удалена), как у fetch_changes.
+    """
+    books = function(book_ids, *args)
+    deleted = function is sql_requests.delete_many
+    return sql_requests.connection.version(), [
+        (book.id, [] if deleted else [book]) for book in books]
+
+
+def logging(type_error: str, operation: str = None, **context) -> None:
+    """
+    Запись в журнал приложения (logs.jsonl) о произошедшей ошибке в ходе
+    работы приложения. Запись выполняется через очередь в отдельном потоке
+    и не блокирует интерфейс.
+
+    Args:
+        type_error (str): строковое обозначение сегмента ошибки.
+
+        operation (str, optional): действие пользователя, в ходе которого
+        произошла ошибка.
+
+        **context: введённые значения и прочие данные для разбора ошибки.
+    """
+    log.error(f'{type_error}: {ERRORS.get(type_error, type_error)}',
+              extra={'operation': operation, 'params': context or None})
+
+
+FILE_TYPES = (('CSV', '*.csv'), ('JSON Lines', '*.jsonl'))
+
+# Переменная окружения для включения замеров при запуске приложения и
+# интервал (мс) обновления окна диагностики
+METRICS_VARIABLE = 'LIBRARY_METRICS'
+DIAGNOSTICS_INTERVAL = 1000
+DIAGNOSTICS_COLUMNS = (('operation', 'Операция', 170), ('count', 'Вызовы', 60),
+                       ('mean_ms', 'Среднее', 65), ('p50_ms', 'p50', 55),
+                       ('p99_ms', 'p99', 55), ('max_ms', 'Макс.', 65),
+                       ('rows', 'Строки', 70), ('bytes', 'Байты', 80))
+
+# Размер страницы дерева записей, запас строк при первой загрузке, предельное
+# количество строк в дереве и доля прокрутки, при которой подгружается
+# соседняя страница
+PAGE_SIZE = 100
+PREFETCH = 50
+WINDOW_SIZE = 300
+SCROLL_MARGIN = 0.1
+
+# Столбцы дерева записей (идентификатор, столбец таблицы Books и
+# заголовок), порядок по умолчанию и обозначения направления сортировки
+TREE_COLUMNS = (('column_1', 'id', 'Id'), ('column_2', 'author', 'Author'),
+                ('column_3', 'title', 'Title'), ('column_4', 'year', 'Year'),
+                ('column_5', 'status', 'Status'))
+DEFAULT_ORDER = ('id', False)
+SORT_MARKS = {False: ' ▲', True: ' ▼'}
+
+# Размер основного окна приложения
+WINDOW_WIDTH = 698
+WINDOW_HEIGHT = 660
+
+# Операции меню обслуживания базы данных, задержка (мс) первой проверки
+# планового снимка после запуска и интервал (мс) следующих проверок
+MAINTENANCE_LABELS = (('backup', 'Резервная копия...'), ('snapshot', 'Снимок'),
+                      ('optimize', 'Обновить статистику'),
+                      ('check', 'Проверка целостности'), ('vacuum', 'Сжатие'))
+SNAPSHOT_DELAY = 60 * 1000
+SNAPSHOT_CHECK = 60 * 60 * 1000
+
+# Интервал (мс) проверки результатов запросов фонового потока и время (с)
+# ожидания фоновых потоков при закрытии, после которого пользователю
+# сообщается о незавершённой записи
+POLL_INTERVAL = 50
+CLOSE_WAIT = 0.5
+
+# Задержка (мс) поиска по мере ввода после последнего изменения полей
+SEARCH_DELAY = 250
 
 
 class App(tk.Tk):
@@ -55,12 +215,43 @@ class App(tk.Tk):
         при его запуске.
 
     Methods:
+        load_appearance: отложенная настройка стилей и иконки приложения
+
         create_main_menu: формирование основного пользовательского меню
 
         create_tree_widget: формирование дерева записей приложения
 
         item_selected: обработка выбора выделения строки в дереве записей
 
+        selected_books: записи о книгах всех выделенных строк
+
+        sort_tree: сортировка дерева записей по столбцу
+
+        fill_tree: полное заполнение дерева записей
+
+        refresh_rows: точечное обновление строк дерева записей
+
+        insert_books: добавление книг в дерево записей
+
+        replace_books: замена строк дерева записей с повторным
+        использованием существующих строк
+
+        delete_books: удаление строк из дерева записей
+
+        on_tree_scroll: подгрузка страниц записей при прокрутке дерева
+
+        show_first_page: отображение первой страницы каталога
+
+        load_page: загрузка следующей или предыдущей страницы записей
+
+        show_page: отображение загруженной страницы записей
+
+        run: выполнение запроса к базе данных в фоновом потоке
+
+        poll_worker: получение результатов запросов фонового потока
+
+        on_error: обработка ошибки запроса к базе данных
+
         btn_add: действие при нажатии на кнопку -> добавить книгу
 
         btn_change: действие при нажатии на кнопку -> изменить книгу
@@ -69,37 +260,86 @@ class App(tk.Tk):
 
         btn_delete: действие при нажатии на кнопку -> удалить книгу
 
+        btn_status: действие при нажатии на кнопку -> статус выделенных книг
+
+        btn_import: действие при нажатии на кнопку -> импорт книг из файла
+
+        btn_export: действие при нажатии на кнопку -> экспорт книг в файл
+
+        btn_diagnostics: действие при нажатии на кнопку -> окно диагностики
+        с замерами операций
+
+        btn_maintenance: действие при нажатии на кнопку -> обслуживание
+        базы данных
+
+        run_maintenance: выполнение операции обслуживания в отдельном
+        фоновом потоке
+
+        scheduled_snapshot: плановый снимок базы данных
+
         update_tree: действие при нажатии на кнопку -> обновить дерево записей
 
-        toplevel_window: формирование модального окна верхнего уровня в
+        apply_changes: применение изменений к дереву записей
+
+        toplevel_window: открытие модального окна верхнего уровня в
         зависимости от типа кнопки
+
+        create_dialog: создание модального окна, которое затем
+        используется повторно
+
+        live_search: поиск по мере ввода в окне поиска
+
+        on_close: закрытие подключения к базе данных и окна приложения
     """
 
     def __init__(self):
         super().__init__()
         self.title('Library catalogue')
-        self.geometry('698x660')
-        self.iconbitmap(default='./assets/icons/favicon_main.ico')
+        # Окно сразу размещается по центру экрана по известному размеру, без
+        # расчёта геометрии виджетов через update_idletasks
+        x = (self.winfo_screenwidth() - WINDOW_WIDTH) // 2
+        y = (self.winfo_screenheight() - WINDOW_HEIGHT) // 2
+        self.geometry(f'{WINDOW_WIDTH}x{WINDOW_HEIGHT}+{x}+{y}')
         self.rowconfigure(index=0, weight=1)
         self.columnconfigure(index=0, weight=1)
 
-        style = ttk.Style()
-        style.theme_use('clam')
-        style.configure('mystyle.Treeview.Heading',
-                        font=('Times New Roman', 12, 'bold'),
-                        lightcolor='#242121', darkcolor='#242121')
-        style.configure('mystyle.Treeview', font=('Times New Roman', 12),
-                        lightcolor='#242121')
-
         columns = ('column_1', 'column_2', 'column_3', 'column_4', 'column_5')
         self.tree = ttk.Treeview(columns=columns, show='headings',
+                                 selectmode='extended',
                                  style='mystyle.Treeview')
         self.tree.grid(row=0, column=0, sticky='nsew')
 
-        window_center(self)
-        sql_requests.create.connection_with_request()
+        # Индикатор выполнения запросов в фоновом потоке
+        self.progress = ttk.Progressbar(mode='indeterminate')
+
+        # Проверка схемы и первая страница каталога загружаются в фоновом
+        # потоке, окно отображается с пустым деревом записей
+        self.worker = worker.Worker()
+        self.run(sql_requests.migrate)
+        self.dialogs = {}
         self.tree = self.create_tree_widget()
+        # Журнал изменений сокращается после загрузки первой страницы
+        self.run(sql_requests.trim_journal)
+        self.maintenance = None
+        self.after(SNAPSHOT_DELAY, self.scheduled_snapshot)
         self.menu = self.create_main_menu()
+        self.protocol('WM_DELETE_WINDOW', self.on_close)
+        self.poll_worker()
+        self.after_idle(self.load_appearance)
+
+    def load_appearance(self) -> None:
+        """
+        Настройка стилей и иконки приложения после первой отрисовки окна
+        (смена темы ttk и загрузка файла иконки не задерживают запуск).
+        """
+        style = ttk.Style(self)
+        style.theme_use('clam')
+        style.configure('mystyle.Treeview.Heading',
+                        font=('Times New Roman', 12, 'bold'),
+                        lightcolor='#242121', darkcolor='#242121')
+        style.configure('mystyle.Treeview', font=('Times New Roman', 12),
+                        lightcolor='#242121')
+        self.iconbitmap(default='./assets/icons/favicon_main.ico')
 
     def create_main_menu(self):
         """
@@ -115,42 +355,67 @@ class App(tk.Tk):
         menu.add_cascade(label='Изменить книгу', command=self.btn_change)
         menu.add_cascade(label='Найти книгу', command=self.btn_find)
         menu.add_cascade(label='Удалить книгу', command=self.btn_delete)
+        menu_status = tk.Menu(menu, tearoff=tk.FALSE)
+        for status, label in sql_requests.STATUS_LABELS.items():
+            menu_status.add_command(label=label,
+                                    command=partial(self.btn_status, status))
+        menu.add_cascade(label='Статус', menu=menu_status)
+        menu.add_cascade(label='Импорт', command=self.btn_import)
+        menu.add_cascade(label='Экспорт', command=self.btn_export)
+        menu.add_cascade(label='Диагностика', command=self.btn_diagnostics)
+        menu_maintenance = tk.Menu(menu, tearoff=tk.FALSE)
+        for operation, label in MAINTENANCE_LABELS:
+            menu_maintenance.add_command(
+                label=label, command=partial(self.btn_maintenance, operation))
+        menu.add_cascade(label='Обслуживание', menu=menu_maintenance)
         self.config(menu=menu)
         self.option_add('*tearOff', tk.FALSE)
         return menu
 
     def item_selected(self, event) -> None:
         """
-        Обработка выделения строки в дереве записей приложения
+        Обработка выделения строки в дереве записей приложения: выбранной
+        книгой становится запись Book, по которой построена строка дерева.
 
         Args:
             event: событие при выделении строки
         """
         for selected_item in self.tree.selection():
-            item = self.tree.item(selected_item)
-            self.select_item = item['values']
+            self.select_item = self.books[selected_item]
         return self.select_item
 
+    def selected_books(self) -> list:
+        """
+        Получение записей о книгах всех выделенных строк дерева (выделение
+        нескольких строк - с Ctrl или Shift).
+
+        Returns:
+            books (list): список записей Book.
+        """
+        return [self.books[iid] for iid in self.tree.selection()
+                if iid in self.books]
+
+    @metrics.timed()
     def create_tree_widget(self, bd: list = None):
         """
         Создание основного дерева с записями о книгах сформированного из базы
-        данных.
+        данных. Заголовки, полоса прокрутки и обработчик выделения
+        настраиваются один раз при запуске приложения.
 
         Args:
             bd (list): база данных которая используется для формирования
-            дерева. По умолчанию используются все строки и столбцы из базы
-            данных. При осуществлении пользовательского поиска
-            получает через sql-запрос определённые строки и заполняет
-            дерево согласно указанному условию.
+            дерева. По умолчанию отображается первая страница каталога, а
+            остальные страницы подгружаются при прокрутке.
 
         Returns:
             сформированный объект класса tk -> дерево записей.
         """
-        self.tree.heading('column_1', text='Id', anchor='center')
-        self.tree.heading('column_2', text='Author', anchor='center')
-        self.tree.heading('column_3', text='Title', anchor='center')
-        self.tree.heading('column_4', text='Year', anchor='center')
-        self.tree.heading('column_5', text='Status', anchor='center')
+        # Нажатие на заголовок сортирует каталог запросом к базе данных
+        self.order = DEFAULT_ORDER
+        for name, column, text in TREE_COLUMNS:
+            self.tree.heading(name, text=text, anchor='center',
+                              command=partial(self.sort_tree, column))
+        self.show_order()
 
         self.tree.column('#1', stretch=tk.NO, width=40, anchor='center')
         self.tree.column('#2', stretch=tk.NO, width=240, anchor='center')
@@ -158,48 +423,435 @@ class App(tk.Tk):
         self.tree.column('#4', stretch=tk.NO, width=60, anchor='center')
         self.tree.column('#5', stretch=tk.NO, width=100, anchor='center')
 
-        scrollbar = ttk.Scrollbar(orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscroll=scrollbar.set)
-        scrollbar.grid(row=0, column=1, sticky='ns')
-
-        if type(bd) == list:
-            if len(bd) == 0:
-                showwarning(title='Ошибка',
-                            message='Данная книга/и не найдена в базе данных')
-
-            for item in bd:
-                if item[4] == 1:
-                    self.tree.insert("", tk.END, values=(
-                        item[0], item[1], item[2], item[3], 'В наличии'))
-                else:
-                    self.tree.insert("", tk.END, values=(
-                        item[0], item[1], item[2], item[3], 'Выдана'))
-        else:
-            for item in sql_requests.select.connection_with_request():
-                if item[4] == 1:
-                    self.tree.insert("", tk.END, values=(
-                        item[0], item[1], item[2], item[3], 'В наличии'))
-                else:
-                    self.tree.insert("", tk.END, values=(
-                        item[0], item[1], item[2], item[3], 'Выдана'))
+        self.scrollbar = ttk.Scrollbar(orient=tk.VERTICAL,
+                                       command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.on_tree_scroll)
+        self.scrollbar.grid(row=0, column=1, sticky='ns')
 
+        # Записи Book для строк, загруженных в дерево, по id строки
+        self.books = {}
+        self.paged, self.loading, self.generation = False, False, 0
+        self.tree_version = None
+        self.fill_tree(bd)
         self.tree.bind('<<TreeviewSelect>>', self.item_selected)
 
         return self.tree
 
+    def sort_tree(self, column: str) -> None:
+        """
+        Обработка нажатия на заголовок дерева записей: сортировка по
+        столбцу, повторное нажатие меняет направление. Каталог заново
+        загружается с первой страницы в новом порядке, а результаты поиска
+        сортируются запросом к базе данных по id отображаемых книг.
+
+        Args:
+            column (str): столбец таблицы Books.
+        """
+        current, descending = self.order
+        self.order = (column, not descending if column == current else False)
+        self.show_order()
+
+        if self.paged:
+            self.fill_tree()
+            return None
+        ids = [int(iid) for iid in self.tree.get_children()]
+        if ids:
+            query = sql_requests.Query().filter(ids=ids).order_by(*self.order)
+            self.run(query.fetch, callback=partial(self.fill_tree,
+                                                   notify=False), key='tree')
+
+    def show_order(self) -> None:
+        """
+        Отображение направления сортировки в заголовке столбца.
+        """
+        column, descending = self.order
+        for name, field, text in TREE_COLUMNS:
+            if field == column:
+                text += SORT_MARKS[descending]
+            self.tree.heading(name, text=text)
+
+    def sort_key(self, book: sql_requests.Book) -> tuple:
+        """
+        Получение ключа сортировки записи в текущем порядке дерева.
+
+        Args:
+            book (Book): запись о книге.
+
+        Returns:
+            key (tuple): значение столбца сортировки и id.
+        """
+        return getattr(book, self.order[0]), book.id
+
+    def fill_tree(self, bd: list = None, notify: bool = True) -> None:
+        """
+        Полное заполнение дерева записей: строки, которых нет в новых
+        записях, удаляются, остальные переиспользуются.
+
+        Args:
+            bd (list, optional): база данных которая используется для
+            формирования дерева. По умолчанию в фоновом потоке загружается
+            первая страница каталога, а остальные страницы подгружаются при
+            прокрутке. При осуществлении пользовательского поиска получает
+            через sql-запрос определённые строки и заполняет дерево
+            согласно указанному условию.
+
+            notify (bool, optional): предупреждать, если записи не найдены
+            (не используется при поиске по мере ввода).
+        """
+        if type(bd) != list:
+            self.run(first_page, self.order, callback=self.show_first_page,
+                     key='tree')
+            return None
+
+        if len(bd) == 0 and notify:
+            showwarning(title='Ошибка',
+                        message='Данная книга/и не найдена в базе данных')
+
+        self.generation += 1
+        self.paged, self.loading, self.tree_version = False, False, None
+        self.replace_books(bd)
+
+    @metrics.timed()
+    def show_first_page(self, result: tuple) -> None:
+        """
+        Отображение первой страницы каталога, загруженной в фоновом потоке.
+        Полный каталог отображается окном из нескольких страниц, которые
+        подгружаются при прокрутке (keyset-пагинация в порядке
+        сортировки).
+
+        Args:
+            result (tuple): версия данных и список записей Book первой
+            страницы.
+        """
+        version, books = result
+        self.generation += 1
+        self.paged, self.loading, self.tree_version = True, False, version
+        self.at_start, self.at_end = True, len(books) < PAGE_SIZE + PREFETCH
+        self.replace_books(books)
+
+    @metrics.timed()
+    def refresh_rows(self, changes: list) -> None:
+        """
+        Точечное обновление дерева записей после изменения книг: строки
+        удалённых книг удаляются, изменённых - обновляются, а добавленные
+        книги вставляются на своё место, если попадают в загруженное окно
+        каталога.
+
+        Args:
+            changes (list): пары (id, список с записью Book - пустой, если
+            книга удалена).
+        """
+        # Строки удалённых книг удаляются из дерева одним вызовом
+        deleted = [str(book_id) for book_id, books in changes
+                   if not books and self.tree.exists(str(book_id))]
+        if deleted:
+            self.delete_books(*deleted)
+
+        for book_id, books in changes:
+            iid = str(book_id)
+
+            if not books:
+                continue
+            elif self.tree.exists(iid):
+                # Строка, значение сортировки которой изменилось,
+                # переставляется на своё место
+                if not self.paged or self.sort_key(
+                        self.books[iid]) == self.sort_key(books[0]):
+                    self.insert_books(books)
+                    continue
+                self.delete_books(iid)
+
+            if self.paged:
+                keys = [self.sort_key(self.books[i])
+                        for i in self.tree.get_children()]
+                if self.order[1]:
+                    position = len(keys) - bisect.bisect(
+                        keys[::-1], self.sort_key(books[0]))
+                else:
+                    position = bisect.bisect(keys, self.sort_key(books[0]))
+                if (position > 0 or self.at_start) and (
+                        position < len(keys) or self.at_end):
+                    self.insert_books(books, position)
+
+    def insert_books(self, books: list, index: [int, str] = tk.END) -> None:
+        """
+        Добавление книг в дерево записей. Идентификатором строки дерева
+        является id книги, строки уже загруженных книг обновляются.
+
+        Args:
+            books (list): список записей Book.
+
+            index (int, str, optional): позиция вставки в дереве записей.
+        """
+        for book in books:
+            iid = str(book.id)
+            if self.tree.exists(iid):
+                self.tree.item(iid, values=book.values)
+            else:
+                self.tree.insert("", index, iid=iid, values=book.values)
+                if index != tk.END:
+                    index += 1
+            self.books[iid] = book
+
+    @metrics.timed()
+    def replace_books(self, books: list) -> None:
+        """
+        Замена содержимого дерева записей списком книг без пересоздания
+        строк: удаляются только строки, которых нет в списке, значения
+        остальных обновляются при изменении, а строки перемещаются, только
+        если стоят не на своём месте (например, при сужении результатов
+        поиска строки лишь удаляются).
+
+        Args:
+            books (list): список записей Book в порядке отображения.
+        """
+        iids = [str(book.id) for book in books]
+        keep = set(iids)
+        self.delete_books(*[iid for iid in self.tree.get_children()
+                            if iid not in keep])
+
+        children, position, placed = self.tree.get_children(), 0, set()
+        for index, (iid, book) in enumerate(zip(iids, books)):
+            while position < len(children) and children[position] in placed:
+                position += 1
+            if position < len(children) and children[position] == iid:
+                position += 1
+                if self.books[iid] != book:
+                    self.tree.item(iid, values=book.values)
+            elif iid in self.books:
+                self.tree.move(iid, '', index)
+                if self.books[iid] != book:
+                    self.tree.item(iid, values=book.values)
+            else:
+                self.tree.insert('', index, iid=iid, values=book.values)
+            placed.add(iid)
+            self.books[iid] = book
+
+    def delete_books(self, *iids: str) -> None:
+        """
+        Удаление строк из дерева записей вместе с их записями Book.
+
+        Args:
+            iids (str): id строк дерева.
+        """
+        self.tree.delete(*iids)
+        for iid in iids:
+            self.books.pop(iid, None)
+
+    def on_tree_scroll(self, first: str, last: str) -> None:
+        """
+        Обработка прокрутки дерева записей: обновление положения
+        полосы прокрутки и подгрузка соседней страницы при приближении к
+        границе загруженного окна записей.
+
+        Args:
+            first (str): доля дерева выше видимой области.
+
+            last (str): доля дерева до нижней границы видимой области.
+        """
+        self.scrollbar.set(first, last)
+        if not self.paged or self.loading:
+            return None
+        if float(last) >= 1 - SCROLL_MARGIN and not self.at_end:
+            self.load_page(True)
+        elif float(first) <= SCROLL_MARGIN and not self.at_start:
+            self.load_page(False)
+
+    def load_page(self, forward: bool) -> None:
+        """
+        Запрос следующей или предыдущей страницы записей в фоновом потоке.
+
+        Args:
+            forward (bool): True - следующая страница, False - предыдущая.
+        """
+        children = self.tree.get_children()
+        if not children:
+            return None
+
+        self.loading = True
+        boundary = self.books[children[-1] if forward else children[0]]
+        self.run(load_books, self.order, PAGE_SIZE, boundary, forward,
+                 callback=partial(self.show_page, forward, self.generation),
+                 errback=self.on_page_error)
+
+    @metrics.timed()
+    def show_page(self, forward: bool, generation: int, books: list) -> None:
+        """
+        Отображение загруженной страницы записей. Количество строк в
+        дереве ограничено WINDOW_SIZE - записи с противоположного края окна
+        удаляются, а видимая область остаётся на месте.
+
+        Args:
+            forward (bool): True - следующая страница, False - предыдущая.
+
+            generation (int): номер заполнения дерева на момент запроса -
+            страница отбрасывается, если дерево было заполнено заново.
+
+            books (list): список записей Book страницы.
+        """
+        try:
+            children = self.tree.get_children()
+            if generation != self.generation or not children:
+                return None
+            anchor = children[min(int(self.tree.yview()[0] * len(children)),
+                                  len(children) - 1)]
+
+            if forward:
+                self.at_end = len(books) < PAGE_SIZE
+                self.insert_books(books)
+                excess = len(children) + len(books) - WINDOW_SIZE
+                if excess > 0:
+                    self.delete_books(*children[:excess])
+                    self.at_start = False
+            else:
+                self.at_start = len(books) < PAGE_SIZE
+                self.insert_books(books, 0)
+                excess = len(children) + len(books) - WINDOW_SIZE
+                if excess > 0:
+                    self.delete_books(*children[-excess:])
+                    self.at_end = False
+
+            children = self.tree.get_children()
+            if self.tree.exists(anchor):
+                self.tree.yview_moveto(children.index(anchor) / len(children))
+        finally:
+            self.loading = False
+
+    def on_page_error(self, error: Exception) -> None:
+        """
+        Обработка ошибки загрузки страницы записей.
+
+        Args:
+            error (Exception): исключение, возникшее при запросе.
+        """
+        self.loading = False
+        self.on_error(error)
+
+    def run(self, function, *args, callback=None, errback=None,
+            key: str = None, **kwargs) -> worker.Task:
+        """
+        Выполнение запроса к базе данных в фоновом потоке. Результат
+        передаётся в callback в потоке интерфейса.
+
+        Args:
+            function (callable): функция запроса.
+
+            callback (callable, optional): получатель результата запроса.
+
+            errback (callable, optional): получатель исключения, по
+            умолчанию - on_error.
+
+            key (str, optional): ключ запроса - новый запрос с тем же ключом
+            отменяет предыдущий (например, устаревший поиск).
+
+        Returns:
+            task (Task): поставленный в очередь запрос.
+        """
+        return self.worker.submit(function, *args, callback=callback,
+                                  errback=errback or self.on_error, key=key,
+                                  **kwargs)
+
+    def poll_worker(self) -> None:
+        """
+        Периодическое получение результатов запросов фонового потока и
+        отображение индикатора загрузки, пока запросы выполняются.
+        """
+        try:
+            self.worker.poll()
+            if self.maintenance is not None:
+                self.maintenance.poll()
+        finally:
+            busy = self.worker.busy or (self.maintenance is not None and
+                                        self.maintenance.busy)
+            if busy and not self.progress.winfo_ismapped():
+                self.progress.grid(row=1, column=0, columnspan=2,
+                                   sticky='ew')
+                self.progress.start()
+            elif not busy and self.progress.winfo_ismapped():
+                self.progress.stop()
+                self.progress.grid_remove()
+            self.after(POLL_INTERVAL, self.poll_worker)
+
+    def on_error(self, error: Exception) -> None:
+        """
+        Обработка ошибки запроса к базе данных, выполненного в фоновом
+        потоке.
+
+        Args:
+            error (Exception): исключение, возникшее при запросе.
+        """
+        log.error('Ошибка запроса к базе данных', exc_info=error)
+        showerror(title='Ошибка',
+                  message=f'Ошибка при обращении к базе данных:\n{error}')
+
     def toplevel_window(self, btn_name: str) -> None:
         """
-        Создание модального окна верхнего уровня при взаимодействии
-        пользователя с инструментами основного меню.
+        Открытие модального окна верхнего уровня при взаимодействии
+        пользователя с инструментами основного меню. Окно каждого вида
+        создаётся при первом открытии (create_dialog), при закрытии
+        скрывается, а при следующем открытии используется повторно с
+        очищенными полями.
 
         Args:
             btn_name (str): строковое обозначение кнопки для которой
             формируется окно с определёнными характеристиками.
         """
+        # Проверка осуществлен ли выбор любой строки для изменения
+        if btn_name == 'btn_change' and not hasattr(self, 'select_item'):
+            showerror(title='Ошибка',
+                      message='Ни одна книга не выбрана\nСделана запись в лог-файл')
+            return logging(type_error='AttributeError', operation=btn_name)
+
+        dialog = self.dialogs.get(btn_name)
+        if dialog is None:
+            dialog = self.dialogs[btn_name] = self.create_dialog(btn_name)
+
+        for field in (dialog['author'], dialog['title'], dialog['year']):
+            field.delete(0, tk.END)
+        if btn_name == 'btn_find':
+            dialog['search'].update(query=None, books=None, pending=None,
+                                    task=None)
+            dialog['window'].title('Найти книгу')
+        else:
+            dialog['status'].set('')
+
+        if btn_name == 'btn_change':
+            dialog['author'].insert(0, self.select_item.author)
+            dialog['title'].insert(0, self.select_item.title)
+            dialog['year'].insert(0, self.select_item.year)
+            dialog['status'].set(self.select_item.status_label)
+
+        window_center(dialog['window'])
+        dialog['author'].focus_set()
+
+    def create_dialog(self, btn_name: str) -> dict:
+        """
+        Создание модального окна верхнего уровня определённого вида (окно
+        создаётся скрытым и отображается в toplevel_window).
+
+        Args:
+            btn_name (str): строковое обозначение кнопки для которой
+            формируется окно с определёнными характеристиками.
+
+        Returns:
+            dialog (dict): окно, его поля и состояние поиска по мере ввода
+            (для окна поиска).
+        """
         add_window = tk.Toplevel()
+        add_window.withdraw()
         add_window.geometry('455x265')
         add_window.configure(background='white')
-        window_center(add_window)
+        search_state = None
+
+        def hide() -> None:
+            """
+            Скрытие окна вместо его удаления (отложенный поиск по мере
+            ввода отменяется).
+            """
+            if search_state is not None and search_state['after'] is not None:
+                self.after_cancel(search_state['after'])
+                search_state['after'] = None
+            add_window.withdraw()
 
         def action():
             """
@@ -213,18 +865,20 @@ class App(tk.Tk):
 
                 logging (func, optional): при получении ошибки в ходе
                 операции производит запуск функции осуществляющей её запись в
-                текстовый файл.
+                журнал приложения.
             """
             book_author = entry_author.get()
             book_title = entry_title.get()
             book_year = spinbox_year.get()
 
             if btn_name == 'btn_find':
-                self.update_tree(
-                    sql_requests.where.connection_with_request(book_author,
-                                                               book_title,
-                                                               book_year))
-                add_window.destroy()
+                # Результат поиска по мере ввода уже отображается
+                if search_state['query'] != (book_author, book_title,
+                                             book_year):
+                    self.run(sql_requests.find.connection_with_request,
+                             book_author, book_title, book_year,
+                             callback=self.update_tree, key='tree')
+                hide()
                 return None
 
             select_status = combobox_status.get()
@@ -239,25 +893,22 @@ class App(tk.Tk):
 
             # Проверка блока на ошибку при вводе в поле вместо цифр для года - буквы или другие знаки
             try:
+                book_year, book_status = int(book_year), int(book_status)
                 if btn_name == 'btn_add':
-                    sql_requests.insert.connection_with_request(book_author,
-                                                                book_title,
-                                                                int(book_year),
-                                                                int(book_status))
+                    request, book_id = sql_requests.insert, None
                 elif btn_name == 'btn_change':
-                    book_id = self.select_item[0]
-                    sql_requests.update.connection_with_request(book_author,
-                                                                book_title,
-                                                                int(book_year),
-                                                                int(book_status),
-                                                                book_id)
+                    request, book_id = sql_requests.update, self.select_item.id
             except:
                 showerror(title='Ошибка',
                           message='Нельзя указывать никакие другие символы в поле "год" кроме цифр\nСделана запись в лог-файл')
-                return logging(type_error='ValueError')
+                return logging(type_error='ValueError', operation=btn_name,
+                               book_year=book_year)
 
-            self.update_tree()
-            add_window.destroy()
+            self.run(request.connection_with_request, book_author, book_title,
+                     book_year, book_status, book_id,
+                     callback=lambda book_id: self.update_tree(
+                         changed=[book_id]))
+            hide()
 
         # Названия полей модального окна
         label_author = ttk.Label(add_window, text='Автор:',
@@ -303,34 +954,105 @@ class App(tk.Tk):
             label_status.destroy()
             combobox_status.destroy()
             label_text = ttk.Label(add_window,
-                                   text='необходимо выбрать и заполнить ОДНО поле по которому будет осуществляться поиск книги',
+                                   text='поиск по началу слов автора и названия без учёта регистра, при заполнении нескольких полей книга должна соответствовать всем',
                                    font=('Times New Roman', 10),
                                    background='white', wraplength=350,
                                    justify=tk.CENTER)
             label_text.place(x=61, y=154)
             btn_submit = ttk.Button(add_window, text='Найти книгу',
                                     command=action)
+            search_state = self.live_search(add_window, entry_author,
+                                            entry_title, spinbox_year)
         elif btn_name == 'btn_change':
             add_window.title('Изменить книгу')
             add_window.iconbitmap('./assets/icons/favicon_change.ico')
             btn_submit = ttk.Button(add_window, text='Изменить книгу',
                                     command=action)
 
-            # Проверка осуществлен ли выбор любой строки для изменения или
-            # удаления
-            try:
-                entry_author.insert(0, self.select_item[1])
-                entry_title.insert(0, self.select_item[2])
-                spinbox_year.insert(0, self.select_item[3])
-                combobox_status.set('В наличии' if self.select_item[
-                                                       4] == 'В наличии' else 'Выдана')
-            except:
-                showerror(title='Ошибка',
-                          message='Ни одна книга не выбрана\nСделана запись в лог-файл')
-                add_window.destroy()
-                return logging(type_error='AttributeError')
-
         btn_submit.place(x=180, y=208)
+        add_window.protocol('WM_DELETE_WINDOW', hide)
+        return {'window': add_window, 'author': entry_author,
+                'title': entry_title, 'year': spinbox_year,
+                'status': combobox_status, 'search': search_state}
+
+    def live_search(self, window: tk.Toplevel, entry_author: ttk.Entry,
+                    entry_title: ttk.Entry,
+                    spinbox_year: ttk.Spinbox) -> dict:
+        """
+        Поиск по мере ввода в окне поиска. Запрос выполняется через
+        SEARCH_DELAY мс после последнего изменения полей, поэтому при
+        быстром вводе выполняется только последний запрос. Если новый
+        запрос уточняет предыдущий (например, добавлена буква), а результат
+        предыдущего полный (меньше SEARCH_LIMIT книг), отбор выполняется в
+        памяти без обращения к базе данных.
+
+        Args:
+            window (Toplevel): окно поиска.
+
+            entry_author (Entry): поле автора книги.
+
+            entry_title (Entry): поле названия книги.
+
+            spinbox_year (Spinbox): поле года издания книги.
+
+        Returns:
+            state (dict): состояние поиска - отображаемый запрос и его
+            результат, выполняемый запрос и отложенный вызов.
+        """
+        state = {'query': None, 'books': None, 'pending': None, 'task': None,
+                 'after': None}
+
+        def schedule(event=None) -> None:
+            """
+            Откладывание поиска до окончания ввода.
+            """
+            if state['after'] is not None:
+                self.after_cancel(state['after'])
+            state['after'] = self.after(SEARCH_DELAY, start)
+
+        def start() -> None:
+            """
+            Выполнение поиска: отбор в памяти или запрос в фоновом потоке.
+            """
+            state['after'] = None
+            if not window.winfo_exists():
+                return None
+            query = (entry_author.get(), entry_title.get(),
+                     spinbox_year.get())
+            if query in (state['query'], state['pending']):
+                return None
+            if state['task'] is not None:
+                self.worker.cancel(state['task'])
+            state['pending'], state['task'] = query, None
+
+            if not any(part.strip() for part in query):
+                state.update(query=query, books=None, pending=None)
+                window.title('Найти книгу')
+                return self.fill_tree()
+
+            if (state['books'] is not None and
+                    len(state['books']) < sql_requests.SEARCH_LIMIT and
+                    sql_requests.refines(state['query'], query)):
+                return show(query, sql_requests.narrow(state['books'],
+                                                       *query))
+
+            state['task'] = self.run(sql_requests.find.connection_with_request,
+                                     *query, callback=partial(show, query),
+                                     key='tree')
+
+        def show(query: tuple, books: list) -> None:
+            """
+            Отображение результата поиска в дереве записей.
+            """
+            state.update(query=query, books=books, pending=None, task=None)
+            self.fill_tree(books, notify=False)
+            if window.winfo_exists():
+                window.title(f'Найти книгу - найдено: {len(books)}')
+
+        for field in (entry_author, entry_title, spinbox_year):
+            field.bind('<KeyRelease>', schedule)
+        spinbox_year.configure(command=schedule)
+        return state
 
     # Методы для работы с кнопками основного меню
     ####################################################
@@ -358,45 +1080,371 @@ class App(tk.Tk):
     def btn_delete(self):
         """
         Запуск диалогового окна при взаимодействии пользователя с
-        инструментом основного меню -> удалить книгу.
+        инструментом основного меню -> удалить книгу. Выделенные книги
+        удаляются одной транзакцией, после чего из дерева удаляются только
+        их строки.
 
         Returns:
             logging (func, optional): при получении ошибки в ходе
             операции производит запуск функции осуществляющей её запись в
-            текстовый файл.
+            журнал приложения.
         """
+        books = self.selected_books()
+        if not books:
+            showerror(title='Ошибка',
+                      message='Ни одна книга не выбрана\nСделана запись в лог-файл')
+            return logging(type_error='AttributeError',
+                           operation='btn_delete')
+
         result = askyesno(title='Удаление книги из библиотеки',
-                          message='Подтвердить удаление?')
+                          message=f'Подтвердить удаление? '
+                                  f'Выбрано книг: {len(books)}')
         if result:
-            try:
-                sql_requests.delete.connection_with_request(
-                    book_id=self.select_item[0])
-            except:
-                showerror(title='Ошибка',
-                          message='Ни одна книга не выбрана\nСделана запись в лог-файл')
-                return logging(type_error='AttributeError')
-            self.update_tree()
-            showinfo('Результат', 'Операция подтверждена', icon='info')
+            def deleted(result: tuple) -> None:
+                self.apply_changes(result)
+                showinfo('Результат', 'Операция подтверждена', icon='info')
+
+            self.run(change_books, sql_requests.delete_many,
+                     [book.id for book in books], callback=deleted)
         else:
             showinfo('Результат', 'Операция отменена', icon='warning')
 
-    def update_tree(self, bd: list = None) -> None:
+    def btn_status(self, book_status: int) -> None:
         """
-        Удаление текущего дерева записей и формирование нового дерева
-        записей с актуальными данными из базы данных через функцию ->
-        create_tree_widget().
+        Изменение статуса всех выделенных книг при взаимодействии
+        пользователя с инструментом основного меню -> статус. Изменение
+        выполняется одной транзакцией, а в дереве обновляются только строки
+        выделенных книг.
+
+        Args:
+            book_status (int): новый статус (1 - в наличии, 0 - выдана).
+
+        Returns:
+            logging (func, optional): при получении ошибки в ходе
+            операции производит запуск функции осуществляющей её запись в
+            журнал приложения.
+        """
+        books = self.selected_books()
+        if not books:
+            showerror(title='Ошибка',
+                      message='Ни одна книга не выбрана\nСделана запись в лог-файл')
+            return logging(type_error='AttributeError',
+                           operation='btn_status')
+
+        self.run(change_books, sql_requests.set_status,
+                 [book.id for book in books if book.status != book_status],
+                 book_status, callback=self.apply_changes)
+
+    def btn_import(self):
+        """
+        Запуск диалога выбора файла csv/jsonl при взаимодействии
+        пользователя с инструментом основного меню -> импорт.
+
+        Returns:
+            logging (func, optional): при получении ошибки в ходе
+            операции производит запуск функции осуществляющей её запись в
+            журнал приложения.
+        """
+        path = askopenfilename(title='Импорт книг', filetypes=FILE_TYPES)
+        if not path:
+            return None
+
+        def imported(result: dict) -> None:
+            self.update_tree()
+            showinfo('Результат', f"Загружено записей: {result['rows']} за "
+                                  f"{result['seconds']} с "
+                                  f"({result['rows_per_sec']} записей/с)")
+
+        def failed(error: Exception) -> None:
+            # Часть пачек могла быть добавлена до ошибки
+            self.update_tree()
+            if not isinstance(error, (OSError, ValueError)):
+                return self.on_error(error)
+            showerror(title='Ошибка',
+                      message=f'{error}\nСделана запись в лог-файл')
+            logging(type_error='ValueError', operation='btn_import',
+                    path=path, error=str(error))
+
+        self.run(bulk.import_books, path, callback=imported, errback=failed)
+
+    def btn_export(self) -> None:
+        """
+        Запуск диалога сохранения файла csv/jsonl при взаимодействии
+        пользователя с инструментом основного меню -> экспорт.
+        """
+        path = asksaveasfilename(title='Экспорт книг', filetypes=FILE_TYPES,
+                                 defaultextension='.csv')
+        if not path:
+            return None
+
+        def exported(result: dict) -> None:
+            showinfo('Результат', f"Выгружено записей: {result['rows']} за "
+                                  f"{result['seconds']} с "
+                                  f"({result['rows_per_sec']} записей/с)")
+
+        self.run(bulk.export_books, path, callback=exported)
+
+    def btn_maintenance(self, operation: str) -> None:
+        """
+        Запуск операции обслуживания базы данных при взаимодействии
+        пользователя с инструментом основного меню -> обслуживание. По
+        завершении отображается отчёт с временем выполнения.
+
+        Args:
+            operation (str): backup, snapshot, optimize, check или vacuum.
+        """
+        args = ()
+        if operation == 'backup':
+            path = asksaveasfilename(title='Резервная копия',
+                                     filetypes=(('SQLite', '*.db'),),
+                                     defaultextension='.db')
+            if not path:
+                return None
+            args = (path,)
+        elif operation == 'optimize':
+            args = (True,)
+        elif operation == 'vacuum' and not askyesno(
+                title='Сжатие', message='На время сжатия изменения каталога '
+                                        'будут ожидать его завершения. '
+                                        'Продолжить?'):
+            return None
+
+        def done(result: dict) -> None:
+            details = '\n'.join(f'{name}: {value}'
+                                 for name, value in result.items()
+                                 if name != 'operation')
+            if result.get('errors'):
+                showwarning(title='Обслуживание', message=details)
+            else:
+                showinfo(title='Обслуживание', message=details)
+
+        self.run_maintenance(getattr(maintenance, operation), *args,
+                             callback=done)
+
+    def run_maintenance(self, function, *args, callback=None,
+                        errback=None) -> worker.Task:
+        """
+        Выполнение операции обслуживания в отдельном фоновом потоке: она
+        использует своё подключение к базе данных, поэтому запросы
+        приложения в это время продолжают выполняться.
+
+        Args:
+            function (callable): функция модуля maintenance.
+
+            callback (callable, optional): получатель отчёта об операции.
+
+            errback (callable, optional): получатель исключения, по
+            умолчанию - on_error.
+
+        Returns:
+            task (Task): поставленная в очередь операция.
+        """
+        if self.maintenance is None:
+            self.maintenance = worker.Worker()
+        return self.maintenance.submit(function, *args, callback=callback,
+                                       errback=errback or self.on_error)
+
+    def scheduled_snapshot(self) -> None:
+        """
+        Периодическая проверка планового снимка базы данных: снимок
+        создаётся, если с последнего прошло maintenance.SNAPSHOT_INTERVAL
+        секунд. Ошибка снимка записывается в журнал без окна с ошибкой.
+        """
+        if not sql_requests.connection.remote:
+            self.run_maintenance(
+                maintenance.scheduled_snapshot,
+                errback=lambda error: log.error(
+                    'Ошибка планового снимка базы данных', exc_info=error,
+                    extra={'operation': 'SNAPSHOT'}))
+        self.after(SNAPSHOT_CHECK, self.scheduled_snapshot)
+
+    def btn_diagnostics(self) -> None:
+        """
+        Запуск окна диагностики при взаимодействии пользователя с
+        инструментом основного меню -> диагностика. В окне отображаются
+        замеры операций (вызовы, задержки, строки и объём данных) и
+        счётчики кэша, замеры можно включить, сбросить, сохранить в файл, а
+        также запустить профилирование одного медленного вызова.
+        """
+        window = tk.Toplevel()
+        window.title('Диагностика')
+        window.geometry('640x420')
+        window.rowconfigure(index=0, weight=1)
+        window.columnconfigure(index=0, weight=1)
+
+        table = ttk.Treeview(window, show='headings',
+                             columns=[name for name, _, _ in
+                                      DIAGNOSTICS_COLUMNS])
+        for name, text, width in DIAGNOSTICS_COLUMNS:
+            table.heading(name, text=text, anchor='center')
+            table.column(name, stretch=tk.NO, width=width, anchor='center')
+        table.grid(row=0, column=0, columnspan=6, sticky='nsew')
+        label_cache = ttk.Label(window)
+        label_cache.grid(row=1, column=0, columnspan=6, sticky='w')
+
+        enabled = tk.BooleanVar(window, value=metrics.enabled)
+        operation = ttk.Combobox(window, width=18)
+        threshold = ttk.Spinbox(window, from_=0, to=60000, increment=50,
+                                width=6)
+        threshold.set(100)
+
+        def refresh() -> None:
+            """
+            Обновление таблицы замеров и счётчиков кэша.
+            """
+            if not window.winfo_exists():
+                return None
+            snapshot = metrics.snapshot()
+            table.delete(*table.get_children())
+            for name, stats in snapshot['operations'].items():
+                table.insert('', tk.END, values=[name] + [
+                    stats[column] for column, _, _ in DIAGNOSTICS_COLUMNS[1:]])
+            operation['values'] = list(snapshot['operations'])
+            cache = sql_requests.cache_stats()
+            label_cache.configure(text=(
+                f"Кэш: попаданий {cache['hits']}, промахов {cache['misses']}, "
+                f"записей {cache['size']}; профили: "
+                f"{', '.join(snapshot['profiles']) or 'нет'}"))
+            self.after(DIAGNOSTICS_INTERVAL, refresh)
+
+        def toggle() -> None:
+            """
+            Включение или выключение замеров.
+            """
+            if enabled.get():
+                metrics.enable()
+            else:
+                metrics.disable()
+
+        def reset() -> None:
+            """
+            Удаление накопленных замеров.
+            """
+            metrics.reset()
+            table.delete(*table.get_children())
+
+        def profile() -> None:
+            """
+            Профилирование следующего вызова выбранной операции (или любой,
+            если операция не выбрана), который окажется дольше порога.
+            """
+            try:
+                milliseconds = float(threshold.get())
+            except ValueError:
+                return showerror(title='Ошибка',
+                                 message='Порог указывается числом в мс')
+            metrics.profile(operation.get() or None, milliseconds)
+            enabled.set(True)
+
+        def save() -> None:
+            """
+            Сохранение замеров, профилей и счётчиков кэша в файл json.
+            """
+            path = asksaveasfilename(title='Сохранить замеры',
+                                     filetypes=(('JSON', '*.json'),),
+                                     defaultextension='.json', parent=window)
+            if path:
+                try:
+                    metrics.dump(path, cache=sql_requests.cache_stats())
+                except OSError as error:
+                    showerror(title='Ошибка', message=str(error),
+                              parent=window)
+
+        ttk.Checkbutton(window, text='Замеры', variable=enabled,
+                        command=toggle).grid(row=2, column=0, sticky='w')
+        ttk.Button(window, text='Сбросить', command=reset).grid(row=2,
+                                                               column=1)
+        ttk.Button(window, text='Сохранить', command=save).grid(row=2,
+                                                               column=2)
+        operation.grid(row=2, column=3)
+        threshold.grid(row=2, column=4)
+        ttk.Button(window, text='Профилировать', command=profile).grid(
+            row=2, column=5)
+        window_center(window)
+        refresh()
+
+    def update_tree(self, bd: list = None, changed: list = None) -> None:
+        """
+        Обновление дерева записей актуальными данными из базы данных.
+        После изменения книг обновляются только затронутые строки, а
+        обычное обновление пропускается, если версия данных в базе не
+        изменилась с момента последнего заполнения дерева.
 
         Args:
             bd (list, optional): база данных которая используется для
-            формирования дерева. По умолчанию используются все строки и
-            столбцы из базы данных. При осуществлении пользовательского поиска
+            формирования дерева. При осуществлении пользовательского поиска
             получает через sql-запрос определённые строки и заполняет
             дерево согласно указанному условию.
+
+            changed (list, optional): id добавленных, изменённых или
+            удалённых книг для точечного обновления строк дерева.
         """
-        [self.tree.delete(i) for i in self.tree.get_children()]
-        self.tree = self.create_tree_widget(bd)
+        if type(bd) == list:
+            return self.fill_tree(bd)
+
+        self.run(fetch_changes, changed, callback=self.apply_changes)
+
+    @metrics.timed()
+    def apply_changes(self, result: tuple) -> None:
+        """
+        Применение к дереву записей результата проверки изменений,
+        полученного в фоновом потоке.
+
+        Args:
+            result (tuple): версия данных и список пар (id, список с
+            записью Book) или None при обычном обновлении.
+        """
+        version, changes = result
+        if changes is not None:
+            self.refresh_rows(changes)
+            # Учитываются только собственные изменения, изменения других
+            # подключений будут загружены при следующем обновлении
+            if self.tree_version is not None:
+                self.tree_version = (version[0], self.tree_version[1])
+        elif not self.paged or version != self.tree_version:
+            self.fill_tree()
+
+    def on_close(self) -> None:
+        """
+        Остановка фоновых потоков, закрытие общего подключения к базе
+        данных и окна приложения при завершении работы. Запросы чтения
+        отменяются, а запись, импорт и обслуживание выполняются до конца:
+        если они не успели завершиться, пользователю сообщается об
+        ожидании, а ошибки передаются в обычные обработчики.
+        """
+        workers = [self.worker] + ([self.maintenance]
+                                   if self.maintenance is not None else [])
+        if not all([background.stop(CLOSE_WAIT) for background in workers]):
+            showinfo(title='Завершение работы',
+                     message='Выполняется запись в базу данных. Приложение '
+                             'закроется после её завершения.')
+            for background in workers:
+                background.stop()
+        for background in workers:
+            background.poll()
+        sql_requests.close()
+        logger.shutdown()
+        self.destroy()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Каталог книг')
+    parser.add_argument('--db', default=sql_requests.DB_PATH,
+                        help='путь к базе данных')
+    parser.add_argument('--server',
+                        help='адрес сервера каталога (python -m server), '
+                             'например http://127.0.0.1:8765')
+    args = parser.parse_args()
+
+    logger.setup()
+    if os.environ.get(METRICS_VARIABLE):
+        metrics.enable()
+    if args.server:
+        # Клиент сервера (http.client и т.д.) импортируется только при
+        # работе через сервер, чтобы не замедлять запуск приложения
+        from assets.data import client
+        sql_requests.connect(client.RemoteConnection(args.server))
+    else:
+        sql_requests.connection.open(args.db)
     app = App()
     app.mainloop()
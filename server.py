@@ -0,0 +1,570 @@
+import argparse
+import contextlib
+import http.server
+import json
+import queue
+import sqlite3
+import sys
+import threading
+
+from assets.data import sql_requests, logger, maintenance
+
+log = logger.get('server')
+
+HOST = '127.0.0.1'
+PORT = 8765
+
+# Количество подключений для чтения, наибольшее количество операций записи
+# в одной транзакции и время ожидания свободного подключения (с)
+READERS = 4
+GROUP_SIZE = 64
+POOL_TIMEOUT = 30
+
+# Интервал (ч) плановых снимков базы данных и интервал (с) проверки,
+# не пора ли делать снимок
+SNAPSHOT_HOURS = maintenance.SNAPSHOT_INTERVAL / 3600
+SCHEDULE_CHECK = 60 * 60
+
+READS = sql_requests.READS
+WRITES = ('INSERT', 'UPDATE', 'DELETE')
+MANY = ('DELETE', 'STATUS')
+
+
+class Job:
+    """
+    Основное применение - операция записи, ожидающая выполнения в потоке
+    записи.
+
+    Args:
+        function (callable): функция записи.
+
+        args (tuple): аргументы функции.
+    """
+
+    def __init__(self, function, args: tuple):
+        self.function = function
+        self.args = args
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class Writer:
+    """
+    Основное применение - последовательное выполнение всех операций записи
+    в одном потоке через одно подключение. Операции, накопившиеся в
+    очереди за время предыдущей фиксации, выполняются в одной транзакции
+    (group commit): каждая в своей точке сохранения, фиксация - одна на
+    группу.
+
+    Args:
+        path (str): путь к файлу базы данных.
+
+        group_size (int, optional): наибольшее количество операций в одной
+        транзакции.
+
+    Methods:
+        submit(): выполнение операции записи с ожиданием результата.
+
+        version(): версия данных для клиентов.
+
+        stop(): остановка потока записи.
+    """
+
+    def __init__(self, path: str, group_size: int = GROUP_SIZE):
+        self.database = sql_requests.Connection(path)
+        self.group_size = group_size
+        self.jobs = queue.Queue()
+        self.commits = 0
+        self.operations = 0
+        self.thread = threading.Thread(target=self.run, name='sql-writer',
+                                       daemon=True)
+        self.thread.start()
+
+    def submit(self, function, *args):
+        """
+        Постановка операции записи в очередь и ожидание её выполнения.
+
+        Args:
+            function (callable): функция записи, последний аргумент которой -
+            подключение к базе данных.
+
+        Returns:
+            result: результат функции.
+        """
+        job = Job(function, args + (self.database,))
+        self.jobs.put(job)
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def run(self) -> None:
+        """
+        Основной цикл потока записи: получение группы операций из очереди и
+        её выполнение до получения сигнала остановки (None).
+        """
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            group = [job]
+            while len(group) < self.group_size:
+                try:
+                    job = self.jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    self.jobs.put(None)
+                    break
+                group.append(job)
+            self.commit(group)
+        self.database.close()
+
+    def commit(self, group: list) -> None:
+        """
+        Выполнение группы операций в одной транзакции. Ошибка операции
+        откатывает только её точку сохранения, ошибка фиксации - всю
+        группу.
+
+        Args:
+            group (list): операции записи (Job).
+        """
+        try:
+            with self.database.group():
+                for job in group:
+                    try:
+                        job.result = job.function(*job.args)
+                    except Exception as error:
+                        job.error = error
+            self.commits += 1
+            self.operations += len(group)
+        except sqlite3.Error as error:
+            log.exception('Ошибка фиксации группы из %s операций',
+                          len(group), extra={'operation': 'COMMIT'})
+            for job in group:
+                job.result, job.error = None, job.error or error
+        finally:
+            for job in group:
+                job.done.set()
+
+    def version(self) -> tuple:
+        """
+        Получение версии данных: количество операций записи сервера и
+        PRAGMA data_version подключения записи (меняется при изменениях
+        файла базы данных другими программами).
+
+        Returns:
+            version (tuple): пара (writes, data_version).
+        """
+        return self.database.version()
+
+    def stop(self) -> None:
+        """
+        Остановка потока записи после выполнения операций из очереди.
+        """
+        self.jobs.put(None)
+        self.thread.join()
+
+
+class Pool:
+    """
+    Основное применение - набор подключений для чтения, которые
+    используются параллельно (режим WAL позволяет читать во время
+    записи). У каждого подключения свой кэш результатов, который
+    очищается при изменениях, зафиксированных потоком записи.
+
+    Args:
+        path (str): путь к файлу базы данных.
+
+        size (int, optional): количество подключений.
+
+    Methods:
+        connection(): получение свободного подключения на время запроса.
+
+        stats(): суммарные счётчики кэша подключений.
+
+        close(): закрытие подключений.
+    """
+
+    def __init__(self, path: str, size: int = READERS):
+        self.connections = [sql_requests.Connection(path)
+                            for _ in range(size)]
+        self.free = queue.Queue()
+        for database in self.connections:
+            self.free.put(database)
+
+    @contextlib.contextmanager
+    def connection(self):
+        """
+        Получение свободного подключения для чтения.
+
+        Yields:
+            database (Connection): подключение к базе данных.
+        """
+        try:
+            database = self.free.get(timeout=POOL_TIMEOUT)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                'нет свободного подключения для чтения') from None
+        try:
+            yield database
+        finally:
+            self.free.put(database)
+
+    def stats(self) -> dict:
+        """
+        Получение суммарных счётчиков кэша результатов подключений.
+
+        Returns:
+            stats (dict): попадания, промахи, удалённые результаты и
+            размер кэша по всем подключениям.
+        """
+        total = {'hits': 0, 'misses': 0, 'invalidations': 0, 'size': 0}
+        for database in self.connections:
+            with database.lock:
+                for name, value in database.cache.stats().items():
+                    if name in total:
+                        total[name] += value
+        return total
+
+    def close(self) -> None:
+        """
+        Закрытие всех подключений для чтения.
+        """
+        for database in self.connections:
+            database.close()
+
+
+def book_rows(result):
+    """
+    Преобразование результата операции для ответа json: записи Book -
+    в списки значений, остальные результаты не меняются.
+
+    Args:
+        result: результат операции.
+
+    Returns:
+        result: результат, пригодный для json.
+    """
+    if type(result) == list:
+        return [list(book) for book in result]
+    return result
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    """
+    Основное применение - обработка запросов HTTP/JSON к каталогу.
+
+    Запросы:
+        GET /version: версия данных и схемы базы данных.
+
+        GET /stats: счётчики кэша подключений чтения и потока записи.
+
+        POST /request: операция Request - {"name": ..., "params": {...}}.
+
+        POST /many: массовое удаление или изменение статуса -
+        {"name": "DELETE"|"STATUS", "ids": [...], "status": ...}.
+
+        POST /insert: массовое добавление - {"rows": [[author, title,
+        year, status], ...]}.
+
+        POST /query: запрос Query - описание из Query.spec().
+
+        POST /journal: изменения каталога - {"since": seq, "limit": ...}.
+
+        POST /trim: сокращение журнала изменений - {"keep": ...,
+        "days": ...}.
+
+        POST /maintenance: обслуживание базы данных - {"operation":
+        "snapshot"|"optimize"|"check", "analyze": ..., "quick": ...}.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    # Заголовки и тело ответа отправляются отдельно, без отключения
+    # алгоритма Нейгла ответ на постоянном соединении задерживается
+    disable_nagle_algorithm = True
+    server_version = 'LibraryServer/1.0'
+
+    def do_GET(self) -> None:
+        """
+        Обработка запросов GET.
+        """
+        self.respond(lambda body: self.server.get(self.path))
+
+    def do_POST(self) -> None:
+        """
+        Обработка запросов POST.
+        """
+        self.respond(lambda body: self.server.post(self.path, body))
+
+    def respond(self, handler) -> None:
+        """
+        Чтение тела запроса, выполнение операции и отправка ответа json.
+        Ошибки в запросе возвращаются с кодом 400 или 404, ошибки базы
+        данных и остальные ошибки - с кодом 500.
+
+        Args:
+            handler (callable): функция, которая получает тело запроса и
+            возвращает ответ.
+        """
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            body = json.loads(self.rfile.read(length) or b'{}')
+            status, payload = 200, handler(body)
+        except KeyError as error:
+            status, payload = 400, {'error': f'не указано поле {error}'}
+        except LookupError as error:
+            status, payload = 404, {'error': str(error)}
+        except (ValueError, TypeError) as error:
+            status, payload = 400, {'error': str(error)}
+        except sqlite3.Error as error:
+            status, payload = 500, {'error': str(error)}
+        except Exception as error:
+            log.exception('Ошибка обработки запроса %s', self.path,
+                          extra={'operation': 'HTTP'})
+            status, payload = 500, {'error': f'{type(error).__name__}: '
+                                             f'{error}'}
+
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args) -> None:
+        """
+        Запись обращений к серверу в журнал приложения вместо stderr.
+        """
+        log.debug(format, *args, extra={'operation': 'HTTP'})
+
+
+class Server(http.server.ThreadingHTTPServer):
+    """
+    Основное применение - сервер каталога: каждый запрос обрабатывается в
+    отдельном потоке, чтение выполняется через набор подключений Pool, а
+    запись - через один поток Writer.
+
+    Args:
+        path (str): путь к файлу базы данных.
+
+        host (str, optional): адрес сервера.
+
+        port (int, optional): порт сервера (0 - любой свободный).
+
+        readers (int, optional): количество подключений для чтения.
+
+        group_size (int, optional): наибольшее количество операций записи
+        в одной транзакции.
+
+        snapshot_hours (float, optional): интервал плановых снимков базы
+        данных в часах, 0 - без снимков.
+
+    Methods:
+        get(): обработка запросов GET.
+
+        post(): обработка запросов POST.
+
+        schedule(): плановые снимки базы данных.
+
+        close(): остановка сервера и закрытие подключений.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path: str, host: str = HOST, port: int = PORT,
+                 readers: int = READERS, group_size: int = GROUP_SIZE,
+                 snapshot_hours: float = 0):
+        self.writer = Writer(path, group_size)
+        self.schema = sql_requests.migrate(self.writer.database)
+        self.writer.submit(sql_requests.trim_journal,
+                           sql_requests.JOURNAL_KEEP, sql_requests.JOURNAL_DAYS)
+        self.pool = Pool(path, readers)
+        super().__init__((host, port), Handler)
+        self.stopping = threading.Event()
+        if snapshot_hours > 0:
+            threading.Thread(target=self.schedule, args=(snapshot_hours,),
+                             name='snapshots', daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        """
+        Адрес сервера для подключения клиентов.
+        """
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def get(self, path: str) -> dict:
+        """
+        Обработка запросов GET.
+
+        Args:
+            path (str): путь запроса.
+
+        Returns:
+            payload (dict): ответ.
+        """
+        if path == '/version':
+            return {'version': self.writer.version(), 'schema': self.schema}
+        elif path == '/stats':
+            return {'cache': self.pool.stats(),
+                    'commits': self.writer.commits,
+                    'operations': self.writer.operations}
+        raise LookupError(f'неизвестный запрос {path}')
+
+    def post(self, path: str, body: dict) -> dict:
+        """
+        Обработка запросов POST: чтение через набор подключений, запись -
+        через очередь потока записи.
+
+        Args:
+            path (str): путь запроса.
+
+            body (dict): тело запроса.
+
+        Returns:
+            payload (dict): ответ с результатом операции.
+        """
+        if path == '/request':
+            name, params = body['name'], body.get('params') or {}
+            if name in READS:
+                with self.pool.connection() as database:
+                    result = sql_requests.Request(
+                        name, database).connection_with_request(**params)
+            elif name in WRITES:
+                result = self.writer.submit(self.write, name, params)
+            else:
+                raise ValueError(f'недопустимая операция {name}')
+        elif path == '/query':
+            with self.pool.connection() as database:
+                result = sql_requests.Query.from_spec(body, database).fetch()
+        elif path == '/journal':
+            with self.pool.connection() as database:
+                result = sql_requests.changes_since(
+                    int(body.get('since') or 0),
+                    int(body.get('limit') or sql_requests.JOURNAL_PAGE),
+                    database)
+        elif path == '/trim':
+            result = self.writer.submit(
+                sql_requests.trim_journal,
+                int(body.get('keep', sql_requests.JOURNAL_KEEP)),
+                body.get('days', sql_requests.JOURNAL_DAYS))
+        elif path == '/maintenance':
+            operation = body['operation']
+            if operation not in maintenance.REMOTE:
+                raise ValueError(f'недопустимая операция {operation}')
+            options = {name: bool(body[name]) for name in ('analyze', 'quick')
+                       if name in body}
+            result = getattr(maintenance, operation)(
+                database=self.writer.database, **options)
+        elif path == '/many':
+            if body['name'] not in MANY:
+                raise ValueError(f"недопустимая операция {body['name']}")
+            result = self.writer.submit(sql_requests.write_many,
+                                        body['name'], body['ids'],
+                                        body.get('status'))
+        elif path == '/insert':
+            result = self.writer.submit(sql_requests.insert_many,
+                                        [tuple(row) for row in body['rows']])
+        else:
+            raise LookupError(f'неизвестный запрос {path}')
+        return {'result': book_rows(result)}
+
+    @staticmethod
+    def write(name: str, params: dict,
+              database: sql_requests.Connection) -> [None, int]:
+        """
+        Выполнение операции записи Request в потоке записи.
+
+        Args:
+            name (str): тип запроса.
+
+            params (dict): аргументы connection_with_request.
+
+            database (Connection): подключение потока записи.
+
+        Returns:
+            book_id (int): id добавленной, изменённой или удалённой книги.
+        """
+        return sql_requests.Request(name, database).connection_with_request(
+            **params)
+
+    def schedule(self, hours: float) -> None:
+        """
+        Плановые снимки базы данных (VACUUM INTO): раз в SCHEDULE_CHECK
+        секунд проверяется, прошло ли hours часов с последнего снимка.
+
+        Args:
+            hours (float): интервал между снимками в часах.
+        """
+        while True:
+            try:
+                maintenance.scheduled_snapshot(interval=hours * 3600,
+                                               database=self.writer.database)
+            except (OSError, sqlite3.Error):
+                log.exception('Ошибка планового снимка базы данных',
+                              extra={'operation': 'SNAPSHOT'})
+            if self.stopping.wait(min(hours * 3600, SCHEDULE_CHECK)):
+                break
+
+    def close(self) -> None:
+        """
+        Остановка приёма запросов, потока записи и закрытие подключений.
+        """
+        self.stopping.set()
+        self.server_close()
+        self.writer.stop()
+        self.pool.close()
+
+
+def main(argv: list = None) -> int:
+    """
+    Запуск сервера каталога из командной строки.
+
+    Args:
+        argv (list, optional): аргументы командной строки.
+
+    Returns:
+        code (int): код завершения.
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m server',
+        description='Сервер каталога книг (HTTP/JSON) для нескольких '
+                    'копий приложения')
+    parser.add_argument('--db', default=sql_requests.DB_PATH,
+                        help='путь к базе данных')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--readers', type=int, default=READERS,
+                        help='количество подключений для чтения')
+    parser.add_argument('--group-size', type=int, default=GROUP_SIZE,
+                        help='наибольшее количество операций записи в '
+                             'одной транзакции')
+    parser.add_argument('--snapshot-hours', type=float,
+                        default=SNAPSHOT_HOURS,
+                        help='интервал плановых снимков базы данных в '
+                             'часах, 0 - без снимков')
+    args = parser.parse_args(argv)
+
+    logger.setup()
+    try:
+        server = Server(args.db, args.host, args.port, args.readers,
+                        args.group_size, args.snapshot_hours)
+    except (OSError, sqlite3.Error) as error:
+        print(error, file=sys.stderr)
+        return 1
+
+    print(f'Сервер каталога: {server.url}', file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        logger.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+import csv
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from assets.data import sql_requests, bulk
+
+
+class BulkTest(unittest.TestCase):
+    """
+    Проверка импорта и экспорта каталога в файлы csv/jsonl.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.database = sql_requests.Connection(
+            os.path.join(self.directory, 'library.db'))
+        sql_requests.migrate(self.database)
+
+    def tearDown(self):
+        self.database.close()
+        shutil.rmtree(self.directory)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def write_csv(self, name: str, rows: list) -> str:
+        with open(self.path(name), 'w', encoding='utf-8', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(('author', 'title', 'year', 'status'))
+            writer.writerows(rows)
+        return self.path(name)
+
+    def count(self) -> int:
+        with self.database.lock:
+            return self.database.get().execute(
+                'SELECT count(*) FROM Books').fetchone()[0]
+
+    def test_bad_row_inserts_nothing(self):
+        rows = [(f'Автор {number}', f'Книга {number}', 2000, 1)
+                for number in range(25)]
+        rows[17] = ('Автор', 'Книга', 'не год', 1)
+        path = self.write_csv('books.csv', rows)
+
+        with self.assertRaisesRegex(ValueError, 'Строка 19'):
+            bulk.import_books(path, batch_size=5, database=self.database)
+        self.assertEqual(self.count(), 0)
+
+    def test_error_reports_inserted_rows(self):
+        path = self.write_csv('books.csv', [
+            (f'Автор {number}', 'Ошибка' if number == 12 else 'Книга', 2000, 1)
+            for number in range(20)])
+        # Ошибка базы данных после фиксации двух пачек
+        with self.database.lock:
+            self.database.get().execute(
+                "CREATE TRIGGER Books_fail BEFORE INSERT ON Books "
+                "WHEN new.title = 'Ошибка' "
+                "BEGIN SELECT RAISE(ABORT, 'запись отклонена'); END")
+
+        with self.assertRaisesRegex(sqlite3.Error,
+                                    'уже добавлено записей: 10'):
+            bulk.import_books(path, batch_size=5, database=self.database)
+        self.assertEqual(self.count(), 10)
+
+    def test_round_trip(self):
+        rows = [('Пушкин', 'Руслан и Людмила', 1820, 'В наличии'),
+                ('Гоголь', 'Нос, "повесть"', 1836, 'Выдана'),
+                ('Толстой', 'Война и мир', 1869, '1')]
+        result = bulk.import_books(self.write_csv('in.csv', rows),
+                                   database=self.database)
+        self.assertEqual(result['rows'], 3)
+
+        for name in ('out.csv', 'out.jsonl'):
+            self.assertEqual(bulk.export_books(
+                self.path(name), database=self.database)['rows'], 3)
+        with open(self.path('out.jsonl'), encoding='utf-8') as file:
+            exported = [json.loads(line) for line in file]
+        self.assertEqual(exported[1], {'id': 2, 'author': 'Гоголь',
+                                       'title': 'Нос, "повесть"',
+                                       'year': 1836, 'status': 0})
+
+        # Повторный импорт выгрузки: id из файла не используется
+        bulk.import_books(self.path('out.csv'), database=self.database)
+        bulk.import_books(self.path('out.jsonl'), database=self.database)
+        self.assertEqual(
+            list(bulk.iter_books(database=self.database))[-3:],
+            [(7, 'Пушкин', 'Руслан и Людмила', 1820, 1),
+             (8, 'Гоголь', 'Нос, "повесть"', 1836, 0),
+             (9, 'Толстой', 'Война и мир', 1869, 1)])
+
+    def test_jsonl_import(self):
+        with open(self.path('books.jsonl'), 'w', encoding='utf-8') as file:
+            file.write('{"author": "Чехов", "title": "Чайка", "year": 1896}\n'
+                       '\n'
+                       '{"id": 50, "author": " Блок ", "title": "Двенадцать", '
+                       '"year": "1918", "status": "Выдана"}\n')
+        bulk.import_books(self.path('books.jsonl'), database=self.database)
+        self.assertEqual(list(bulk.iter_books(database=self.database)),
+                         [(1, 'Чехов', 'Чайка', 1896, 1),
+                          (2, 'Блок', 'Двенадцать', 1918, 0)])
+
+    def test_invalid_rows(self):
+        for name, text, message in (
+                ('a.jsonl', '{"author": "Чехов", "title": "Чайка"}\n',
+                 'Строка 1: некорректная запись'),
+                ('b.jsonl', '{"author": "Чехов", "title": "Чайка", '
+                            '"year": 1896}\n{"author":\n', 'Expecting'),
+                ('c.csv', 'author,title,year,status\nЧехов,,1896,1\n',
+                 'Строка 2: не заполнен автор или название'),
+                ('d.csv', 'author,title,year,status\nЧехов,Чайка,1896,2\n',
+                 'Строка 2: некорректная запись')):
+            with self.subTest(file=name):
+                with open(self.path(name), 'w', encoding='utf-8') as file:
+                    file.write(text)
+                with self.assertRaisesRegex(ValueError, message):
+                    bulk.import_books(self.path(name), database=self.database)
+        self.assertEqual(self.count(), 0)
+
+    def test_batches(self):
+        rows = [(f'Автор {number}', f'Книга {number}', 1900 + number % 100,
+                 number % 2) for number in range(12345)]
+        # Кэшированный результат чтения обновляется после импорта
+        select = sql_requests.Request('SELECT', self.database)
+        self.assertEqual(select.execute(), [])
+
+        result = bulk.import_books(self.write_csv('in.csv', rows),
+                                   batch_size=1000, database=self.database)
+        self.assertEqual(result['rows'], len(rows))
+        self.assertEqual(len(select.execute()), len(rows))
+
+        books = list(bulk.iter_books(700, database=self.database))
+        self.assertEqual(books, [(number,) + row
+                                 for number, row in enumerate(rows, start=1)])
+        self.assertEqual(bulk.export_books(self.path('out.jsonl'), 700,
+                                           self.database)['rows'], len(rows))
+        with open(self.path('out.jsonl'), encoding='utf-8') as file:
+            self.assertEqual(sum(1 for _ in file), len(rows))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from assets.data import sql_requests
+
+AUTHORS = ('Пушкин', 'Пушкин Александр', 'Гоголь', 'Толстой Лев',
+           'Толстой Алексей', 'Чехов')
+TITLES = ('Нос', 'Мёртвые души', 'Война и мир', 'Мир', 'Ревизор',
+          'Нос и мир', 'Дама с собачкой')
+YEARS = range(1830, 1836)
+
+# Запросы чтения, у которых порядок строк не задан в SQL
+UNORDERED = ('WHERE', 'SELECT')
+
+
+class CacheInvalidationTest(unittest.TestCase):
+    """
+    Случайные последовательности операций записи и чтения: результат
+    чтения через подключение с кэшем должен совпадать с результатом того
+    же запроса через подключение без кэша.
+    """
+
+    operations = 1500
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        path = os.path.join(self.directory, 'library.db')
+        self.cached = sql_requests.Connection(path)
+        sql_requests.migrate(self.cached)
+        self.plain = sql_requests.Connection(path)
+        self.plain.cache = sql_requests.Cache(size=0)
+
+    def tearDown(self):
+        self.cached.close()
+        self.plain.close()
+        shutil.rmtree(self.directory)
+
+    def ids(self) -> list:
+        return [row[0] for row in self.cached.get().execute(
+            'SELECT id FROM Books')]
+
+    def book(self, rng: random.Random) -> tuple:
+        return (rng.choice(AUTHORS), rng.choice(TITLES), rng.choice(YEARS),
+                rng.randint(0, 1))
+
+    def write(self, rng: random.Random) -> None:
+        ids = self.ids()
+        kind = rng.choice(('INSERT', 'INSERT', 'INSERT', 'UPDATE', 'UPDATE',
+                           'STATUS', 'DELETE', 'MANY'))
+        if kind == 'INSERT' or not ids:
+            sql_requests.Request('INSERT', self.cached).execute(
+                *self.book(rng))
+        elif kind == 'UPDATE':
+            book_id = rng.choice(ids)
+            old = sql_requests.Request('BOOK', self.plain).execute(
+                book_id=book_id)[0]
+            # Часто меняется только один столбец
+            new = list(old)[1:]
+            column = rng.randrange(4)
+            new[column] = self.book(rng)[column]
+            if rng.random() < 0.3:
+                new = list(self.book(rng))
+            sql_requests.Request('UPDATE', self.cached).execute(
+                *new, book_id=book_id)
+        elif kind == 'STATUS':
+            sql_requests.set_status(rng.sample(ids, min(len(ids), 3)),
+                                    rng.randint(0, 1), self.cached)
+        elif kind == 'DELETE':
+            sql_requests.Request('DELETE', self.cached).execute(
+                book_id=rng.choice(ids))
+        else:
+            sql_requests.delete_many(rng.sample(ids, min(len(ids), 2)),
+                                     self.cached)
+
+    def read(self, rng: random.Random) -> tuple:
+        top = max(self.ids() or [0]) + 2
+        name = rng.choice(sql_requests.READS)
+        if name == 'WHERE':
+            year = rng.choice((None, rng.choice(YEARS),
+                               str(rng.choice(YEARS))))
+            args = (rng.choice((None,) + AUTHORS),
+                    rng.choice((None,) + TITLES), year, None, None, None)
+        elif name == 'SEARCH':
+            args = (rng.choice((None, 'Пуш', 'гог', 'Толстой')),
+                    rng.choice((None, 'Но', 'мертв', 'мир')),
+                    rng.choice((None, rng.choice(YEARS))), None, None,
+                    rng.choice((3, None)))
+        elif name == 'BOOK':
+            args = (None, None, None, None, rng.randint(1, top), None)
+        elif name in ('NEXT', 'PREVIOUS'):
+            args = (None, None, None, None, rng.randint(0, top),
+                    rng.randint(1, 5))
+        else:
+            args = (None,) * 6
+        return name, args
+
+    def check(self, name: str, args: tuple) -> None:
+        cached = sql_requests.Request(name, self.cached).execute(*args)
+        plain = sql_requests.Request(name, self.plain).execute(*args)
+        if name in UNORDERED:
+            cached, plain = (sorted(cached, key=lambda book: book.id),
+                             sorted(plain, key=lambda book: book.id))
+        self.assertEqual(cached, plain, f'{name}{args}')
+
+    def test_random_operations(self):
+        for seed in range(4):
+            rng = random.Random(seed)
+            sql_requests.insert_many([self.book(rng) for _ in range(60)],
+                                     self.cached)
+            # Небольшой набор запросов повторяется, поэтому результаты
+            # берутся из кэша и проверяется их очистка
+            reads = [self.read(rng) for _ in range(40)]
+            for _ in range(self.operations):
+                if rng.random() < 0.3:
+                    self.write(rng)
+                else:
+                    self.check(*rng.choice(reads))
+                if rng.random() < 0.05:
+                    reads[rng.randrange(len(reads))] = self.read(rng)
+
+        stats = self.cached.cache.stats()
+        self.assertGreater(stats['hits'], 0)
+        self.assertGreater(stats['invalidations'], 0)
+
+    def search_after_deletes(self, remove) -> None:
+        # Удаление книг, которых нет в результате, меняет статистику bm25
+        # и порядок двух найденных книг
+        sql_requests.insert_many(
+            [('Автор', 'мир мир война', 1900, 1),
+             ('Автор', 'мир война война', 1900, 1)] +
+            [('Автор', 'мир', 1900, 1)] * 6 +
+            [('Автор', 'Ревизор', 1900, 1)] * 20, self.cached)
+        args = (None, 'мир война', None, None, None, None)
+        before = sql_requests.Request('SEARCH', self.cached).execute(*args)
+
+        remove(list(range(3, 9)))
+        self.check('SEARCH', args)
+        self.assertNotEqual(
+            sql_requests.Request('SEARCH', self.plain).execute(*args), before)
+
+    def test_search_after_delete(self):
+        request = sql_requests.Request('DELETE', self.cached)
+        self.search_after_deletes(
+            lambda ids: [request.execute(book_id=book_id) for book_id in ids])
+
+    def test_search_after_delete_many(self):
+        self.search_after_deletes(
+            lambda ids: sql_requests.delete_many(ids, self.cached))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,170 @@
+import contextlib
+import functools
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import cli
+from assets.data import logger, metrics
+
+
+class CliTest(unittest.TestCase):
+    """
+    Проверка команд интерфейса командной строки на временной базе данных
+    (журнал приложения пишется во временную папку).
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'library.db')
+        setup = functools.partial(
+            logger.setup, os.path.join(self.directory, 'logs.jsonl'))
+        patcher = mock.patch.object(logger, 'setup', setup)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        for author, title, year, status in (
+                ('Пушкин', 'Евгений Онегин', '1833', '1'),
+                ('Гоголь', 'Мёртвые души', '1842', 'Выдана'),
+                ('Толстой', 'Война и мир', '1869', 'В наличии')):
+            self.run_cli('add', author, title, year, status)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def run_cli(self, *argv: str, stdin: str = None) -> tuple:
+        """
+        Запуск команды, возвращаются код завершения, stdout и stderr.
+        """
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(contextlib.redirect_stdout(stdout))
+            stack.enter_context(contextlib.redirect_stderr(stderr))
+            if stdin is not None:
+                stack.enter_context(
+                    mock.patch('sys.stdin', io.StringIO(stdin)))
+            try:
+                code = cli.main(['--db', self.path] + list(argv))
+            except SystemExit as error:
+                code = error.code
+        return code, stdout.getvalue(), stderr.getvalue()
+
+    def lines(self, *argv: str) -> list:
+        code, stdout, stderr = self.run_cli(*argv)
+        self.assertEqual(code, 0, stderr)
+        return stdout.splitlines()
+
+    def test_list(self):
+        self.assertEqual(self.lines('list'), [
+            '1\tПушкин\tЕвгений Онегин\t1833\t1',
+            '2\tГоголь\tМёртвые души\t1842\t0',
+            '3\tТолстой\tВойна и мир\t1869\t1'])
+        self.assertEqual(
+            self.lines('list', '--status', '1', '--sort', 'year', '--desc',
+                       '--columns', 'id,title'),
+            ['3\tВойна и мир', '1\tЕвгений Онегин'])
+        self.assertEqual(self.lines('list', '--year-from', '1840',
+                                    '--year-to', '1850'),
+                         ['2\tГоголь\tМёртвые души\t1842\t0'])
+        self.assertEqual(self.lines('list', '--limit', '0'), [])
+
+    def test_formats(self):
+        self.assertEqual(
+            [json.loads(line) for line in self.lines(
+                '--format', 'jsonl', 'list', '--limit', '1',
+                '--columns', 'author,year')],
+            [{'author': 'Пушкин', 'year': 1833}])
+        self.assertEqual(self.lines('--format', 'csv', 'find', '--title',
+                                    'мёрт'),
+                         ['2,Гоголь,Мёртвые души,1842,0'])
+
+    def test_write_commands(self):
+        self.assertEqual(self.lines('update', '2', '--year', '1852'),
+                         ['2\tГоголь\tМёртвые души\t1852\t0'])
+        self.assertEqual(self.lines('status', 'Выдана', '1', '3'), [
+            '1\tПушкин\tЕвгений Онегин\t1833\t0',
+            '3\tТолстой\tВойна и мир\t1869\t0'])
+        self.assertEqual(self.lines('delete', '1', '2'), [
+            '1\tПушкин\tЕвгений Онегин\t1833\t0',
+            '2\tГоголь\tМёртвые души\t1852\t0'])
+        self.assertEqual(self.lines('list', '--columns', 'id'), ['3'])
+        self.assertEqual(self.lines('find', '--exact', '--author',
+                                    'Толстой'),
+                         ['3\tТолстой\tВойна и мир\t1869\t0'])
+
+    def test_errors(self):
+        code, stdout, stderr = self.run_cli('delete', '3', '7', '8')
+        self.assertEqual(stdout, '3\tТолстой\tВойна и мир\t1869\t1\n')
+        self.assertEqual(code, 1)
+        self.assertIn('7, 8', stderr)
+        self.assertEqual(self.run_cli('update', '9', '--year', '1')[0], 1)
+
+        code, _, stderr = self.run_cli('status', 'потеряна', '1')
+        self.assertEqual(code, 2)
+        self.assertIn('некорректный статус', stderr)
+
+    def test_batch(self):
+        code, stdout, stderr = self.run_cli('batch', stdin=(
+            '# комментарий\n'
+            '\n'
+            'add "Чехов А. П." "Дама с собачкой" 1899\n'
+            'delete 40\n'
+            'status 0 4\n'
+            'add Чехов\n'))
+        self.assertEqual(code, 1)
+        self.assertEqual(stdout.splitlines(), [
+            '4\tЧехов А. П.\tДама с собачкой\t1899\t1',
+            '4\tЧехов А. П.\tДама с собачкой\t1899\t0'])
+        self.assertIn('Строка 4', stderr)
+        self.assertEqual(len(self.lines('list')), 4)
+
+    def test_journal(self):
+        self.lines('delete', '2')
+        changes = [line.split('\t') for line in self.lines('journal')]
+        self.assertEqual([(seq, operation, book_id)
+                          for seq, _, operation, book_id, _ in changes],
+                         [('1', 'INSERT', '1'), ('2', 'INSERT', '2'),
+                          ('3', 'INSERT', '3'), ('4', 'DELETE', '2')])
+        self.assertEqual(len(self.lines('journal', '--since', '3')), 1)
+
+    def test_import_export(self):
+        path = os.path.join(self.directory, 'books.jsonl')
+        code, _, stderr = self.run_cli('export', path)
+        self.assertEqual(code, 0)
+        self.assertIn('export: 3 записей', stderr)
+        code, _, stderr = self.run_cli('import', path, '--batch-size', '2')
+        self.assertEqual(code, 0)
+        self.assertIn('import: 3 записей', stderr)
+        self.assertEqual(self.lines('list')[3:], [
+            '4\tПушкин\tЕвгений Онегин\t1833\t1',
+            '5\tГоголь\tМёртвые души\t1842\t0',
+            '6\tТолстой\tВойна и мир\t1869\t1'])
+
+    def test_maintenance(self):
+        backup = os.path.join(self.directory, 'backup.db')
+        for argv in (('backup', backup), ('check',), ('optimize',),
+                     ('vacuum',)):
+            with self.subTest(command=argv[0]):
+                code, stdout, stderr = self.run_cli(*argv)
+                self.assertEqual((code, stdout), (0, ''), stderr)
+                self.assertTrue(stderr.startswith(argv[0]))
+
+        self.path = backup
+        self.assertEqual(len(self.lines('list')), 3)
+
+    def test_metrics(self):
+        self.addCleanup(metrics.reset)
+        self.addCleanup(metrics.disable)
+        path = os.path.join(self.directory, 'metrics.json')
+        self.lines('--metrics', path, 'find', '--author', 'пушкин')
+        with open(path, encoding='utf-8') as file:
+            result = json.load(file)
+        self.assertEqual(result['operations']['SEARCH']['count'], 1)
+        self.assertIn('hit_rate', result['cache'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from assets.data import sql_requests
+
+
+class JournalTest(unittest.TestCase):
+    """
+    Проверка записей журнала изменений каталога.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.database = sql_requests.Connection(
+            os.path.join(self.directory, 'library.db'))
+        sql_requests.migrate(self.database)
+        self.insert = sql_requests.Request('INSERT', self.database)
+        self.update = sql_requests.Request('UPDATE', self.database)
+        self.delete = sql_requests.Request('DELETE', self.database)
+
+    def tearDown(self):
+        self.database.close()
+        shutil.rmtree(self.directory)
+
+    def test_rows_of_reused_id(self):
+        book_id = self.insert.execute('Пушкин', 'Руслан и Людмила', 1820, 1)
+        self.update.execute('Пушкин', 'Руслан и Людмила', 1820, 0, book_id)
+        self.delete.execute(book_id=book_id)
+        # Id удалённой последней книги выдаётся снова
+        self.assertEqual(
+            self.insert.execute('Гоголь', 'Нос', 1836, 1), book_id)
+
+        changes = sql_requests.changes_since(
+            database=self.database)['changes']
+        self.assertEqual(
+            [(change['operation'], change['id'], change['changes'])
+             for change in changes],
+            [('INSERT', book_id, {'author': 'Пушкин',
+                                  'title': 'Руслан и Людмила',
+                                  'year': 1820, 'status': 1}),
+             ('UPDATE', book_id, {'status': 0}),
+             ('DELETE', book_id, {'author': 'Пушкин',
+                                  'title': 'Руслан и Людмила',
+                                  'year': 1820, 'status': 0}),
+             ('INSERT', book_id, {'author': 'Гоголь', 'title': 'Нос',
+                                  'year': 1836, 'status': 1})])
+
+    def test_unchanged_update_not_journaled(self):
+        book_id = self.insert.execute('Гоголь', 'Нос', 1836, 1)
+        self.update.execute('Гоголь', 'Нос', 1836, 1, book_id)
+        result = sql_requests.changes_since(database=self.database)
+        self.assertEqual([change['operation'] for change in result['changes']],
+                         ['INSERT'])
+        self.assertEqual(result['journal_seq'], result['last_seq'])
+
+
+if __name__ == '__main__':
+    unittest.main()
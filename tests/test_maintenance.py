@@ -0,0 +1,121 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+from assets.data import sql_requests, maintenance
+
+
+class MaintenanceTest(unittest.TestCase):
+    """
+    Проверка резервного копирования и снимков базы данных на временном
+    файле базы данных.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.database = sql_requests.Connection(
+            os.path.join(self.directory, 'library.db'))
+        sql_requests.migrate(self.database)
+        sql_requests.insert_many(
+            [(f'Автор {number}', f'Книга {number} ' + 'текст ' * 50,
+              1900 + number % 120, number % 2) for number in range(500)],
+            self.database)
+
+    def tearDown(self):
+        self.database.close()
+        shutil.rmtree(self.directory)
+
+    def test_backup_pauses_between_steps(self):
+        sleep = 0.02
+        path = os.path.join(self.directory, 'backup.db')
+        start = time.perf_counter()
+        result = maintenance.backup(path, pages=4, sleep=sleep,
+                                    database=self.database)
+        elapsed = time.perf_counter() - start
+
+        self.assertGreater(result['steps'], 2)
+        self.assertGreaterEqual(elapsed, (result['steps'] - 1) * sleep)
+        backup = sql_requests.Connection(path)
+        try:
+            self.assertEqual(len(sql_requests.Query(backup).fetch()), 500)
+        finally:
+            backup.close()
+
+    def test_backup_with_writes(self):
+        path = os.path.join(self.directory, 'backup.db')
+        insert = sql_requests.Request('INSERT', self.database)
+        stop = threading.Event()
+        written = []
+
+        def write() -> None:
+            while not stop.is_set():
+                written.append(insert.execute('Автор', 'Книга', 2000, 1))
+                time.sleep(0.002)
+
+        thread = threading.Thread(target=write)
+        thread.start()
+        try:
+            result = maintenance.backup(path, pages=2, sleep=0.005,
+                                        database=self.database)
+        finally:
+            stop.set()
+            thread.join()
+
+        # Запись через общее подключение не начинает копирование заново
+        self.assertGreater(len(written), 0)
+        self.assertEqual(result['restarts'], 0)
+        backup = sql_requests.Connection(path)
+        try:
+            copied = len(sql_requests.Query(backup).fetch())
+        finally:
+            backup.close()
+        self.assertGreaterEqual(copied, 500)
+        self.assertLessEqual(copied, 500 + len(written))
+
+    def test_backup_restarts_limited(self):
+        path = os.path.join(self.directory, 'backup.db')
+        other = sqlite3.connect(self.database.path)
+
+        def progress(copied: int, total: int) -> None:
+            # Изменение другим подключением после каждого шага
+            with other:
+                other.execute("UPDATE Books SET status = 1 - status "
+                              "WHERE id = 1")
+
+        try:
+            with self.assertRaises(sqlite3.OperationalError):
+                maintenance.backup(path, pages=2, sleep=0, progress=progress,
+                                   database=self.database)
+        finally:
+            other.close()
+
+    def test_backup_without_sleep(self):
+        path = os.path.join(self.directory, 'backup.db')
+        result = maintenance.backup(path, pages=4, sleep=0,
+                                    database=self.database)
+        self.assertEqual(result['pages'], self.database.get().execute(
+            'PRAGMA page_count').fetchone()[0])
+
+    def test_snapshots_in_same_second(self):
+        folder = os.path.join(self.directory, 'snapshots')
+        paths = [maintenance.snapshot(folder, keep=10,
+                                      database=self.database)['path']
+                 for _ in range(5)]
+
+        self.assertEqual(len(set(paths)), 5)
+        self.assertEqual(maintenance.snapshots(folder, 'library'), paths)
+
+    def test_snapshot_keeps_newest(self):
+        folder = os.path.join(self.directory, 'snapshots')
+        paths = [maintenance.snapshot(folder, keep=2,
+                                      database=self.database)['path']
+                 for _ in range(4)]
+        self.assertEqual(maintenance.snapshots(folder, 'library'), paths[-2:])
+
+
+if __name__ == '__main__':
+    unittest.main()
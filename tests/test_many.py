@@ -0,0 +1,86 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from assets.data import sql_requests
+
+
+class ManyTest(unittest.TestCase):
+    """
+    Проверка массового удаления книг и изменения их статуса одной
+    транзакцией.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.database = sql_requests.Connection(
+            os.path.join(self.directory, 'library.db'))
+        sql_requests.migrate(self.database)
+        sql_requests.insert_many(
+            [(f'Автор {number % 10}', f'Книга {number}', 2000 + number % 3, 1)
+             for number in range(1, 1201)], self.database)
+        self.select = sql_requests.Request('SELECT', self.database)
+        self.book = sql_requests.Request('BOOK', self.database)
+
+    def tearDown(self):
+        self.database.close()
+        shutil.rmtree(self.directory)
+
+    def ids(self) -> list:
+        return [book.id for book in self.select.execute()]
+
+    def test_delete_many(self):
+        deleted = sql_requests.delete_many([3, 1, 3, 5000], self.database)
+        self.assertEqual(deleted, [
+            sql_requests.Book(1, 'Автор 1', 'Книга 1', 2001, 1),
+            sql_requests.Book(3, 'Автор 3', 'Книга 3', 2000, 1)])
+        self.assertEqual(self.ids()[:3], [2, 4, 5])
+        self.assertEqual(sql_requests.delete_many([1, 3], self.database), [])
+
+    def test_set_status(self):
+        changed = sql_requests.set_status([2, 4000, 7], 0, self.database)
+        self.assertEqual([(book.id, book.status) for book in changed],
+                         [(2, 0), (7, 0)])
+        self.assertEqual(self.book.execute(book_id=7), [changed[1]])
+        self.assertEqual(self.book.execute(book_id=8)[0].status, 1)
+
+    def test_more_ids_than_chunk(self):
+        book_ids = list(range(1, sql_requests.IDS_CHUNK * 2 + 2))
+        changed = sql_requests.set_status(book_ids, 0, self.database)
+        self.assertEqual([book.id for book in changed], book_ids)
+        deleted = sql_requests.delete_many(book_ids, self.database)
+        self.assertEqual(deleted, changed)
+        self.assertEqual(self.ids()[0], book_ids[-1] + 1)
+
+    def test_failure_changes_nothing(self):
+        with self.database.lock:
+            self.database.get().execute(
+                'CREATE TRIGGER Books_fail BEFORE DELETE ON Books '
+                'WHEN old.id = 40 '
+                "BEGIN SELECT RAISE(ABORT, 'удаление отклонено'); END")
+
+        with self.assertRaises(sqlite3.Error):
+            sql_requests.delete_many(range(1, 80), self.database)
+        self.assertEqual(len(self.ids()), 1200)
+
+    def test_cached_results_updated(self):
+        # Точечная очистка кэша и полная (больше INVALIDATE_LIMIT книг)
+        many = list(range(10, 10 + 2 * sql_requests.INVALIDATE_LIMIT))
+        for book_ids in ([5, 6], many):
+            with self.subTest(books=len(book_ids)):
+                first = book_ids[0]
+                self.assertEqual(self.book.execute(book_id=first)[0].status, 1)
+                before = self.ids()
+
+                sql_requests.set_status(book_ids, 0, self.database)
+                self.assertEqual(self.book.execute(book_id=first)[0].status, 0)
+                sql_requests.delete_many(book_ids, self.database)
+                self.assertEqual(self.book.execute(book_id=first), [])
+                self.assertEqual(self.ids(), [book_id for book_id in before
+                                              if book_id not in book_ids])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import main
+from assets.data import sql_requests
+
+
+class PagingTest(unittest.TestCase):
+    """
+    Проверка задач фонового потока главного окна (без создания окна):
+    загрузка страниц каталога в порядке сортировки и получение изменённых
+    записей для обновления дерева.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.database = sql_requests.connect(sql_requests.Connection(
+            os.path.join(self.directory, 'library.db')))
+        sql_requests.migrate(self.database)
+        sql_requests.insert_many(
+            [(f'Автор {number % 9}', f'Книга {number % 13}',
+              1900 + number % 11, number % 2) for number in range(500)],
+            self.database)
+        self.books = sql_requests.Query(self.database).fetch()
+
+    def tearDown(self):
+        sql_requests.connect(sql_requests.Connection())
+        shutil.rmtree(self.directory)
+
+    def walk(self, order: tuple, size: int) -> list:
+        """
+        Загрузка всех страниц вперёд от начала каталога, затем назад от
+        последней страницы, как при прокрутке дерева.
+        """
+        forward = [main.load_books(order, size)]
+        while forward[-1]:
+            forward.append(main.load_books(order, size, forward[-1][-1]))
+        forward.pop()
+
+        backward = [forward[-1]]
+        while backward[-1]:
+            backward.append(main.load_books(order, size, backward[-1][0],
+                                            forward=False))
+        backward.pop()
+        return forward, backward[::-1]
+
+    def test_first_page(self):
+        version, books = main.first_page()
+        self.assertEqual(version, self.database.version())
+        self.assertEqual(books,
+                         self.books[:main.PAGE_SIZE + main.PREFETCH])
+        latest = max(self.books, key=lambda book: (book.year, book.id))
+        self.assertEqual(main.first_page(('year', True))[1][0], latest)
+
+    def test_load_books(self):
+        for column, descending in (main.DEFAULT_ORDER, ('id', True),
+                                   ('author', False), ('year', True)):
+            with self.subTest(column=column, descending=descending):
+                expected = sorted(
+                    self.books, reverse=descending,
+                    key=lambda book: (getattr(book, column), book.id))
+                forward, backward = self.walk((column, descending), 70)
+                self.assertEqual(sum(forward, []), expected)
+                self.assertEqual(backward, forward)
+
+    def test_fetch_changes(self):
+        version = main.fetch_changes()[0]
+        sql_requests.update.connection_with_request(
+            'Гоголь', 'Нос', 1836, 0, 3)
+        sql_requests.delete.connection_with_request(book_id=4)
+
+        changed_version, changes = main.fetch_changes([3, 4])
+        self.assertNotEqual(changed_version, version)
+        self.assertEqual(changes, [
+            (3, [sql_requests.Book(3, 'Гоголь', 'Нос', 1836, 0)]), (4, [])])
+        self.assertEqual(main.fetch_changes(), (changed_version, None))
+
+    def test_change_books(self):
+        version, changes = main.change_books(sql_requests.set_status,
+                                             [5, 6], 1)
+        self.assertEqual(version, self.database.version())
+        self.assertEqual([(book_id, books[0].status)
+                          for book_id, books in changes], [(5, 1), (6, 1)])
+
+        version, changes = main.change_books(sql_requests.delete_many,
+                                             [5, 600])
+        self.assertEqual(changes, [(5, [])])
+        self.assertEqual(main.load_books(main.DEFAULT_ORDER, 3, self.books[3]),
+                         self.books[5:8])
+
+
+if __name__ == '__main__':
+    unittest.main()
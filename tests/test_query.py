@@ -0,0 +1,146 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from assets.data import sql_requests
+
+AUTHORS = ('Пушкин', 'Гоголь', 'Толстой', 'Чехов')
+
+
+class QueryTest(unittest.TestCase):
+    """
+    Проверка конструктора запросов Query: отбор, сортировка, выбор
+    столбцов и keyset-пагинация в обе стороны.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.database = sql_requests.Connection(
+            os.path.join(self.directory, 'library.db'))
+        sql_requests.migrate(self.database)
+        # Повторяющиеся значения столбцов, чтобы порядок внутри страниц
+        # определялся id
+        self.rows = [(AUTHORS[number % 4], f'Книга {number % 7}',
+                      1900 + number % 5, number % 2)
+                     for number in range(1200)]
+        sql_requests.insert_many(self.rows, self.database)
+        self.books = [sql_requests.Book(number, *row)
+                      for number, row in enumerate(self.rows, start=1)]
+
+    def tearDown(self):
+        self.database.close()
+        shutil.rmtree(self.directory)
+
+    def query(self) -> sql_requests.Query:
+        return sql_requests.Query(self.database)
+
+    def pages(self, query: sql_requests.Query, size: int) -> list:
+        """
+        Обход результата страницами вперёд от начала, затем назад от
+        последней страницы.
+        """
+        forward, page = [], query.limit(size).fetch()
+        while page:
+            forward.append(page)
+            page = query.limit(size).after(*query.key(page[-1])).fetch()
+
+        backward, page = [], forward[-1]
+        while page:
+            backward.append(page)
+            page = query.limit(size).before(*query.key(page[0])).fetch()
+        return forward, backward[::-1]
+
+    def test_pages_in_both_directions(self):
+        for column, descending in (('id', False), ('id', True),
+                                   ('title', False), ('year', True),
+                                   ('status', False)):
+            with self.subTest(column=column, descending=descending):
+                query = self.query().order_by(column, descending)
+                expected = sorted(
+                    self.books, reverse=descending,
+                    key=lambda book: (getattr(book, column), book.id))
+
+                forward, backward = self.pages(query, 100)
+                self.assertEqual(sum(forward, []), expected)
+                self.assertEqual(backward, forward)
+                self.assertEqual(query.fetch(), expected)
+
+    def test_filters(self):
+        query = self.query().filter(status=1, year_from=1901, year_to=1902)
+        self.assertEqual(query.fetch(), [
+            book for book in self.books
+            if book.status == 1 and 1901 <= book.year <= 1902])
+
+        query = self.query().filter(author='Гоголь', title='Книга 3')
+        self.assertEqual([book.id for book in query.fetch()],
+                         [book.id for book in self.books
+                          if book.author == 'Гоголь' and
+                          book.title == 'Книга 3'])
+
+        self.assertEqual(self.query().filter(ids=[5, 3, 5000]).fetch(),
+                         [self.books[2], self.books[4]])
+        self.assertEqual(self.query().filter(year=1700).fetch(), [])
+
+    def test_filtered_pages(self):
+        query = self.query().filter(author='Чехов').order_by('year', True)
+        expected = sorted((book for book in self.books
+                           if book.author == 'Чехов'),
+                          key=lambda book: (book.year, book.id), reverse=True)
+
+        forward, backward = self.pages(query, 40)
+        self.assertEqual(sum(forward, []), expected)
+        self.assertEqual(backward, forward)
+
+    def test_search(self):
+        query = self.query().search('пуш', 'книга 6').order_by('id', True)
+        self.assertEqual(query.fetch(), [
+            book for book in reversed(self.books)
+            if book.author == 'Пушкин' and book.title == 'Книга 6'])
+        self.assertEqual(self.query().search().sql(), self.query().sql())
+
+    def test_columns(self):
+        query = self.query().columns('title', 'id').order_by('id', True)
+        self.assertEqual(query.limit(2).fetch(),
+                         [('Книга 2', 1200), ('Книга 1', 1199)])
+        # Все столбцы в исходном порядке - записи Book
+        self.assertIsInstance(self.query().columns().limit(1).fetch()[0],
+                              sql_requests.Book)
+
+    def test_iteration_in_chunks(self):
+        self.assertGreater(len(self.books), sql_requests.FETCH_SIZE)
+        self.assertEqual(list(self.query()), self.books)
+        query = self.query().limit(700)
+        self.assertEqual(list(query.before(*query.key(self.books[-1]))),
+                         self.books[-701:-1])
+
+    def test_immutable(self):
+        query = self.query().filter(status=0)
+        query.order_by('title').limit(1).after('Книга 1', 10)
+        self.assertEqual(query.sql(), (
+            'SELECT id, author, title, year, status FROM Books '
+            'WHERE status = ? ORDER BY id ASC', (0,)))
+
+    def test_spec_round_trip(self):
+        query = self.query().filter(status=0, ids=range(1, 100)).search(
+            'пушкин').order_by('year', True).columns('id', 'year').limit(
+            5).before(1902, 30)
+        restored = sql_requests.Query.from_spec(query.spec(), self.database)
+        self.assertEqual(restored.sql(), query.sql())
+        self.assertEqual(restored.fetch(), query.fetch())
+        self.assertEqual(query.fetch(), [(9, 1903), (93, 1902), (73, 1902),
+                                         (53, 1902), (33, 1902)])
+
+    def test_invalid_columns(self):
+        with self.assertRaises(ValueError):
+            self.query().order_by('rowid')
+        with self.assertRaises(ValueError):
+            self.query().columns('id', 'author; DROP TABLE Books')
+        query = sql_requests.Query.from_spec(
+            {'filters': [['1 = 1 OR id', '=', 1]]}, self.database)
+        with self.assertRaises(ValueError):
+            query.fetch()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from assets.data import sql_requests
+
+
+class SearchCase(unittest.TestCase):
+    """
+    Временная база данных с несколькими книгами для проверок поиска.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.database = sql_requests.Connection(
+            os.path.join(self.directory, 'library.db'))
+        sql_requests.migrate(self.database)
+        sql_requests.insert_many([
+            ('Толстой Лев', 'Война и мир', 1869, 1),
+            ('Толстой Алексей', 'Пётр Первый', 1945, 1),
+            ('Тургенев', 'Отцы и дети', 1862, 0),
+            ('Пушкин', 'Тёмная ночь', 1830, 1),
+            ('Достоевский', 'Идиот', 1869, 1),
+        ], self.database)
+        self.find = sql_requests.Request('SEARCH', self.database)
+
+    def tearDown(self):
+        self.database.close()
+        shutil.rmtree(self.directory)
+
+    def ids(self, *args) -> list:
+        return [book.id for book in self.find.execute(*args)]
+
+
+class SearchTest(SearchCase):
+    """
+    Проверка полнотекстового поиска по префиксам слов автора и названия.
+    """
+
+    def test_prefix_index(self):
+        schema = self.database.get().execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'BooksSearch'"
+        ).fetchone()[0]
+        self.assertIn("prefix='1 2 3'", schema)
+
+    def test_short_prefix_in_id_order(self):
+        self.assertEqual(self.ids('т'), [1, 2, 3])
+        self.assertEqual(self.ids('То', None, 1945), [2])
+        self.assertEqual(self.ids(None, 'т', None, None, None, 1), [4])
+
+    def test_ranked_words(self):
+        self.assertEqual(sorted(self.ids('Толстой')), [1, 2])
+        self.assertEqual(self.ids('толст', 'войн'), [1])
+        # ё в запросе и в тексте приводится к е
+        self.assertEqual(self.ids(None, 'темная'), [4])
+        self.assertEqual(self.ids(None, 'Пётр'), [2])
+
+    def test_year_only(self):
+        self.assertEqual(self.ids(None, None, '1869'), [1, 5])
+        self.assertEqual(self.ids(), [])
+
+
+class RefineTest(SearchCase):
+    """
+    Проверка уточнения запроса при поиске по мере ввода: результат
+    уточнения, отобранный в памяти, совпадает с результатом поиска в базе
+    данных.
+    """
+
+    def test_refines(self):
+        refines = sql_requests.refines
+        self.assertTrue(refines(('то', None, None), ('толс', None, None)))
+        self.assertTrue(refines(('то', '', ''), ('то', 'война', '')))
+        self.assertTrue(refines(('толстой', None, None),
+                                ('лев толстой', None, None)))
+        self.assertTrue(refines((None, None, '1869'),
+                                ('толстой', None, '1869')))
+        self.assertTrue(refines(('тол', None, None), ('тол', None, 1869)))
+        # Пустой предыдущий запрос ничего не нашёл
+        self.assertFalse(refines((None, None, None), ('то', None, None)))
+        # Слово стёрто, изменено или перенесено в другое поле
+        self.assertFalse(refines(('толс', None, None), ('то', None, None)))
+        self.assertFalse(refines(('толс', None, None), ('тург', None, None)))
+        self.assertFalse(refines(('толс', None, None), (None, 'толс', None)))
+        self.assertFalse(refines(('то', None, '1869'), ('то', None, '1870')))
+        self.assertFalse(refines(('то', None, '1869'), ('то', None, None)))
+        # Слова с разделителями ищутся фразой только в базе данных
+        self.assertFalse(refines(('то', None, None), ('то-то', None, None)))
+
+    def test_narrow_matches_search(self):
+        steps = (('т', None, None), ('то', None, None), ('то', 'в', None),
+                 ('толстой', 'война', None), ('толстой л', 'война', '1869'))
+        previous = steps[0]
+        books = self.find.execute(*previous)
+        for current in steps[1:]:
+            with self.subTest(query=current):
+                self.assertTrue(sql_requests.refines(previous, current))
+                books = sql_requests.narrow(books, *current)
+                self.assertEqual(books, self.find.execute(*current))
+            previous = current
+        self.assertEqual([book.id for book in books], [1])
+
+    def test_narrow_normalizes(self):
+        books = self.find.execute('п')
+        self.assertEqual(sql_requests.narrow(books, 'ПУШ', 'темн'), books)
+        self.assertEqual(sql_requests.narrow(books, None, 'ночь', 1830),
+                         books)
+        self.assertEqual(sql_requests.narrow(books, None, 'день'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+import os
+import shutil
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+import server
+from assets.data import client, sql_requests
+
+
+class IdleHandler(server.Handler):
+    """
+    Обработчик, который быстро закрывает простаивающие соединения (как
+    сервер после перезапуска или по тайм-ауту).
+    """
+
+    timeout = 0.2
+
+
+class ServerTest(unittest.TestCase):
+    """
+    Проверка сервера каталога и клиента на локальном порту.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.server = server.Server(
+            os.path.join(self.directory, 'library.db'), port=0)
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       daemon=True)
+        self.thread.start()
+        self.remote = client.RemoteConnection(self.server.url)
+
+    def tearDown(self):
+        self.remote.close()
+        self.server.shutdown()
+        self.server.close()
+        shutil.rmtree(self.directory)
+
+    def test_read(self):
+        book_id = self.remote.request('INSERT', 'Пушкин', 'Руслан и Людмила',
+                                      1820, 1)
+        self.assertEqual(
+            self.remote.request('BOOK', book_id=book_id),
+            [sql_requests.Book(book_id, 'Пушкин', 'Руслан и Людмила', 1820,
+                               1)])
+        self.assertEqual(
+            sql_requests.Query(self.remote).columns('title').fetch(),
+            [('Руслан и Людмила',)])
+        self.assertEqual(self.remote.schema(), len(sql_requests.MIGRATIONS))
+
+    def test_grouped_write(self):
+        count = 8
+        results = [None] * count
+
+        def insert(number: int) -> None:
+            remote = client.RemoteConnection(self.server.url)
+            try:
+                results[number] = remote.request('INSERT', f'Автор {number}',
+                                                 f'Книга {number}', 1900, 1)
+            finally:
+                remote.close()
+
+        writer = self.server.writer
+        commits = writer.commits
+        threads = [threading.Thread(target=insert, args=(number,))
+                   for number in range(count)]
+        # Пока поток записи ждёт подключение, остальные операции
+        # накапливаются в очереди и фиксируются одной группой
+        with writer.database.lock:
+            for thread in threads:
+                thread.start()
+            deadline = time.monotonic() + 10
+            while (writer.jobs.qsize() < count - 1
+                   and time.monotonic() < deadline):
+                time.sleep(0.01)
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(writer.commits - commits, 2)
+        self.assertEqual(len(set(results)), count)
+        self.assertEqual(len(self.remote.request('SELECT')), count)
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            self.remote.call('POST', '/unknown', {})
+        with self.assertRaises(ValueError):
+            self.remote.call('POST', '/request', {})
+        with self.assertRaises(ValueError):
+            self.remote.request('CREATE')
+        with self.assertRaises(ValueError):
+            self.remote.maintenance('vacuum')
+        # Ошибка вне обработанных типов (OverflowError при привязке
+        # параметра) возвращается ответом 500, а не разрывом соединения
+        with self.assertRaises(sqlite3.OperationalError):
+            self.remote.request('INSERT', 'Автор', 'Книга', 2 ** 70, 1)
+        self.assertEqual(self.remote.request('SELECT'), [])
+
+    def test_reconnect(self):
+        self.server.RequestHandlerClass = IdleHandler
+        self.remote.close()
+        self.assertEqual(self.remote.request('SELECT'), [])
+        time.sleep(0.5)
+        book_id = self.remote.request('INSERT', 'Гоголь', 'Нос', 1836, 1)
+        self.assertEqual(len(self.remote.request('BOOK', book_id=book_id)),
+                         1)
+
+
+class DisconnectTest(unittest.TestCase):
+    """
+    Проверка, что запрос, отправленный перед разрывом соединения, не
+    повторяется клиентом.
+    """
+
+    def test_sent_request_not_repeated(self):
+        listener = socket.create_server(('127.0.0.1', 0))
+        listener.settimeout(5)
+        received = []
+
+        def read(connection: socket.socket) -> None:
+            data = b''
+            while b'\r\n\r\n' not in data:
+                data += connection.recv(65536)
+            head, body = data.split(b'\r\n\r\n', 1)
+            length = int(head.lower().split(b'content-length:')[1]
+                         .split(b'\r\n')[0])
+            while len(body) < length:
+                body += connection.recv(65536)
+            received.append(head.split(b' ')[1])
+
+        def serve() -> None:
+            # Ответ на первый запрос, разрыв соединения после второго
+            connection, _ = listener.accept()
+            with connection:
+                read(connection)
+                connection.sendall(b'HTTP/1.1 200 OK\r\n'
+                                   b'Content-Length: 2\r\n\r\n{}')
+                read(connection)
+            listener.settimeout(0.5)
+            try:
+                connection, _ = listener.accept()
+            except socket.timeout:
+                return None
+            with connection:
+                read(connection)
+
+        thread = threading.Thread(target=serve, daemon=True)
+        thread.start()
+        host, port = listener.getsockname()
+        remote = client.RemoteConnection(f'http://{host}:{port}')
+        try:
+            remote.call('POST', '/first', {})
+            with self.assertRaises(ConnectionError):
+                remote.call('POST', '/second', {})
+        finally:
+            remote.close()
+            thread.join()
+            listener.close()
+        self.assertEqual(received, [b'/first', b'/second'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from assets.data import sql_requests, worker
+
+
+class WorkerTest(unittest.TestCase):
+    """
+    Проверка фонового потока запросов: отмена устаревших запросов чтения
+    и завершение записи при остановке.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.database = sql_requests.Connection(
+            os.path.join(self.directory, 'library.db'))
+        sql_requests.migrate(self.database)
+        self.worker = worker.Worker(self.database)
+
+    def tearDown(self):
+        self.worker.stop()
+        self.database.close()
+        shutil.rmtree(self.directory)
+
+    def count(self) -> int:
+        with self.database.lock:
+            return self.database.get().execute(
+                'SELECT count(*) FROM Books').fetchone()[0]
+
+    def test_stop_finishes_write(self):
+        rows = [(f'Автор {number}', f'Книга {number}', 2000, 1)
+                for number in range(50000)]
+        results, errors = [], []
+        self.worker.submit(sql_requests.insert_many, rows,
+                           database=self.database, callback=results.append,
+                           errback=errors.append)
+        time.sleep(0.05)
+
+        self.assertTrue(self.worker.stop())
+        self.worker.poll()
+        self.assertEqual((results, errors), ([50000], []))
+        self.assertEqual(self.count(), 50000)
+
+    def test_stop_cancels_keyed_reads(self):
+        started, release = threading.Event(), threading.Event()
+        results = []
+
+        def read() -> str:
+            started.set()
+            release.wait(5)
+            return 'read'
+
+        self.worker.submit(read, callback=results.append, key='tree')
+        started.wait(5)
+        queued = self.worker.submit(lambda: 'queued', callback=results.append,
+                                    key='search')
+        write = self.worker.submit(sql_requests.insert_many,
+                                   [('Автор', 'Книга', 2000, 1)],
+                                   database=self.database,
+                                   callback=results.append)
+
+        self.assertFalse(self.worker.stop(0.1))
+        release.set()
+        self.assertTrue(self.worker.stop())
+        self.worker.poll()
+        self.assertTrue(queued.cancelled)
+        self.assertFalse(write.cancelled)
+        self.assertEqual(results, [1])
+
+    def test_superseded_read_cancelled(self):
+        results = []
+        gate = threading.Event()
+        self.worker.submit(gate.wait, 5)
+        self.worker.submit(lambda: 'old', callback=results.append, key='tree')
+        self.worker.submit(lambda: 'new', callback=results.append, key='tree')
+        gate.set()
+        deadline = time.monotonic() + 5
+        while self.worker.busy and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.worker.poll()
+        self.assertEqual(results, ['new'])
+
+
+if __name__ == '__main__':
+    unittest.main()